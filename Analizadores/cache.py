@@ -0,0 +1,124 @@
+"""
+Caché de compilaciones de FlashML direccionada por contenido
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from Analizadores.persistencia import archivo_atomico
+
+class CacheCompilacion:
+    """
+    Guarda el resultado de compilaciones anteriores (HTML, código intermedio y
+    errores) bajo una clave calculada a partir del código fuente y de todo lo
+    que influye en la salida. Mantiene en memoria las entradas usadas más
+    recientemente (desalojo LRU) y, si se indica un directorio, también las
+    conserva en disco entre ejecuciones.
+    """
+
+    def __init__(self, capacidad=128, directorio=None):
+        self.capacidad = capacidad
+        self.directorio = directorio
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._entradas = OrderedDict()
+        self._bloqueo = threading.Lock()
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio)
+    
+    @staticmethod
+    def calcular_clave(codigo_fuente, *componentes):
+        """Clave SHA-256 del código fuente y de los componentes adicionales (versión, tablas, opciones)"""
+        resumen = hashlib.sha256()
+        for componente in componentes:
+            resumen.update(json.dumps(componente, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+            resumen.update(b'\0')
+        resumen.update(codigo_fuente.encode('utf-8'))
+        return resumen.hexdigest()
+    
+    def obtener(self, clave):
+        """Devuelve la entrada guardada para la clave, o None si no existe"""
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada
+        
+        entrada = self._leer_disco(clave)
+        with self._bloqueo:
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            self.aciertos_disco += 1
+            self._agregar(clave, entrada)
+        return entrada
+    
+    def guardar(self, clave, entrada):
+        """
+        Guarda una entrada: un diccionario con 'html' (str o None),
+        'intermedio' (str, bytes o None) y 'errores' (lista)
+        """
+        with self._bloqueo:
+            self._agregar(clave, entrada)
+        self._escribir_disco(clave, entrada)
+    
+    def estadisticas(self):
+        with self._bloqueo:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'entradas': len(self._entradas),
+                'capacidad': self.capacidad,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            }
+    
+    def limpiar(self):
+        with self._bloqueo:
+            self._entradas.clear()
+    
+    def _agregar(self, clave, entrada):
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+            self.desalojos += 1
+    
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json")
+    
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        try:
+            with open(self._ruta(clave), 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if datos.pop('intermedio_binario', False):
+            datos['intermedio'] = base64.b64decode(datos['intermedio'])
+        return datos
+    
+    def _escribir_disco(self, clave, entrada):
+        if not self.directorio:
+            return
+        datos = dict(entrada)
+        datos['intermedio_binario'] = isinstance(entrada['intermedio'], bytes)
+        if datos['intermedio_binario']:
+            datos['intermedio'] = base64.b64encode(entrada['intermedio']).decode('ascii')
+        
+        # Escritura atómica: otro proceso nunca ve una entrada a medio escribir
+        try:
+            with archivo_atomico(self._ruta(clave)) as f:
+                json.dump(datos, f, ensure_ascii=False)
+        except OSError:
+            pass
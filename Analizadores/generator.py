@@ -1,12 +1,41 @@
 """
 Generador de código HTML a partir del AST de FlashML
 """
+import os
+import re
+import textwrap
+from functools import lru_cache
+from html import escape
+from itertools import chain
+
 from Analizadores.parser import Elemento, NodoTexto, NodoComentario, Documento
+from Analizadores.intermedio import CargadorIntermedio
+from Analizadores.tabla import NODO_ELEMENTO, NODO_TEXTO, NODO_COMENTARIO, TablaNodos
+from Analizadores.persistencia import guardar_por_contenido
+
+# Tamaño aproximado, en caracteres, de los fragmentos que produce iter_generar
+TAMANO_FRAGMENTO = 64 * 1024
+
+# Etiquetas HTML en línea: el espacio entre ellas y el texto que las rodea se ve en la página
+ELEMENTOS_EN_LINEA = frozenset({'span', 'em', 'img'})
+
+# Cadenas y comentarios de CSS, que la minificación no modifica (los comentarios se eliminan)
+_CADENAS_Y_COMENTARIOS_CSS = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|/\*.*?\*/)""", re.S)
 
 class GeneradorHTML:
 
     
-    def __init__(self):
+    def __init__(self, recursos=None, minificar=False):
+        """
+        recursos: None para incluir la hoja de estilos y el script en cada página
+        (documentos autocontenidos), o un diccionario {'css': url, 'js': url} con
+        las direcciones donde están publicados (ver publicar_recursos)
+        minificar: Si es True, genera la página sin indentación ni espacios que no
+        cambian cómo se ve, y con el CSS y el script minificados. El texto del
+        documento se conserva exactamente
+        """
+        self.recursos = recursos
+        self.minificar = minificar
         self.mapeo_etiquetas = {
             'velocista': 'div',
             'titulo': 'h1',
@@ -43,62 +72,141 @@ class GeneradorHTML:
             'alt': 'alt'
         }
     
-    def generar(self, ast):
-        """Genera código HTML a partir del AST """
+    def generar(self, ast, fragmentos=None):
+        """Genera código HTML a partir del AST (un Documento o una TablaNodos)"""
+        return "".join(self.iter_generar(ast, fragmentos=fragmentos))
+    
+    def iter_generar(self, ast, tamano_fragmento=TAMANO_FRAGMENTO, fragmentos=None):
+        """
+        Genera el documento HTML como una secuencia de fragmentos de unos
+        tamano_fragmento caracteres, sin construir el documento completo en memoria.
+        Con un Documento, fragmentos puede aportar el HTML ya generado de algunos
+        subárboles (ver Analizadores/paralelo.py).
+        """
+        if self.minificar:
+            # Los fragmentos se generaron con formato: no se pueden insertar en una página minificada
+            if isinstance(ast, TablaNodos):
+                cuerpo = self._iter_minificado(list(ast.hijos(0)), lambda indice: self._describir_tabla(ast, indice))
+            else:
+                cuerpo = self._iter_minificado(ast.hijos, self._describir)
+        elif isinstance(ast, TablaNodos):
+            cuerpo = self._iter_nodo_tabla(ast)
+        else:
+            cuerpo = self._iter_nodo(ast, 0, fragmentos)
+        
+        pendientes = []
+        acumulado = 0
+        for parte in chain((self._inicio_documento(),), cuerpo, (self._fin_documento(),)):
+            pendientes.append(parte)
+            acumulado += len(parte)
+            if acumulado >= tamano_fragmento:
+                yield "".join(pendientes)
+                pendientes = []
+                acumulado = 0
+        if pendientes:
+            yield "".join(pendientes)
+    
+    def generar_desde_binario(self, datos):
+        """Regenera el HTML a partir del código intermedio binario, sin volver a analizar el código fuente"""
+        return self.generar(CargadorIntermedio().cargar_binario(datos))
+    
+    def generar_en(self, ast, destino, fragmentos=None):
+        """Escribe el documento HTML en cualquier objeto con método write (un archivo, una respuesta HTTP...)"""
+        for fragmento in self.iter_generar(ast, fragmentos=fragmentos):
+            destino.write(fragmento)
+    
+    def contenido_recursos(self):
+        """Hoja de estilos y script comunes a todas las páginas: {'css': texto, 'js': texto}"""
+        if self.minificar:
+            return {'css': _minificar_css(self._generar_estilos()), 'js': _minificar_js(self._generar_script())}
+        return {
+            'css': textwrap.dedent(self._generar_estilos()).strip() + "\n",
+            'js': textwrap.dedent(self._generar_script()).strip() + "\n",
+        }
+    
+    def _fin_documento(self):
+        if self.minificar:
+            return "</body></html>"
+        return """
+    </body>
+    </html>"""
+    
+    def _inicio_documento(self):
+        """Cabecera de la página con estilos y scripts, hasta la apertura del cuerpo"""
+        if self.minificar:
+            return self._inicio_documento_minificado()
+        if self.recursos:
+            recursos = f"""        <link rel="stylesheet" href="{escape(self.recursos['css'])}">
+        <script src="{escape(self.recursos['js'])}"></script>"""
+        else:
+            recursos = f"""        <style>
+    {self._generar_estilos()}
+        </style>
+        <script>
+{self._generar_script()}
+        </script>"""
         return f"""<!DOCTYPE html>
     <html lang="es">
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Documento FlashML</title>
-        <style>
-    {self._generar_estilos()}
-        </style>
-        <script>
-            // Script para añadir interactividad
-            document.addEventListener('DOMContentLoaded', function() {{
+{recursos}
+    </head>
+    <body>
+        """
+
+    def _inicio_documento_minificado(self):
+        if self.recursos:
+            recursos = (f'<link rel="stylesheet" href="{escape(self.recursos["css"])}">'
+                        f'<script src="{escape(self.recursos["js"])}"></script>')
+        else:
+            recursos_minificados = self.contenido_recursos()
+            recursos = f"<style>{recursos_minificados['css']}</style><script>{recursos_minificados['js']}</script>"
+        return ('<!DOCTYPE html><html lang="es"><head><meta charset="UTF-8">'
+                '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+                f'<title>Documento FlashML</title>{recursos}</head><body>')
+    
+    def _generar_script(self):
+    
+        return """            // Script para añadir interactividad
+            document.addEventListener('DOMContentLoaded', function() {
                 // Animación para elementos Flash
                 const flashElements = document.querySelectorAll('.superspeed, .speedforce');
-                flashElements.forEach(el => {{
-                    el.addEventListener('mouseover', function() {{
+                flashElements.forEach(el => {
+                    el.addEventListener('mouseover', function() {
                         this.style.animation = 'lightning-flash 0.5s infinite';
-                    }});
-                    el.addEventListener('mouseout', function() {{
+                    });
+                    el.addEventListener('mouseout', function() {
                         this.style.animation = '';
-                    }});
-                }});
+                    });
+                });
                 
                 // Toggle para ver/ocultar episodios
                 const temporadas = document.querySelectorAll('.temporada');
-                temporadas.forEach(temporada => {{
+                temporadas.forEach(temporada => {
                     const titulo = temporada.querySelector('h1, h2, h3') || temporada.firstElementChild;
-                    if (titulo) {{
+                    if (titulo) {
                         titulo.style.cursor = 'pointer';
-                        titulo.addEventListener('click', function() {{
-                            Array.from(temporada.children).forEach(child => {{
-                                if (child !== titulo) {{
+                        titulo.addEventListener('click', function() {
+                            Array.from(temporada.children).forEach(child => {
+                                if (child !== titulo) {
                                     child.style.display = child.style.display === 'none' ? '' : 'none';
-                                }}
-                            }});
-                        }});
-                    }}
-                }});
+                                }
+                            });
+                        });
+                    }
+                });
                 
                 // Tooltip para personajes con sus nombres
                 const personajes = document.querySelectorAll('.personaje[data-nombre]');
-                personajes.forEach(personaje => {{
+                personajes.forEach(personaje => {
                     personaje.setAttribute('title', personaje.getAttribute('data-nombre'));
-                }});
-            }});
-        </script>
-    </head>
-    <body>
-        {self._generar_nodo(ast)}
-    </body>
-    </html>"""
+                });
+            });"""
     
     def _generar_estilos(self):
-        
+    
         return """
     /* Estilos modernos inspirados en The Flash */
     @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;500;700&family=Roboto:wght@300;400;500;700&display=swap');
@@ -530,56 +638,226 @@ class GeneradorHTML:
         }
     }
     """
-    
-    def _generar_nodo(self, nodo, indentacion=0):
-        """Genera el código HTML para un nodo y sus hijos"""
-        html = ""
-        cadena_indentacion = "  " * indentacion
+
+    def _iter_nodo(self, nodo, indentacion=0, fragmentos=None):
+        """
+        Produce el código HTML de un nodo y sus hijos por partes, con una pila explícita en lugar de recursión.
+        fragmentos puede asociar id(descendiente) -> HTML ya generado de ese subárbol, que se reutiliza tal cual.
+        """
+        # La pila contiene nodos pendientes (nodo, indentación) o cierres ya formados (cadenas)
+        pila = [(nodo, indentacion)]
         
-        if isinstance(nodo, Documento):
-            for hijo in nodo.hijos:
-                html += self._generar_nodo(hijo, indentacion)
+        while pila:
+            entrada = pila.pop()
+            if isinstance(entrada, str):
+                yield entrada
+                continue
+            
+            nodo, indentacion = entrada
+            if fragmentos is not None and id(nodo) in fragmentos:
+                yield fragmentos[id(nodo)]
+                continue
+            cadena_indentacion = "  " * indentacion
+            
+            if isinstance(nodo, Documento):
+                pila.extend((hijo, indentacion) for hijo in reversed(nodo.hijos))
+            
+            elif isinstance(nodo, Elemento):
+            
+                etiqueta_html = self.mapeo_etiquetas.get(nodo.nombre_etiqueta, 'div')
+                
+                
+                atributos = ""
+                for nombre, valor in nodo.atributos.items():
+                    atributo_html = self.mapeo_atributos.get(nombre, nombre)
+                    atributos += f" {atributo_html}=\"{valor}\""
+                
+                
+                atributos += f" class=\"{nodo.nombre_etiqueta}\""
+                
+                
+                if etiqueta_html == 'img':
+                    yield f"{cadena_indentacion}<{etiqueta_html}{atributos} />\n"
+                else:
+                    # Abrir la etiqueta
+                    yield f"{cadena_indentacion}<{etiqueta_html}{atributos}>"
+                    
+                    # Si hay contenido en línea, no agregar nueva línea
+                    tiene_solo_texto = len(nodo.hijos) == 1 and isinstance(nodo.hijos[0], NodoTexto)
+                    if not tiene_solo_texto and nodo.hijos:
+                        yield "\n"
+                        pila.append(f"{cadena_indentacion}</{etiqueta_html}>\n")
+                    else:
+                        pila.append(f"</{etiqueta_html}>\n")
+                    
+                    # Los hijos se generan antes que el cierre que queda debajo en la pila
+                    indentacion_hijos = indentacion + 1 if not tiene_solo_texto else 0
+                    pila.extend((hijo, indentacion_hijos) for hijo in reversed(nodo.hijos))
+            
+            elif isinstance(nodo, NodoTexto):
+                # Usar el contenido del texto directamente
+                yield nodo.texto
+            
+            elif isinstance(nodo, NodoComentario):
+                # Convertir comentarios de FlashML a comentarios HTML
+                yield f"{cadena_indentacion}<!-- {nodo.texto} -->\n"
+    
+    def _iter_minificado(self, raices, describir):
+        """
+        Produce el HTML minificado de los nodos raices y sus descendientes. Sigue el mismo
+        recorrido que _iter_nodo, pero en lugar de escribir la indentación y los saltos de
+        línea anota que había espacio: si queda entre dos contenidos en línea (texto,
+        comentarios o ELEMENTOS_EN_LINEA), donde se vería, se reduce a un salto de línea;
+        junto a un elemento de bloque se elimina. describir(nodo) devuelve
+        (tipo, etiqueta, atributos, texto, hijos, tiene_solo_texto).
+        """
+        pendiente = False
+        anterior_en_linea = False
         
-        elif isinstance(nodo, Elemento):
+        def unir(contenido, en_linea):
+            nonlocal pendiente, anterior_en_linea
+            if pendiente and anterior_en_linea and en_linea:
+                contenido = "\n" + contenido
+            pendiente = False
+            anterior_en_linea = en_linea
+            return contenido
+        
+        # La pila contiene nodos pendientes (nodo, indentación) o cierres (etiqueta, en línea, con espacio antes)
+        pila = [(hijo, 0) for hijo in reversed(raices)]
+        while pila:
+            entrada = pila.pop()
+            if len(entrada) == 3:
+                cierre, en_linea, espacio_antes = entrada
+                pendiente = pendiente or espacio_antes
+                yield unir(cierre, en_linea)
+                pendiente = True
+                continue
             
-            etiqueta_html = self.mapeo_etiquetas.get(nodo.nombre_etiqueta, 'div')
+            nodo, indentacion = entrada
+            tipo, nombre_etiqueta, atributos_nodo, texto, hijos, tiene_solo_texto = describir(nodo)
+            if tipo == NODO_TEXTO:
+                yield unir(texto, True)
+                continue
             
+            pendiente = pendiente or indentacion > 0
+            if tipo == NODO_COMENTARIO:
+                yield unir(f"<!-- {texto} -->", True)
+                pendiente = True
+                continue
             
+            etiqueta_html = self.mapeo_etiquetas.get(nombre_etiqueta, 'div')
+            en_linea = etiqueta_html in ELEMENTOS_EN_LINEA
             atributos = ""
-            for nombre, valor in nodo.atributos.items():
+            for nombre, valor in atributos_nodo.items():
                 atributo_html = self.mapeo_atributos.get(nombre, nombre)
                 atributos += f" {atributo_html}=\"{valor}\""
+            atributos += f" class=\"{nombre_etiqueta}\""
             
+            if etiqueta_html == 'img':
+                yield unir(f"<{etiqueta_html}{atributos} />", True)
+                pendiente = True
+                continue
             
-            atributos += f" class=\"{nodo.nombre_etiqueta}\""
+            yield unir(f"<{etiqueta_html}{atributos}>", en_linea)
+            if not tiene_solo_texto and hijos:
+                pendiente = True
+                pila.append((f"</{etiqueta_html}>", en_linea, indentacion > 0))
+            else:
+                pila.append((f"</{etiqueta_html}>", en_linea, False))
+            indentacion_hijos = indentacion + 1 if not tiene_solo_texto else 0
+            pila.extend((hijo, indentacion_hijos) for hijo in reversed(hijos))
+    
+    def _describir(self, nodo):
+        if isinstance(nodo, Elemento):
+            tiene_solo_texto = len(nodo.hijos) == 1 and isinstance(nodo.hijos[0], NodoTexto)
+            return NODO_ELEMENTO, nodo.nombre_etiqueta, nodo.atributos, None, nodo.hijos, tiene_solo_texto
+        if isinstance(nodo, NodoTexto):
+            return NODO_TEXTO, None, None, nodo.texto, None, False
+        return NODO_COMENTARIO, None, None, nodo.texto, None, False
+    
+    def _describir_tabla(self, tabla, indice):
+        tipo = tabla.tipo[indice]
+        if tipo == NODO_ELEMENTO:
+            return (tipo, tabla.nombre_etiqueta(indice), tabla.atributos(indice), None, list(tabla.hijos(indice)),
+                    tabla.tiene_solo_texto(indice))
+        return tipo, None, None, tabla.texto(indice), None, False
+    
+    def _iter_nodo_tabla(self, tabla):
+        """Produce por partes el código HTML de todos los nodos de una TablaNodos, igual que _iter_nodo"""
+        # La pila contiene nodos pendientes (índice, indentación) o cierres ya formados (cadenas)
+        pila = [(hijo, 0) for hijo in reversed(list(tabla.hijos(0)))]
+        while pila:
+            entrada = pila.pop()
+            if isinstance(entrada, str):
+                yield entrada
+                continue
             
+            indice, indentacion = entrada
+            cadena_indentacion = "  " * indentacion
+            tipo = tabla.tipo[indice]
             
-            if etiqueta_html == 'img':
-                html += f"{cadena_indentacion}<{etiqueta_html}{atributos} />\n"
-            else:
-                # Abrir la etiqueta
-                html += f"{cadena_indentacion}<{etiqueta_html}{atributos}>"
+            if tipo == NODO_ELEMENTO:
+                nombre_etiqueta = tabla.nombre_etiqueta(indice)
+                etiqueta_html = self.mapeo_etiquetas.get(nombre_etiqueta, 'div')
                 
-                # Si hay contenido en línea, no agregar nueva línea
-                tiene_solo_texto = len(nodo.hijos) == 1 and isinstance(nodo.hijos[0], NodoTexto)
-                if not tiene_solo_texto and nodo.hijos:
-                    html += "\n"
+                atributos = ""
+                for nombre, valor in tabla.atributos(indice).items():
+                    atributo_html = self.mapeo_atributos.get(nombre, nombre)
+                    atributos += f" {atributo_html}=\"{valor}\""
+                atributos += f" class=\"{nombre_etiqueta}\""
                 
-                # Generar los hijos
-                for hijo in nodo.hijos:
-                    html += self._generar_nodo(hijo, indentacion + 1 if not tiene_solo_texto else 0)
+                if etiqueta_html == 'img':
+                    yield f"{cadena_indentacion}<{etiqueta_html}{atributos} />\n"
+                    continue
                 
-                # Cerrar la etiqueta
-                if not tiene_solo_texto and nodo.hijos:
-                    html += cadena_indentacion
-                html += f"</{etiqueta_html}>\n"
-        
-        elif isinstance(nodo, NodoTexto):
-            # Usar el contenido del texto directamente
-            html += nodo.texto
-        
-        elif isinstance(nodo, NodoComentario):
-            # Convertir comentarios de FlashML a comentarios HTML
-            html += f"{cadena_indentacion}<!-- {nodo.texto} -->\n"
-        
-        return html
\ No newline at end of file
+                yield f"{cadena_indentacion}<{etiqueta_html}{atributos}>"
+                hijos = list(tabla.hijos(indice))
+                tiene_solo_texto = tabla.tiene_solo_texto(indice)
+                if not tiene_solo_texto and hijos:
+                    yield "\n"
+                    pila.append(f"{cadena_indentacion}</{etiqueta_html}>\n")
+                else:
+                    pila.append(f"</{etiqueta_html}>\n")
+                
+                indentacion_hijos = indentacion + 1 if not tiene_solo_texto else 0
+                pila.extend((hijo, indentacion_hijos) for hijo in reversed(hijos))
+            
+            elif tipo == NODO_TEXTO:
+                yield tabla.texto(indice)
+            
+            else:
+                yield f"{cadena_indentacion}<!-- {tabla.texto(indice)} -->\n"
+
+@lru_cache(maxsize=None)
+def _minificar_css(css):
+    """Elimina los comentarios y los espacios que no afectan al CSS, sin tocar las cadenas"""
+    partes = _CADENAS_Y_COMENTARIOS_CSS.split(css)
+    for i in range(0, len(partes), 2):
+        parte = re.sub(r'\s+', ' ', partes[i])
+        parte = re.sub(r' ?([{};,>]) ?', r'\1', parte)
+        partes[i] = parte.replace(': ', ':')
+    for i in range(1, len(partes), 2):
+        if partes[i].startswith('/*'):
+            partes[i] = ''
+    return re.sub(r';}', '}', ''.join(partes)).strip()
+
+@lru_cache(maxsize=None)
+def _minificar_js(js):
+    """Quita la indentación, las líneas vacías y los comentarios de línea; conserva los saltos de línea"""
+    lineas = (linea.strip() for linea in js.splitlines())
+    return "\n".join(linea for linea in lineas if linea and not linea.startswith('//'))
+
+def publicar_recursos(directorio, url_base, comprimir=False, minificar=False):
+    """
+    Guarda en directorio la hoja de estilos y el script comunes de las páginas,
+    con el hash de su contenido en el nombre (flashml-<hash>.css y .js): cada
+    versión tiene su propia dirección y se puede cachear indefinidamente.
+    Devuelve el diccionario recursos para GeneradorHTML, con las direcciones
+    formadas por url_base y el nombre de cada archivo. Con minificar=True
+    se publican las versiones minificadas.
+    """
+    recursos = {}
+    for tipo, contenido in GeneradorHTML(minificar=minificar).contenido_recursos().items():
+        ruta = guardar_por_contenido(directorio, contenido, f".{tipo}", comprimir, prefijo='flashml-')
+        recursos[tipo] = f"{url_base.rstrip('/')}/{os.path.basename(ruta)}"
+    return recursos
@@ -0,0 +1,372 @@
+"""
+Compilación incremental de FlashML para ediciones desde el editor
+
+Conserva, junto al AST, la posición de cada elemento en el código fuente y
+los errores semánticos y el HTML ya generados de cada subárbol. Tras una
+edición solo se vuelve a analizar el elemento más pequeño que la contiene, y
+solo se recalculan los resultados de ese elemento y de sus antecesores.
+"""
+from Analizadores.lexer import AnalizadorLexicoRapido, TipoToken, Token, SyntaxError as LexerSyntaxError
+from Analizadores.parser import Documento, Elemento, NodoTexto, NodoComentario
+from Analizadores.semantic import AnalizadorSemantico
+from Analizadores.generator import GeneradorHTML
+
+# Los elementos más profundos no tienen tramo propio: se vuelven a analizar
+# junto con su antecesor, lo que limita la memoria de los resultados guardados
+PROFUNDIDAD_MAXIMA_TRAMOS = 8
+
+# Los tramos más largos (en caracteres del código fuente) guardan su HTML como
+# una lista de partes en lugar de una sola cadena, para que una edición no
+# tenga que volver a copiar el HTML de todo el documento
+LONGITUD_MAXIMA_FRAGMENTO = 16 * 1024
+
+class Tramo:
+    """
+    Posición de un elemento en el código fuente y resultados guardados de su subárbol.
+    
+    inicio es relativo al inicio del tramo padre: una edición solo desplaza a los
+    hermanos posteriores de cada antecesor, no a todos los elementos del documento.
+    indice_nodo es la posición del elemento en los hijos del nodo padre, que no
+    cambia porque cada nuevo análisis sustituye un elemento por otro.
+    errores y html valen None cuando hay que recalcularlos; html es una cadena
+    o, en los tramos largos, una lista de partes (cadenas o listas anidadas).
+    """
+    __slots__ = ('nodo', 'inicio', 'indice_nodo', 'longitud', 'hijos', 'errores', 'html')
+    
+    def __init__(self, nodo, inicio, indice_nodo=None):
+        self.nodo = nodo
+        self.inicio = inicio
+        self.indice_nodo = indice_nodo
+        self.longitud = 0
+        self.hijos = []
+        self.errores = None
+        self.html = None
+
+class CompilacionIncremental:
+    """
+    Compilación de un documento que se modifica con ediciones sucesivas.
+    
+    editar() aplica la edición al código fuente, vuelve a analizar el elemento
+    más pequeño que la contiene (o un antecesor, si la edición cambia sus
+    etiquetas) y devuelve la lista de errores. Si la edición deja un error léxico
+    o sintáctico dentro del elemento, se conserva el último árbol válido y la
+    próxima edición vuelve a intentar el análisis incremental; solo se compila
+    todo cuando ningún elemento contiene las ediciones. El HTML se regenera al pedirlo
+    (generar_html, iter_html o generar_en) y solo para los subárboles modificados.
+    resultado() coincide con el de una compilación completa con tabla_nodos=True.
+    """
+
+    def __init__(self, codigo_fuente):
+        self.semantico = AnalizadorSemantico()
+        self.generador = GeneradorHTML()
+        self._cabecera = self.generador._inicio_documento()
+        self.fuente = codigo_fuente
+        self.documento = None
+        self.raiz = None
+        self.errores = []
+        # Edición que dejó el documento con un error léxico o sintáctico, como
+        # (inicio, fin, diferencia de longitud) en posiciones del árbol conservado
+        self._pendiente = None
+        # Número de caracteres analizados de nuevo en la última compilación
+        self.ultimo_reanalisis = 0
+        self._compilar_todo()
+    
+    def resultado(self):
+        return {'html': self.generar_html(), 'errores': list(self.errores)}
+    
+    def generar_html(self):
+        """Documento HTML completo, o None si hay errores"""
+        if self.errores:
+            return None
+        return "".join(self.iter_html())
+    
+    def iter_html(self):
+        """Produce el documento HTML por partes, reutilizando los fragmentos guardados sin unirlos"""
+        if self.errores:
+            return
+        yield self._cabecera
+        pila = [iter([self._html()])]
+        while pila:
+            parte = next(pila[-1], None)
+            if parte is None:
+                pila.pop()
+            elif isinstance(parte, list):
+                pila.append(iter(parte))
+            else:
+                yield parte
+        yield self.generador._fin_documento()
+    
+    def generar_en(self, destino):
+        """Escribe el documento HTML en cualquier objeto con método write"""
+        for parte in self.iter_html():
+            destino.write(parte)
+    
+    def editar(self, desplazamiento, longitud_borrada, texto_insertado):
+        """
+        Reemplaza longitud_borrada caracteres a partir de desplazamiento por
+        texto_insertado y actualiza la compilación
+        """
+        fin_edicion = desplazamiento + longitud_borrada
+        if desplazamiento < 0 or longitud_borrada < 0 or fin_edicion > len(self.fuente):
+            raise ValueError(f"Edición fuera del código fuente: {desplazamiento}+{longitud_borrada}")
+        
+        self.fuente = self.fuente[:desplazamiento] + texto_insertado + self.fuente[fin_edicion:]
+        diferencia = len(texto_insertado) - longitud_borrada
+        
+        if self.raiz is None:
+            self._compilar_todo()
+            return list(self.errores)
+        if self._pendiente is not None:
+            desplazamiento, fin_edicion, diferencia = _unir_ediciones(self._pendiente, desplazamiento, fin_edicion, diferencia)
+        try:
+            reanalizado = self._reanalizar(desplazamiento, fin_edicion, diferencia)
+        except (SyntaxError, LexerSyntaxError) as e:
+            # Se conserva el último árbol válido y la edición queda pendiente: la
+            # próxima se une a ella y se vuelve a intentar el análisis incremental
+            self._pendiente = (desplazamiento, fin_edicion, diferencia)
+            self._fallar(e)
+            return list(self.errores)
+        
+        if reanalizado:
+            self._pendiente = None
+            self._actualizar_errores()
+        else:
+            self._compilar_todo()
+        return list(self.errores)
+    
+    def _compilar_todo(self):
+        self.ultimo_reanalisis = len(self.fuente)
+        self._pendiente = None
+        try:
+            self.documento, self.raiz, _ = _construir(self.fuente)
+        except (SyntaxError, LexerSyntaxError) as e:
+            # Sin AST válido, la próxima edición vuelve a compilar todo el documento
+            self.documento = None
+            self.raiz = None
+            self._fallar(e)
+            return
+        self._actualizar_errores()
+    
+    def _fallar(self, error):
+        if isinstance(error, LexerSyntaxError):
+            self.errores = [{'tipo': 'léxico', 'mensaje': f"Error léxico: {str(error)}"}]
+        else:
+            self.errores = [{'tipo': 'sintáctico', 'mensaje': f"Error sintáctico: {str(error)}"}]
+    
+    def _reanalizar(self, inicio_edicion, fin_edicion, diferencia):
+        """
+        Vuelve a analizar el elemento más interno que contiene la edición; si su
+        análisis no termina donde debe, lo intenta con sus antecesores.
+        Devuelve False si ningún elemento sirve y hay que compilar todo.
+        
+        Si el análisis de un elemento falla, propaga el error: el código anterior
+        al elemento no cambió, así que una compilación completa fallaría igual.
+        """
+        # Camino desde la raíz: (tramo, inicio absoluto, índice en los hijos del padre)
+        camino = [(self.raiz, 0, None)]
+        tramo, base = self.raiz, 0
+        while True:
+            indice = _ultimo_hijo_antes(tramo, inicio_edicion - base)
+            if indice < 0:
+                break
+            hijo = tramo.hijos[indice]
+            inicio = base + hijo.inicio
+            # La '@' de apertura no puede cambiar; la etiqueta de cierre sí, y se comprueba al analizar
+            if fin_edicion > inicio + hijo.longitud:
+                break
+            camino.append((hijo, inicio, indice))
+            tramo, base = hijo, inicio
+        
+        for profundidad in range(len(camino) - 2, -1, -1):
+            tramo, inicio, indice = camino[profundidad + 1]
+            _, nuevo, fin = _construir(self.fuente, inicio, profundidad)
+            if fin != inicio + tramo.longitud + diferencia:
+                continue
+            self._reemplazar(camino[:profundidad + 1], tramo, nuevo, indice, diferencia)
+            self.ultimo_reanalisis = fin - inicio
+            return True
+        return False
+    
+    def _reemplazar(self, antecesores, viejo, nuevo, indice, diferencia):
+        """Sustituye un tramo por el recién analizado y ajusta las posiciones de sus antecesores"""
+        padre = antecesores[-1][0]
+        nuevo.inicio = viejo.inicio
+        nuevo.indice_nodo = viejo.indice_nodo
+        padre.hijos[indice] = nuevo
+        padre.nodo.hijos[viejo.indice_nodo] = nuevo.nodo
+        
+        for tramo, _, indice_en_padre in reversed(antecesores):
+            hijos = tramo.hijos
+            for k in range(indice + 1, len(hijos)):
+                hijos[k].inicio += diferencia
+            tramo.longitud += diferencia
+            tramo.errores = None
+            tramo.html = None
+            indice = indice_en_padre
+    
+    def _actualizar_errores(self):
+        self.errores = [{'tipo': 'semántico', 'mensaje': error} for error in self._errores()]
+    
+    def _pendientes(self, atributo):
+        """Tramos sin el resultado indicado, en postorden, con la etiqueta de su padre y su indentación"""
+        if getattr(self.raiz, atributo) is not None:
+            return
+        pila = [(self.raiz, None, 0, False)]
+        while pila:
+            tramo, etiqueta_padre, indentacion, visitado = pila.pop()
+            if visitado:
+                yield tramo, etiqueta_padre, indentacion
+                continue
+            
+            pila.append((tramo, etiqueta_padre, indentacion, True))
+            if tramo is self.raiz:
+                etiqueta, indentacion_hijos = None, 0
+            else:
+                etiqueta, indentacion_hijos = tramo.nodo.nombre_etiqueta, indentacion + 1
+            pila.extend((hijo, etiqueta, indentacion_hijos, False)
+                        for hijo in reversed(tramo.hijos) if getattr(hijo, atributo) is None)
+    
+    def _errores(self):
+        """Errores semánticos del documento, recalculando solo los subárboles modificados"""
+        semantico = self.semantico
+        for tramo, etiqueta_padre, _ in self._pendientes('errores'):
+            errores = []
+            nodo = tramo.nodo
+            if tramo is self.raiz:
+                if not any(isinstance(hijo, Elemento) and hijo.nombre_etiqueta == 'velocista' for hijo in nodo.hijos):
+                    errores.append("Error semántico: se requiere un elemento raíz 'velocista'")
+                esquema = None
+                valido = True
+            else:
+                padre = semantico.esquema.get(etiqueta_padre) if etiqueta_padre else None
+                esquema = semantico._validar_elemento(nodo.nombre_etiqueta, nodo.atributos, padre, errores)
+                valido = esquema is not None
+            
+            if valido and tramo.hijos:
+                # Si un tramo tiene hijos, todos sus elementos hijos tienen tramo y en el mismo orden
+                for hijo in tramo.hijos:
+                    errores.extend(hijo.errores)
+            elif valido:
+                for hijo in nodo.hijos:
+                    if isinstance(hijo, Elemento):
+                        semantico._analizar_nodo(hijo, esquema, errores)
+            tramo.errores = tuple(errores)
+        return self.raiz.errores
+    
+    def _html(self):
+        """Cuerpo HTML del documento, regenerando solo los subárboles modificados"""
+        for tramo, _, indentacion in self._pendientes('html'):
+            fragmentos = {id(hijo.nodo): hijo.html for hijo in tramo.hijos}
+            partes = self.generador._iter_nodo(tramo.nodo, indentacion, fragmentos or None)
+            # Los hijos de un tramo corto también son cortos, así que todas sus partes son cadenas
+            if tramo.longitud <= LONGITUD_MAXIMA_FRAGMENTO:
+                tramo.html = "".join(partes)
+            else:
+                tramo.html = list(partes)
+        return self.raiz.html
+
+
+def _ultimo_hijo_antes(tramo, posicion):
+    """Índice del último hijo del tramo que empieza antes de la posición relativa, o -1"""
+    hijos = tramo.hijos
+    bajo, alto = 0, len(hijos)
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        if hijos[medio].inicio < posicion:
+            bajo = medio + 1
+        else:
+            alto = medio
+    return bajo - 1
+
+
+def _unir_ediciones(pendiente, inicio, fin, diferencia):
+    """
+    Une una edición (en posiciones del código actual) a la pendiente (en posiciones
+    del árbol conservado) y devuelve la edición conjunta en posiciones del árbol
+    """
+    inicio_pendiente, fin_pendiente, diferencia_pendiente = pendiente
+    # Lo anterior a la edición pendiente no se desplazó; lo posterior, en diferencia_pendiente
+    return (min(inicio, inicio_pendiente),
+            max(fin_pendiente, fin - diferencia_pendiente),
+            diferencia_pendiente + diferencia)
+
+
+def _construir(fuente, inicio=0, profundidad=None):
+    """
+    Analiza el código fuente construyendo el AST y sus tramos.
+    
+    Sin profundidad analiza el documento completo y devuelve (Documento, tramo
+    raíz, fin). Con profundidad analiza un único elemento que empieza en inicio
+    y está a esa profundidad, y devuelve (Elemento, su tramo, fin de su etiqueta
+    de cierre). Los errores son los mismos que los de construir_tabla.
+    """
+    lexico = AnalizadorLexicoRapido(fuente)
+    lexico.posicion = inicio
+    escanear = lexico.escanear
+    
+    def token_actual():
+        return Token(tipo_token, fuente[inicio_token:fin_token], lexico.coordenadas(inicio_posicion))
+    
+    # Cada nivel de la pila guarda [nodo, tramo, nombre de la etiqueta, inicio absoluto, profundidad]
+    if profundidad is None:
+        documento = Documento()
+        pila = [[documento, Tramo(documento, 0), None, 0, -1]]
+    else:
+        pila = []
+    tipo_token, inicio_token, fin_token, inicio_posicion = escanear()
+    
+    while True:
+        nivel = pila[-1] if pila else None
+        
+        if tipo_token == TipoToken.FIN_ARCHIVO:
+            if profundidad is None and len(pila) == 1:
+                nivel[1].longitud = len(fuente)
+                return documento, nivel[1], len(fuente)
+            raise SyntaxError(f"Etiqueta de cierre faltante para {nivel[2]}")
+        
+        if (tipo_token == TipoToken.ETIQUETA_CIERRE and nivel[2] is not None
+                and fuente[inicio_token:fin_token] == nivel[2]):
+            pila.pop()
+            if nivel[1] is not None:
+                nivel[1].longitud = fin_token - nivel[3]
+            if not pila:
+                return nivel[0], nivel[1], fin_token
+            tipo_token, inicio_token, fin_token, inicio_posicion = escanear()
+            continue
+        
+        if tipo_token == TipoToken.ETIQUETA_APERTURA:
+            nombre_etiqueta = fuente[inicio_token:fin_token]
+            elemento = Elemento(nombre_etiqueta)
+            if nivel is None:
+                profundidad_elemento, inicio_padre, tramo_padre = profundidad, 0, None
+            else:
+                profundidad_elemento, inicio_padre, tramo_padre = nivel[4] + 1, nivel[3], nivel[1]
+            
+            tramo = None
+            if profundidad_elemento < PROFUNDIDAD_MAXIMA_TRAMOS and (nivel is None or tramo_padre is not None):
+                tramo = Tramo(elemento, inicio_posicion - inicio_padre, len(nivel[0].hijos) if nivel else None)
+                if tramo_padre is not None:
+                    tramo_padre.hijos.append(tramo)
+            inicio_elemento = inicio_posicion
+            
+            tipo_token, inicio_token, fin_token, inicio_posicion = escanear()
+            while tipo_token == TipoToken.NOMBRE_ATRIBUTO:
+                nombre_atributo = fuente[inicio_token:fin_token]
+                tipo_token, inicio_token, fin_token, inicio_posicion = escanear()
+                if tipo_token != TipoToken.VALOR_ATRIBUTO:
+                    raise SyntaxError(f"Error de sintaxis: se esperaba {TipoToken.VALOR_ATRIBUTO.name}, se encontró {tipo_token.name} en la posición {lexico.coordenadas(inicio_posicion)}")
+                elemento.agregar_atributo(nombre_atributo, fuente[inicio_token:fin_token])
+                tipo_token, inicio_token, fin_token, inicio_posicion = escanear()
+            
+            if nivel is not None:
+                nivel[0].agregar_hijo(elemento)
+            pila.append([elemento, tramo, nombre_etiqueta, inicio_elemento, profundidad_elemento])
+            continue
+        
+        if tipo_token == TipoToken.TEXTO:
+            nivel[0].agregar_hijo(NodoTexto(fuente[inicio_token:fin_token]))
+        elif tipo_token == TipoToken.COMENTARIO:
+            nivel[0].agregar_hijo(NodoComentario(fuente[inicio_token:fin_token]))
+        else:
+            raise SyntaxError(f"Token inesperado: {token_actual()}")
+        tipo_token, inicio_token, fin_token, inicio_posicion = escanear()
@@ -1,11 +1,23 @@
 """
 Generador de código intermedio para FlashML
 """
+from json.encoder import encode_basestring
+
 from Analizadores.parser import Documento, Elemento, NodoTexto, NodoComentario
+from Analizadores.tabla import NODO_DOCUMENTO, NODO_ELEMENTO, NODO_TEXTO, NODO_COMENTARIO, TablaNodos
+
+# Tamaño aproximado, en caracteres, de los fragmentos que produce iter_json
+TAMANO_FRAGMENTO = 64 * 1024
+
+# Formato binario: cabecera, tabla de cadenas y registros de nodos en preorden,
+# todos los enteros codificados como varint (LEB128 sin signo)
+MAGIA_BINARIO = b'FMLB'
+VERSION_BINARIO = 1
 
 class GeneradorIntermedio:
     """
     Convierte el AST de FlashML en una representación intermedia en formato JSON
+    o en un formato binario compacto (ver generar_binario)
     """
     
     def generar_json(self, ast):
@@ -13,26 +25,314 @@ class GeneradorIntermedio:
         return self._nodo_a_json(ast)
     
     def _nodo_a_json(self, nodo):
+        """Convierte un nodo y sus descendientes usando una pila explícita en lugar de recursión"""
+        contenedor = []
+        pila = [(nodo, contenedor)]
+        
+        while pila:
+            nodo, destino = pila.pop()
+            
+            if isinstance(nodo, Documento):
+                json_nodo = {
+                    "tipo": "documento",
+                    "hijos": []
+                }
+                pila.extend((hijo, json_nodo["hijos"]) for hijo in reversed(nodo.hijos))
+            elif isinstance(nodo, Elemento):
+                json_nodo = {
+                    "tipo": "elemento",
+                    "etiqueta": nodo.nombre_etiqueta,
+                    "atributos": nodo.atributos,
+                    "hijos": []
+                }
+                pila.extend((hijo, json_nodo["hijos"]) for hijo in reversed(nodo.hijos))
+            elif isinstance(nodo, NodoTexto):
+                json_nodo = {
+                    "tipo": "texto",
+                    "contenido": nodo.texto.strip() if nodo.texto.strip() else ""
+                }
+            elif isinstance(nodo, NodoComentario):
+                json_nodo = {
+                    "tipo": "comentario",
+                    "contenido": nodo.texto
+                }
+            else:
+                json_nodo = None
+            
+            destino.append(json_nodo)
+        
+        return contenedor[0]
+    
+    def iter_json(self, ast, indentar=None, tamano_fragmento=TAMANO_FRAGMENTO, fragmentos=None):
+        """
+        Serializa la representación intermedia por fragmentos, sin construir
+        el árbol de diccionarios. Acepta un Documento o una TablaNodos.
+        
+        Con indentar=None la salida es compacta (sin espacios ni saltos de línea);
+        con indentar=n coincide byte a byte con json.dump(..., ensure_ascii=False, indent=n).
+        Con un Documento, fragmentos puede aportar el JSON ya serializado de
+        algunos subárboles (ver Analizadores/paralelo.py).
+        """
+        if isinstance(ast, TablaNodos):
+            partes = self._iter_partes_json(0, lambda indice: self._describir_tabla(ast, indice), indentar)
+        else:
+            partes = self._iter_partes_json(ast, self._describir, indentar, fragmentos=fragmentos)
+        
+        pendientes = []
+        acumulado = 0
+        for parte in partes:
+            pendientes.append(parte)
+            acumulado += len(parte)
+            if acumulado >= tamano_fragmento:
+                yield ''.join(pendientes)
+                pendientes = []
+                acumulado = 0
+        
+        if pendientes:
+            yield ''.join(pendientes)
+    
+    def escribir_json(self, ast, destino, indentar=None, fragmentos=None):
+        """Escribe la representación intermedia en cualquier objeto con método write"""
+        for fragmento in self.iter_json(ast, indentar, fragmentos=fragmentos):
+            destino.write(fragmento)
+    
+    def _iter_partes_json(self, raiz, describir, indentar, nivel=0, fragmentos=None):
+        """
+        Produce por partes el JSON de un nodo y sus descendientes. nivel es la
+        profundidad de indentación del nodo dentro del documento: los hijos
+        del documento están en el nivel 2, sus hijos en el 4, etc.
+        """
+        if indentar is None:
+            separador_clave = ':'
+            salto = lambda nivel: ''
+        else:
+            separador_clave = ': '
+            salto = lambda nivel: '\n' + ' ' * (indentar * nivel)
         
+        # La pila contiene nodos pendientes (nodo, nivel, prefijo) o cierres ya formados (cadenas)
+        pila = [(raiz, nivel, '')]
+        while pila:
+            entrada = pila.pop()
+            if isinstance(entrada, str):
+                yield entrada
+                continue
+            
+            nodo, nivel, prefijo = entrada
+            if fragmentos is not None and id(nodo) in fragmentos:
+                yield prefijo + fragmentos[id(nodo)]
+                continue
+            
+            campos, hijos = describir(nodo)
+            interior = salto(nivel + 1)
+            partes = [prefijo, '{']
+            for clave, valor in campos:
+                partes.append(interior)
+                partes.append(f'"{clave}"{separador_clave}')
+                partes.append(self._valor_json(valor, nivel + 1, separador_clave, salto))
+                partes.append(',')
+            
+            if hijos is None:
+                partes[-1] = salto(nivel) + '}'
+            elif not hijos:
+                partes.append(f'{interior}"hijos"{separador_clave}[]{salto(nivel)}}}')
+            else:
+                partes.append(f'{interior}"hijos"{separador_clave}[')
+                pila.append(f'{interior}]{salto(nivel)}}}')
+                separador_hijo = ',' + salto(nivel + 2)
+                pila.extend((hijo, nivel + 2, separador_hijo) for hijo in reversed(hijos[1:]))
+                pila.append((hijos[0], nivel + 2, salto(nivel + 2)))
+            yield ''.join(partes)
+    
+    def _valor_json(self, valor, nivel, separador_clave, salto):
+        """Serializa un campo escalar o el diccionario de atributos de un nodo"""
+        if isinstance(valor, str):
+            return encode_basestring(valor)
+        if not valor:
+            return '{}'
+        interior = ',' + salto(nivel + 1)
+        pares = interior.join(f'{encode_basestring(nombre)}{separador_clave}{encode_basestring(texto)}' for nombre, texto in valor.items())
+        return f'{{{salto(nivel + 1)}{pares}{salto(nivel)}}}'
+    
+    def _describir(self, nodo):
+        """Devuelve los campos de un nodo del AST, en el orden de generar_json, y sus hijos (o None)"""
         if isinstance(nodo, Documento):
-            return {
-                "tipo": "documento",
-                "hijos": [self._nodo_a_json(hijo) for hijo in nodo.hijos]
-            }
-        elif isinstance(nodo, Elemento):
-            return {
-                "tipo": "elemento",
-                "etiqueta": nodo.nombre_etiqueta,
-                "atributos": nodo.atributos,
-                "hijos": [self._nodo_a_json(hijo) for hijo in nodo.hijos]
-            }
-        elif isinstance(nodo, NodoTexto):
-            return {
-                "tipo": "texto",
-                "contenido": nodo.texto.strip() if nodo.texto.strip() else ""
-            }
-        elif isinstance(nodo, NodoComentario):
-            return {
-                "tipo": "comentario",
-                "contenido": nodo.texto
-            }
\ No newline at end of file
+            return [("tipo", "documento")], nodo.hijos
+        if isinstance(nodo, Elemento):
+            return [("tipo", "elemento"), ("etiqueta", nodo.nombre_etiqueta), ("atributos", nodo.atributos)], nodo.hijos
+        if isinstance(nodo, NodoTexto):
+            return [("tipo", "texto"), ("contenido", nodo.texto.strip() if nodo.texto.strip() else "")], None
+        return [("tipo", "comentario"), ("contenido", nodo.texto)], None
+    
+    def _describir_tabla(self, tabla, indice):
+        """Equivalente de _describir para un nodo de una TablaNodos"""
+        tipo = tabla.tipo[indice]
+        if tipo == NODO_DOCUMENTO:
+            return [("tipo", "documento")], list(tabla.hijos(indice))
+        if tipo == NODO_ELEMENTO:
+            campos = [("tipo", "elemento"), ("etiqueta", tabla.nombre_etiqueta(indice)), ("atributos", tabla.atributos(indice))]
+            return campos, list(tabla.hijos(indice))
+        texto = tabla.texto(indice)
+        if tipo == NODO_TEXTO:
+            return [("tipo", "texto"), ("contenido", texto.strip() if texto.strip() else "")], None
+        return [("tipo", "comentario"), ("contenido", texto)], None
+    
+    def generar_binario(self, ast):
+        """
+        Genera la representación intermedia binaria de un Documento o una TablaNodos.
+        
+        Estructura: MAGIA_BINARIO, un byte de versión, la tabla de cadenas
+        (cantidad y, por cadena, longitud en bytes y UTF-8) y los nodos en
+        preorden. Cada nodo empieza por su tipo (NODO_*): el documento guarda
+        su número de hijos; un elemento, su etiqueta, sus pares de atributos y
+        su número de hijos; textos y comentarios, su contenido. Etiquetas,
+        nombres, valores y textos se guardan como índices de la tabla de
+        cadenas. A diferencia del JSON, los textos se conservan sin recortar
+        para poder regenerar exactamente el mismo HTML.
+        """
+        cadenas = {}
+        registros = bytearray()
+        
+        def indice_cadena(cadena):
+            indice = cadenas.get(cadena)
+            if indice is None:
+                indice = cadenas[cadena] = len(cadenas)
+            return indice
+        
+        for tipo, etiqueta, atributos, texto, num_hijos in self._recorrer(ast):
+            _escribir_varint(registros, tipo)
+            if tipo == NODO_ELEMENTO:
+                _escribir_varint(registros, indice_cadena(etiqueta))
+                _escribir_varint(registros, len(atributos))
+                for nombre, valor in atributos.items():
+                    _escribir_varint(registros, indice_cadena(nombre))
+                    _escribir_varint(registros, indice_cadena(valor))
+            if tipo == NODO_DOCUMENTO or tipo == NODO_ELEMENTO:
+                _escribir_varint(registros, num_hijos)
+            else:
+                _escribir_varint(registros, indice_cadena(texto))
+        
+        salida = bytearray(MAGIA_BINARIO)
+        salida.append(VERSION_BINARIO)
+        _escribir_varint(salida, len(cadenas))
+        for cadena in cadenas:
+            codificada = cadena.encode('utf-8')
+            _escribir_varint(salida, len(codificada))
+            salida += codificada
+        salida += registros
+        return bytes(salida)
+    
+    def escribir_binario(self, ast, destino):
+        """Escribe la representación intermedia binaria en un objeto binario con método write"""
+        destino.write(self.generar_binario(ast))
+    
+    def _recorrer(self, ast):
+        """Recorre en preorden un Documento o una TablaNodos, produciendo (tipo, etiqueta, atributos, texto, número de hijos)"""
+        if isinstance(ast, TablaNodos):
+            pila = [0]
+            while pila:
+                indice = pila.pop()
+                tipo = ast.tipo[indice]
+                if tipo == NODO_DOCUMENTO or tipo == NODO_ELEMENTO:
+                    hijos = list(ast.hijos(indice))
+                    if tipo == NODO_ELEMENTO:
+                        yield tipo, ast.nombre_etiqueta(indice), ast.atributos(indice), None, len(hijos)
+                    else:
+                        yield tipo, None, None, None, len(hijos)
+                    pila.extend(reversed(hijos))
+                else:
+                    yield tipo, None, None, ast.texto(indice), 0
+            return
+        
+        pila = [ast]
+        while pila:
+            nodo = pila.pop()
+            if isinstance(nodo, Documento):
+                yield NODO_DOCUMENTO, None, None, None, len(nodo.hijos)
+                pila.extend(reversed(nodo.hijos))
+            elif isinstance(nodo, Elemento):
+                yield NODO_ELEMENTO, nodo.nombre_etiqueta, nodo.atributos, None, len(nodo.hijos)
+                pila.extend(reversed(nodo.hijos))
+            elif isinstance(nodo, NodoTexto):
+                yield NODO_TEXTO, None, None, nodo.texto, 0
+            elif isinstance(nodo, NodoComentario):
+                yield NODO_COMENTARIO, None, None, nodo.texto, 0
+
+
+class CargadorIntermedio:
+    """
+    Reconstruye el AST de FlashML a partir de la representación intermedia
+    binaria, sin volver a analizar el código fuente
+    """
+    
+    def cargar_binario(self, datos):
+        """Convierte los bytes producidos por GeneradorIntermedio.generar_binario en un Documento"""
+        datos = memoryview(datos)
+        if bytes(datos[:len(MAGIA_BINARIO)]) != MAGIA_BINARIO:
+            raise ValueError("Los datos no son código intermedio binario de FlashML")
+        version = datos[len(MAGIA_BINARIO)]
+        if version != VERSION_BINARIO:
+            raise ValueError(f"Versión de código intermedio binario no soportada: {version}")
+        
+        posicion = len(MAGIA_BINARIO) + 1
+        num_cadenas, posicion = _leer_varint(datos, posicion)
+        cadenas = []
+        for _ in range(num_cadenas):
+            longitud, posicion = _leer_varint(datos, posicion)
+            cadenas.append(str(datos[posicion:posicion + longitud], 'utf-8'))
+            posicion += longitud
+        
+        tipo, posicion = _leer_varint(datos, posicion)
+        if tipo != NODO_DOCUMENTO:
+            raise ValueError("El código intermedio binario debe empezar por el documento")
+        documento = Documento()
+        num_hijos, posicion = _leer_varint(datos, posicion)
+        
+        # Cada entrada de la pila es [nodo contenedor, hijos que faltan por leer]
+        pila = [[documento, num_hijos]] if num_hijos else []
+        while pila:
+            tipo, posicion = _leer_varint(datos, posicion)
+            if tipo == NODO_ELEMENTO:
+                etiqueta, posicion = _leer_varint(datos, posicion)
+                nodo = Elemento(cadenas[etiqueta])
+                num_atributos, posicion = _leer_varint(datos, posicion)
+                for _ in range(num_atributos):
+                    nombre, posicion = _leer_varint(datos, posicion)
+                    valor, posicion = _leer_varint(datos, posicion)
+                    nodo.agregar_atributo(cadenas[nombre], cadenas[valor])
+                num_hijos, posicion = _leer_varint(datos, posicion)
+            elif tipo == NODO_TEXTO or tipo == NODO_COMENTARIO:
+                texto, posicion = _leer_varint(datos, posicion)
+                nodo = NodoTexto(cadenas[texto]) if tipo == NODO_TEXTO else NodoComentario(cadenas[texto])
+                num_hijos = 0
+            else:
+                raise ValueError(f"Tipo de nodo inesperado en el código intermedio binario: {tipo}")
+            
+            pila[-1][0].agregar_hijo(nodo)
+            pila[-1][1] -= 1
+            if num_hijos:
+                pila.append([nodo, num_hijos])
+            while pila and pila[-1][1] == 0:
+                pila.pop()
+        
+        return documento
+
+
+def _escribir_varint(destino, valor):
+    """Agrega un entero no negativo codificado como varint a un bytearray"""
+    while valor >= 0x80:
+        destino.append((valor & 0x7F) | 0x80)
+        valor >>= 7
+    destino.append(valor)
+
+
+def _leer_varint(datos, posicion):
+    """Lee un varint y devuelve (valor, posición siguiente)"""
+    valor = 0
+    desplazamiento = 0
+    while True:
+        byte = datos[posicion]
+        posicion += 1
+        valor |= (byte & 0x7F) << desplazamiento
+        if byte < 0x80:
+            return valor, posicion
+        desplazamiento += 7
@@ -16,6 +16,8 @@ class TipoToken(Enum):
 
 class Token:
     """Clase para representar un token"""
+    __slots__ = ('tipo', 'valor', 'posicion')
+    
     def __init__(self, tipo_token, valor, posicion):
         self.tipo = tipo_token
         self.valor = valor
@@ -28,7 +30,11 @@ class Token:
         return self.__str__()
 
 class SyntaxError(Exception):
-    pass
+    """Error léxico; posicion es la (línea, columna) en la que se detectó"""
+    
+    def __init__(self, mensaje, posicion=None):
+        super().__init__(mensaje)
+        self.posicion = posicion
 
 class AnalizadorLexico:
     
@@ -109,7 +115,7 @@ class AnalizadorLexico:
             self.avanzar()  
             return Token(TipoToken.VALOR_ATRIBUTO, valor, posicion_inicio)
         
-        raise SyntaxError(f"Comilla de cierre no encontrada en la posición {self.linea}:{self.columna}")
+        raise SyntaxError(f"Comilla de cierre no encontrada en la posición {self.linea}:{self.columna}", (self.linea, self.columna))
     
     def leer_comentario(self):
         
@@ -127,7 +133,7 @@ class AnalizadorLexico:
             comentario += self.caracter_actual
             self.avanzar()
         
-        raise SyntaxError(f"Cierre de comentario ## no encontrado en la posición {self.linea}:{self.columna}")
+        raise SyntaxError(f"Cierre de comentario ## no encontrado en la posición {self.linea}:{self.columna}", (self.linea, self.columna))
     
     def leer_texto(self):
         
@@ -174,14 +180,172 @@ class AnalizadorLexico:
         # Si llegamos al final del código fuente
         return Token(TipoToken.FIN_ARCHIVO, "", (self.linea, self.columna))
     
+    def iter_tokens(self):
+        """Genera los tokens uno a uno a medida que se consumen, terminando con FIN_ARCHIVO"""
+        token = self.obtener_siguiente_token()
+        
+        while token.tipo != TipoToken.FIN_ARCHIVO:
+            yield token
+            token = self.obtener_siguiente_token()
+        
+        yield token
+    
     def tokenizar(self):
         """Convierte todo el código fuente en una lista de tokens"""
-        tokens = []
+        return list(self.iter_tokens())
+
+
+class AnalizadorLexicoRapido:
+    """
+    Variante del analizador léxico que recorre el código fuente con búsquedas
+    (str.find y expresiones regulares compiladas) y cortes, en lugar de avanzar
+    carácter a carácter. Produce exactamente los mismos tokens, con las mismas
+    posiciones, que AnalizadorLexico.
+    """
+    
+    _PALABRA = re.compile(r'\w*')
+    _FIN_TEXTO = re.compile(r'@|##')
+    # Reconoce en una sola búsqueda los tokens más frecuentes; el resto de
+    # casos (texto, errores y palabras que no son atributos) se resuelve en _escanear_desde
+    _MAESTRA = re.compile(r'\s*(?:@(/?)(\w*)|(\w+)=|"([^"]*)"|\'([^\']*)\'|##(.*?)##)?', re.DOTALL)
+    _GRUPOS = {
+        2: TipoToken.ETIQUETA_APERTURA,
+        3: TipoToken.NOMBRE_ATRIBUTO,
+        4: TipoToken.VALOR_ATRIBUTO,
+        5: TipoToken.VALOR_ATRIBUTO,
+        6: TipoToken.COMENTARIO,
+    }
+    
+    def __init__(self, codigo_fuente):
+        self.fuente = codigo_fuente
+        self.posicion = 0
+        self.linea = 1
+        self.inicio_linea = 0
+        self._posicion_contada = 0
+    
+    def coordenadas(self, posicion):
+        """Convierte un desplazamiento en (línea, columna); las consultas deben ser crecientes"""
+        saltos = self.fuente.count('\n', self._posicion_contada, posicion)
+        if saltos:
+            self.linea += saltos
+            self.inicio_linea = self.fuente.rfind('\n', self._posicion_contada, posicion) + 1
+        self._posicion_contada = posicion
+        return (self.linea, posicion - self.inicio_linea + 1)
+    
+    def escanear(self):
+        """
+        Reconoce el siguiente token sin construirlo.
+        Devuelve (tipo, inicio, fin, inicio_posicion): el valor del token es
+        fuente[inicio:fin] y su posición corresponde al desplazamiento inicio_posicion.
+        """
+        coincidencia = self._MAESTRA.match(self.fuente, self.posicion)
+        grupo = coincidencia.lastindex
+        
+        if grupo == 2:
+            inicio = coincidencia.start(2)
+            self.posicion = coincidencia.end()
+            if coincidencia.end(1) > coincidencia.start(1):
+                return TipoToken.ETIQUETA_CIERRE, inicio, self.posicion, inicio - 2
+            return TipoToken.ETIQUETA_APERTURA, inicio, self.posicion, inicio - 1
+        
+        if grupo is not None:
+            inicio = coincidencia.start(grupo)
+            caracter = self.fuente[inicio]
+            # Un atributo debe empezar por letra o '_'; si no, decide el camino general
+            if grupo != 3 or caracter.isalpha() or caracter == '_':
+                self.posicion = coincidencia.end()
+                return self._GRUPOS[grupo], inicio, coincidencia.end(grupo), inicio
+        
+        return self._escanear_desde(coincidencia.start(3) if grupo == 3 else coincidencia.end())
+    
+    def _escanear_desde(self, posicion):
+        """Camino general de escanear a partir de una posición sin espacios iniciales"""
+        fuente = self.fuente
+        longitud = len(fuente)
+        
+        if posicion >= longitud:
+            self.posicion = posicion
+            return TipoToken.FIN_ARCHIVO, posicion, posicion, posicion
+        
+        caracter = fuente[posicion]
+        
+        if caracter == '@':
+            inicio = posicion + 1
+            tipo_token = TipoToken.ETIQUETA_APERTURA
+            if fuente.startswith('/', inicio):
+                tipo_token = TipoToken.ETIQUETA_CIERRE
+                inicio += 1
+            fin = self._PALABRA.match(fuente, inicio).end()
+            self.posicion = fin
+            return tipo_token, inicio, fin, posicion
+        
+        if caracter == '#' and fuente.startswith('##', posicion):
+            fin = fuente.find('##', posicion + 2)
+            if fin < 0:
+                linea, columna = self.coordenadas(longitud)
+                raise SyntaxError(f"Cierre de comentario ## no encontrado en la posición {linea}:{columna}", (linea, columna))
+            self.posicion = fin + 2
+            return TipoToken.COMENTARIO, posicion + 2, fin, posicion + 2
+        
+        if caracter.isalpha() or caracter == '_':
+            fin = self._PALABRA.match(fuente, posicion).end()
+            if fin < longitud and fuente[fin] == '=':
+                self.posicion = fin + 1
+                return TipoToken.NOMBRE_ATRIBUTO, posicion, fin, posicion
+            # Igual que en AnalizadorLexico, la palabra leída se descarta
+            # y el análisis continúa desde el carácter que la sigue
+            posicion = fin
+            caracter = fuente[posicion] if posicion < longitud else None
+        
+        if caracter == '"' or caracter == "'":
+            fin = fuente.find(caracter, posicion + 1)
+            if fin < 0:
+                linea, columna = self.coordenadas(longitud)
+                raise SyntaxError(f"Comilla de cierre no encontrada en la posición {linea}:{columna}", (linea, columna))
+            self.posicion = fin + 1
+            return TipoToken.VALOR_ATRIBUTO, posicion + 1, fin, posicion + 1
+        
+        coincidencia = self._FIN_TEXTO.search(fuente, posicion)
+        fin = coincidencia.start() if coincidencia else longitud
+        self.posicion = fin
+        return TipoToken.TEXTO, posicion, fin, posicion
+    
+    def obtener_siguiente_token(self):
+        """Obtiene el siguiente token del código fuente"""
+        tipo_token, inicio, fin, inicio_posicion = self.escanear()
+        return Token(tipo_token, self.fuente[inicio:fin], self.coordenadas(inicio_posicion))
+    
+    def iter_tokens(self):
+        """Genera los tokens uno a uno a medida que se consumen, terminando con FIN_ARCHIVO"""
         token = self.obtener_siguiente_token()
         
         while token.tipo != TipoToken.FIN_ARCHIVO:
-            tokens.append(token)
+            yield token
             token = self.obtener_siguiente_token()
         
-        tokens.append(token) 
-        return tokens
+        yield token
+    
+    def tokenizar(self):
+        """Convierte todo el código fuente en una lista de tokens"""
+        return list(self.iter_tokens())
+
+
+def iter_tokens_recuperando(analizador_lexico, errores):
+    """
+    Genera los tokens de analizador_lexico como su iter_tokens(), pero sin propagar
+    los errores léxicos: el error se anota en errores como (mensaje, posición) y los
+    tokens terminan con FIN_ARCHIVO. Los dos errores léxicos (un comentario o una
+    comilla sin cerrar) solo se detectan al llegar al final del código fuente, así
+    que después de ellos no queda nada más que analizar.
+    """
+    try:
+        yield from analizador_lexico.iter_tokens()
+    except SyntaxError as e:
+        errores.append((str(e), e.posicion))
+        yield Token(TipoToken.FIN_ARCHIVO, "", e.posicion)
+
+
+MOTORES_LEXICOS = {
+    'clasico': AnalizadorLexico,
+    'rapido': AnalizadorLexicoRapido,
+}
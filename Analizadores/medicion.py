@@ -0,0 +1,113 @@
+"""
+Medición del tiempo y la memoria de cada fase de una compilación de FlashML
+"""
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from Analizadores.tabla import TablaNodos
+
+# Las métricas se registran en su propio logger para poder activarlas o
+# desviarlas sin cambiar el resto del registro del compilador
+registro_metricas = logging.getLogger('flashml.metricas')
+
+class MedicionFases:
+    """
+    Acumula, por fase, el tiempo real, el tiempo de CPU del hilo y, si tracemalloc
+    está activo (python -X tracemalloc o tracemalloc.start()), el pico de memoria
+    reservada durante la fase por encima de la que había al empezarla. Además
+    guarda contadores (tokens, nodos, bytes...).
+    
+    Una medición inactiva no mide nada: fase() no hace nada y contar() se ignora,
+    de modo que el compilador puede usarla siempre sin coste apreciable.
+    
+    El tiempo de CPU es el del hilo que compila: no incluye el de los procesos
+    que generan fragmentos en paralelo (ver Analizadores/paralelo.py).
+    """
+
+    def __init__(self, activa=True):
+        self.activa = activa
+        self.memoria = activa and tracemalloc.is_tracing()
+        self.fases = {}
+        self.contadores = {}
+        self._inicio = time.perf_counter()
+    
+    @contextmanager
+    def fase(self, nombre):
+        """Mide el bloque como la fase nombre (si ya se midió, se suman los valores)"""
+        if not self.activa:
+            yield
+            return
+        if self.memoria:
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            medida = self.fases.setdefault(nombre, {'segundos': 0.0, 'cpu': 0.0})
+            medida['segundos'] += time.perf_counter() - inicio
+            medida['cpu'] += time.thread_time() - inicio_cpu
+            if self.memoria:
+                pico = tracemalloc.get_traced_memory()[1] - memoria_inicial
+                medida['memoria_pico'] = max(medida.get('memoria_pico', 0), pico)
+    
+    def contar(self, nombre, valor):
+        if self.activa and valor is not None:
+            self.contadores[nombre] = valor
+    
+    def como_dict(self):
+        """Métricas como diccionario serializable en JSON"""
+        return {
+            'segundos': time.perf_counter() - self._inicio,
+            'fases': self.fases,
+            'contadores': self.contadores,
+        }
+    
+    def registrar(self, **campos):
+        """Escribe las métricas (y los campos adicionales) como una sola línea JSON en el logger flashml.metricas"""
+        if registro_metricas.isEnabledFor(logging.INFO):
+            registro_metricas.info(json.dumps(dict(campos, **self.como_dict()), ensure_ascii=False, sort_keys=True))
+
+# Medición compartida para las compilaciones que no piden métricas
+SIN_MEDICION = MedicionFases(activa=False)
+
+def contar_nodos(arbol):
+    """Nodos de un Documento o una TablaNodos (elementos, textos y comentarios, sin contar la raíz)"""
+    if isinstance(arbol, TablaNodos):
+        return len(arbol) - 1
+    nodos = 0
+    pila = list(arbol.hijos)
+    while pila:
+        nodo = pila.pop()
+        nodos += 1
+        pila.extend(getattr(nodo, 'hijos', ()))
+    return nodos
+
+class ContadorTokens:
+    """Iterador que deja pasar los tokens de otro y cuenta cuántos se consumieron"""
+    
+    def __init__(self, tokens):
+        self._tokens = iter(tokens)
+        self.cantidad = 0
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        token = next(self._tokens)
+        self.cantidad += 1
+        return token
+
+def formatear_metricas(metricas):
+    """Tabla legible de las métricas de una compilación, para la salida de --profile"""
+    lineas = [f"{'fase':>14} {'tiempo':>10} {'CPU':>10} {'memoria pico':>13}"]
+    for nombre, medida in metricas['fases'].items():
+        memoria = f"{medida['memoria_pico'] / 1024:10.1f} KB" if 'memoria_pico' in medida else f"{'-':>13}"
+        lineas.append(f"{nombre:>14} {medida['segundos'] * 1000:8.2f}ms {medida['cpu'] * 1000:8.2f}ms {memoria}")
+    lineas.append(f"{'total':>14} {metricas['segundos'] * 1000:8.2f}ms")
+    if metricas['contadores']:
+        lineas.append("   " + ", ".join(f"{nombre}: {valor}" for nombre, valor in metricas['contadores'].items()))
+    return "\n".join(lineas)
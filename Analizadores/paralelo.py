@@ -0,0 +1,101 @@
+"""
+Generación en paralelo del HTML y del JSON intermedio de documentos grandes
+
+El documento se divide en subárboles independientes (por ejemplo, las
+temporadas o episodios de un @velocista) que se generan en procesos
+separados. Los fragmentos obtenidos se pasan a GeneradorHTML.iter_generar y
+a GeneradorIntermedio.iter_json, que los insertan en orden: la salida es
+idéntica byte a byte a la generación secuencial.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from Analizadores.parser import Elemento
+from Analizadores.generator import GeneradorHTML
+from Analizadores.intermedio import GeneradorIntermedio
+
+# Subárboles que se intentan obtener por proceso, para repartir mejor la carga
+SUBARBOLES_POR_PROCESO = 8
+
+# Subárboles del documento que se está generando; los procesos creados con
+# fork los heredan y así no hace falta serializarlos para enviárselos
+_subarboles = None
+
+def dividir_documento(documento, minimo):
+    """
+    Elige los subárboles que se generarán por separado: empieza por los
+    elementos de primer nivel y baja un nivel mientras haya menos de minimo.
+    Devuelve una lista de (elemento, profundidad) en el orden del documento.
+    """
+    frontera = [(hijo, 0) for hijo in documento.hijos if isinstance(hijo, Elemento)]
+    while len(frontera) < minimo:
+        siguiente = []
+        for elemento, profundidad in frontera:
+            hijos = [(hijo, profundidad + 1) for hijo in elemento.hijos if isinstance(hijo, Elemento)]
+            siguiente.extend(hijos if hijos else [(elemento, profundidad)])
+        if len(siguiente) == len(frontera):
+            break
+        frontera = siguiente
+    return frontera
+
+def generar_fragmentos(documento, procesos=None, html=True, json=True, indentar_json=None):
+    """
+    Genera en procesos separados el HTML y/o el JSON de los subárboles del documento.
+    
+    Devuelve (fragmentos_html, fragmentos_json), diccionarios id(elemento) -> texto
+    para el argumento fragmentos de GeneradorHTML.iter_generar/generar_en y de
+    GeneradorIntermedio.iter_json/escribir_json. Si el documento no se puede
+    dividir o procesos es 1, ambos quedan vacíos y la generación es secuencial.
+    """
+    global _subarboles
+    procesos = procesos or os.cpu_count() or 1
+    subarboles = dividir_documento(documento, procesos * SUBARBOLES_POR_PROCESO)
+    if procesos < 2 or len(subarboles) < 2:
+        return {}, {}
+    
+    # Bloques contiguos de subárboles, varios por proceso
+    cantidad_bloques = min(len(subarboles), procesos * SUBARBOLES_POR_PROCESO)
+    limites = [len(subarboles) * k // cantidad_bloques for k in range(cantidad_bloques + 1)]
+    bloques = list(zip(limites, limites[1:]))
+    
+    opciones = (html, json, indentar_json)
+    if 'fork' in multiprocessing.get_all_start_methods():
+        _subarboles = subarboles
+        try:
+            with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context('fork')) as ejecutor:
+                resultados = list(ejecutor.map(_generar_bloque, bloques, [None] * len(bloques), [opciones] * len(bloques)))
+        finally:
+            _subarboles = None
+    else:
+        with ProcessPoolExecutor(procesos) as ejecutor:
+            resultados = list(ejecutor.map(_generar_bloque, bloques, [subarboles[inicio:fin] for inicio, fin in bloques],
+                                           [opciones] * len(bloques)))
+    
+    fragmentos_html = {}
+    fragmentos_json = {}
+    for (inicio, fin), generados in zip(bloques, resultados):
+        for (elemento, _), (texto_html, texto_json) in zip(subarboles[inicio:fin], generados):
+            if html:
+                fragmentos_html[id(elemento)] = texto_html
+            if json:
+                fragmentos_json[id(elemento)] = texto_json
+    return fragmentos_html, fragmentos_json
+
+def _generar_bloque(limites, subarboles, opciones):
+    """Se ejecuta en cada proceso: genera el HTML y el JSON de un bloque de subárboles"""
+    html, json, indentar_json = opciones
+    if subarboles is None:
+        inicio, fin = limites
+        subarboles = _subarboles[inicio:fin]
+    
+    generador_html = GeneradorHTML()
+    generador_json = GeneradorIntermedio()
+    generados = []
+    for elemento, profundidad in subarboles:
+        # La indentación HTML de un elemento es su profundidad; en el JSON, cada nivel ocupa dos
+        texto_html = "".join(generador_html._iter_nodo(elemento, profundidad)) if html else None
+        texto_json = "".join(generador_json._iter_partes_json(elemento, generador_json._describir, indentar_json,
+                                                              2 * (profundidad + 1))) if json else None
+        generados.append((texto_html, texto_json))
+    return generados
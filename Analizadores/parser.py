@@ -1,38 +1,80 @@
 """
 Analizador sintáctico y constructor del AST para FlashML
 """
+import sys
+
 from Analizadores.lexer import TipoToken
 
+class AtributosVacios(dict):
+    """
+    Mapeo de atributos vacío e inmutable, compartido por todos los elementos
+    que no tienen atributos para no reservar un diccionario por elemento
+    """
+    __slots__ = ()
+    
+    def _inmutable(self, *args, **kwargs):
+        raise TypeError("Los atributos compartidos son inmutables; usa Elemento.agregar_atributo")
+    
+    __setitem__ = __delitem__ = __ior__ = _inmutable
+    setdefault = update = pop = popitem = clear = _inmutable
+    
+    def __reduce__(self):
+        # Al copiar o serializar se conserva la instancia compartida
+        return 'SIN_ATRIBUTOS'
+
+SIN_ATRIBUTOS = AtributosVacios()
+SIN_HIJOS = ()
+
 class NodoAST:
     """Clase base para los nodos del AST"""
-    def __init__(self):
-        pass
+    __slots__ = ()
     
     def __str__(self):
         return self.__class__.__name__
 
 class Documento(NodoAST):
+    __slots__ = ('hijos',)
+    
     def __init__(self):
-        super().__init__()
         self.hijos = []
     
+    def agregar_hijo(self, nodo):
+        self.hijos.append(nodo)
+    
     def __str__(self):
         return f"Documento({len(self.hijos)} hijos)"
 
 class Elemento(NodoAST):
+    """
+    Elemento del AST. Los elementos sin atributos o sin hijos comparten
+    SIN_ATRIBUTOS y SIN_HIJOS; el diccionario y la lista propios se crean
+    al agregar el primer atributo o hijo.
+    """
+    __slots__ = ('nombre_etiqueta', 'atributos', 'hijos')
+    
     def __init__(self, nombre_etiqueta):
-        super().__init__()
-        self.nombre_etiqueta = nombre_etiqueta
-        self.atributos = {}
-        self.hijos = []
+        self.nombre_etiqueta = sys.intern(nombre_etiqueta)
+        self.atributos = SIN_ATRIBUTOS
+        self.hijos = SIN_HIJOS
+    
+    def agregar_atributo(self, nombre, valor):
+        if self.atributos is SIN_ATRIBUTOS:
+            self.atributos = {}
+        self.atributos[sys.intern(nombre)] = valor
+    
+    def agregar_hijo(self, nodo):
+        if self.hijos is SIN_HIJOS:
+            self.hijos = []
+        self.hijos.append(nodo)
     
     def __str__(self):
         attrs = ", ".join([f"{k}='{v}'" for k, v in self.atributos.items()])
         return f"Elemento({self.nombre_etiqueta}, atributos=[{attrs}], {len(self.hijos)} hijos)"
 
 class NodoTexto(NodoAST):
+    __slots__ = ('texto',)
+    
     def __init__(self, texto):
-        super().__init__()
         self.texto = texto
     
     def __str__(self):
@@ -41,8 +83,9 @@ class NodoTexto(NodoAST):
         return f"NodoTexto('{self.texto}')"
 
 class NodoComentario(NodoAST):
+    __slots__ = ('texto',)
+    
     def __init__(self, texto):
-        super().__init__()
         self.texto = texto
     
     def __str__(self):
@@ -50,16 +93,40 @@ class NodoComentario(NodoAST):
             return f"NodoComentario('{self.texto[:17]}...')"
         return f"NodoComentario('{self.texto}')"
 
+# Tokens con los que puede empezar un nodo; los demás solo aparecen dentro de una etiqueta o la cierran
+INICIO_NODO = frozenset((TipoToken.ETIQUETA_APERTURA, TipoToken.TEXTO, TipoToken.COMENTARIO))
+
 class AnalizadorSintactico:
+    """
+    Construye el AST a partir de una lista de tokens o, en modo flujo, de
+    cualquier iterable de tokens (por ejemplo AnalizadorLexico.iter_tokens()).
+    En modo flujo solo se retiene el token actual, de modo que el análisis
+    léxico y el sintáctico se intercalan sin materializar la lista completa.
     
-    def __init__(self, tokens):
-        self.tokens = tokens
+    Con recuperar=True el análisis no se detiene en el primer error: cada error
+    se anota en errores como (mensaje, posición) y el análisis continúa (ver
+    _analizar_elemento_recuperando), de modo que una sola pasada informa de
+    todos los errores y devuelve un AST parcial.
+    """
+    
+    def __init__(self, tokens, recuperar=False):
+        self.recuperar = recuperar
+        self.errores = []
         self.indice_token_actual = 0
-        self.token_actual = self.tokens[0] if tokens else None
+        if isinstance(tokens, list):
+            self.tokens = tokens
+            self._flujo = None
+            self.token_actual = self.tokens[0] if tokens else None
+        else:
+            self.tokens = None
+            self._flujo = iter(tokens)
+            self.token_actual = next(self._flujo, None)
     
     def avanzar(self):
         self.indice_token_actual += 1
-        if self.indice_token_actual < len(self.tokens):
+        if self._flujo is not None:
+            self.token_actual = next(self._flujo, None)
+        elif self.indice_token_actual < len(self.tokens):
             self.token_actual = self.tokens[self.indice_token_actual]
         else:
             self.token_actual = None
@@ -78,9 +145,12 @@ class AnalizadorSintactico:
         documento = Documento()
         
         while self.token_actual and self.token_actual.tipo != TipoToken.FIN_ARCHIVO:
+            if self.recuperar and self.token_actual.tipo not in INICIO_NODO:
+                self._descartar()
+                continue
             nodo = self.analizar_nodo()
             if nodo:
-                documento.hijos.append(nodo)
+                documento.agregar_hijo(nodo)
         
         return documento
     
@@ -98,26 +168,125 @@ class AnalizadorSintactico:
             raise SyntaxError(f"Token inesperado: {self.token_actual}")
     
     def analizar_elemento(self):
+        """
+        Analiza un elemento y todo su contenido. Los elementos anidados se
+        procesan con una pila explícita, sin recursión, de modo que la
+        profundidad de anidamiento no está limitada por la pila de Python.
+        """
+        if self.recuperar:
+            return self._analizar_elemento_recuperando()
+        
+        raiz = self._abrir_elemento()
+        pila = [raiz]
+        
+        while pila:
+            elemento = pila[-1]
+            
+            # Al encontrar la etiqueta de cierre, el elemento queda completo
+            if not self.token_actual or (self.token_actual.tipo == TipoToken.ETIQUETA_CIERRE and self.token_actual.valor == elemento.nombre_etiqueta):
+                self.consumir(TipoToken.ETIQUETA_CIERRE)
+                pila.pop()
+                continue
+            
+            if self.token_actual.tipo == TipoToken.FIN_ARCHIVO:
+                raise SyntaxError(f"Etiqueta de cierre faltante para {elemento.nombre_etiqueta}")
+            
+            if self.token_actual.tipo == TipoToken.ETIQUETA_APERTURA:
+                hijo = self._abrir_elemento()
+                elemento.agregar_hijo(hijo)
+                pila.append(hijo)
+            else:
+                nodo = self.analizar_nodo()
+                if nodo:
+                    elemento.agregar_hijo(nodo)
         
+        return raiz
+    
+    def _abrir_elemento(self):
+        """Consume la etiqueta de apertura y los atributos de un elemento"""
         token = self.consumir(TipoToken.ETIQUETA_APERTURA)
         elemento = Elemento(token.valor)
         
         # Analizar atributos si hay alguno
         while self.token_actual and self.token_actual.tipo == TipoToken.NOMBRE_ATRIBUTO:
             nombre_atributo = self.consumir(TipoToken.NOMBRE_ATRIBUTO).valor
+            if self.recuperar and (not self.token_actual or self.token_actual.tipo != TipoToken.VALOR_ATRIBUTO):
+                # El atributo sin valor se omite y el elemento se analiza igualmente
+                posicion = self.token_actual.posicion if self.token_actual else None
+                self._anotar(f"falta el valor del atributo '{nombre_atributo}' de {elemento.nombre_etiqueta} en la posición {posicion}", posicion)
+                continue
             valor_atributo = self.consumir(TipoToken.VALOR_ATRIBUTO).valor
-            elemento.atributos[nombre_atributo] = valor_atributo
+            elemento.agregar_atributo(nombre_atributo, valor_atributo)
         
-        # Analizar contenido del elemento hasta encontrar la etiqueta de cierre
-        while self.token_actual and not (self.token_actual.tipo == TipoToken.ETIQUETA_CIERRE and self.token_actual.valor == elemento.nombre_etiqueta):
-            if self.token_actual.tipo == TipoToken.FIN_ARCHIVO:
-                raise SyntaxError(f"Etiqueta de cierre faltante para {elemento.nombre_etiqueta}")
-            
-            nodo = self.analizar_nodo()
-            if nodo:
-                elemento.hijos.append(nodo)
+        return elemento
+    
+    def _analizar_elemento_recuperando(self):
+        """
+        analizar_elemento en modo recuperación. Se sincroniza en las etiquetas de cierre:
+        una que cierra un elemento abierto más arriba en la pila cierra automáticamente los
+        que quedaron abiertos dentro de él, y una que no corresponde a ningún elemento
+        abierto se descarta. Al llegar al final del archivo se cierran todos los elementos
+        abiertos. Cada cierre automático se anota como error en la posición de la apertura.
+        """
+        aperturas = [self.token_actual.posicion]
+        raiz = self._abrir_elemento()
+        pila = [raiz]
         
+        while pila:
+            token = self.token_actual
+            
+            if not token or token.tipo == TipoToken.FIN_ARCHIVO:
+                self._cerrar_automaticamente(pila, aperturas, 0)
+                break
+            
+            if token.tipo == TipoToken.ETIQUETA_CIERRE:
+                # Elemento abierto más cercano con ese nombre
+                nivel = len(pila) - 1
+                while nivel >= 0 and pila[nivel].nombre_etiqueta != token.valor:
+                    nivel -= 1
+                if nivel < 0:
+                    self._descartar()
+                    continue
+                self._cerrar_automaticamente(pila, aperturas, nivel + 1)
+                pila.pop()
+                aperturas.pop()
+                self.avanzar()
+            elif token.tipo == TipoToken.ETIQUETA_APERTURA:
+                aperturas.append(token.posicion)
+                hijo = self._abrir_elemento()
+                pila[-1].agregar_hijo(hijo)
+                pila.append(hijo)
+            elif token.tipo in INICIO_NODO:
+                pila[-1].agregar_hijo(self.analizar_nodo())
+            else:
+                self._descartar()
         
-        self.consumir(TipoToken.ETIQUETA_CIERRE)
+        return raiz
+    
+    def _cerrar_automaticamente(self, pila, aperturas, nivel):
+        """Cierra los elementos de la pila desde nivel hasta la cima, anotando un error por cada uno"""
+        for elemento, posicion in zip(pila[nivel:], aperturas[nivel:]):
+            self._anotar(f"etiqueta de cierre faltante para {elemento.nombre_etiqueta}, abierta en la posición {posicion}", posicion)
+        del pila[nivel:]
+        del aperturas[nivel:]
+    
+    def _descartar(self):
+        """
+        Modo pánico: anota un error por el token actual, que no puede aparecer en este
+        lugar, y lo descarta. Una etiqueta de cierre se descarta sola; un atributo fuera
+        de una etiqueta de apertura se descarta junto con los atributos que lo siguen,
+        hasta el siguiente token con el que puede empezar un nodo o cerrarse un elemento.
+        """
+        token = self.token_actual
+        if token.tipo == TipoToken.ETIQUETA_CIERRE:
+            self._anotar(f"etiqueta de cierre {token.valor} sin su etiqueta de apertura en la posición {token.posicion}", token.posicion)
+            self.avanzar()
+            return
         
-        return elemento
+        self._anotar(f"{token.tipo.name} inesperado ('{token.valor}') en la posición {token.posicion}", token.posicion)
+        self.avanzar()
+        while self.token_actual and self.token_actual.tipo in (TipoToken.NOMBRE_ATRIBUTO, TipoToken.VALOR_ATRIBUTO):
+            self.avanzar()
+    
+    def _anotar(self, mensaje, posicion):
+        self.errores.append((mensaje, posicion))
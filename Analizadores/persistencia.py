@@ -0,0 +1,105 @@
+"""
+Escritura en disco de los resultados de la compilación
+
+Cada archivo se escribe primero en un temporal del mismo directorio y
+después se renombra con os.replace: quien lea la ruta verá el archivo
+anterior o el nuevo completo, nunca uno a medio escribir.
+"""
+import contextlib
+import gzip
+import hashlib
+import os
+import uuid
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Caracteres hexadecimales del SHA-256 que forman el nombre de los archivos guardados por contenido
+LONGITUD_HASH = 32
+
+# Por debajo de este tamaño (en bytes) no compensa guardar versiones comprimidas
+TAMANO_MINIMO_COMPRESION = 1024
+
+# Sufijos de las versiones precomprimidas que puede tener un archivo guardado por contenido
+SUFIJOS_COMPRIMIDOS = ('.br', '.gz')
+
+def _comprimir_gzip(datos):
+    # mtime=0 para que el mismo contenido produzca siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+def _comprimir_brotli(datos):
+    return brotli.compress(datos, quality=11)
+
+# Compresiones disponibles, en orden de preferencia: sufijo -> (Content-Encoding, función)
+COMPRESIONES = {}
+if brotli is not None:
+    COMPRESIONES['.br'] = ('br', _comprimir_brotli)
+COMPRESIONES['.gz'] = ('gzip', _comprimir_gzip)
+
+@contextlib.contextmanager
+def archivo_atomico(ruta, modo='w', sincronizar=False):
+    """
+    Abre para escribir ('w' o 'wb') un archivo temporal junto a ruta. Si el bloque
+    termina sin errores lo renombra a ruta; si no, lo borra y ruta no cambia.
+    Con sincronizar=True fuerza la escritura en disco (fsync) antes del renombrado.
+    """
+    directorio, nombre = os.path.split(os.path.abspath(ruta))
+    temporal = os.path.join(directorio, f".{nombre}.{uuid.uuid4().hex[:8]}.tmp")
+    binario = 'b' in modo
+    try:
+        # 'x' en lugar de mkstemp para que el archivo reciba los permisos habituales (umask)
+        with open(temporal, 'xb' if binario else 'x', encoding=None if binario else 'utf-8') as f:
+            yield f
+            if sincronizar:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporal)
+        raise
+
+def escribir_atomico(ruta, contenido, sincronizar=False):
+    """Escribe contenido (str en UTF-8, o bytes) en ruta de forma atómica"""
+    with archivo_atomico(ruta, 'wb' if isinstance(contenido, bytes) else 'w', sincronizar) as f:
+        f.write(contenido)
+
+def guardar_resultado(resultado, archivo_salida, archivo_intermedio=None, sincronizar=False):
+    """
+    Guarda el HTML de un resultado de compilar_en_memoria y, si se indica
+    archivo_intermedio, también su código intermedio. Si la compilación tuvo
+    errores no escribe nada. Devuelve la lista de rutas escritas.
+    """
+    if resultado['errores']:
+        return []
+    
+    escritas = []
+    if archivo_intermedio:
+        escribir_atomico(archivo_intermedio, resultado['intermedio'], sincronizar)
+        escritas.append(archivo_intermedio)
+    escribir_atomico(archivo_salida, resultado['html'], sincronizar)
+    escritas.append(archivo_salida)
+    return escritas
+
+def guardar_por_contenido(directorio, contenido, extension, comprimir=False, prefijo=''):
+    """
+    Guarda contenido (str en UTF-8, o bytes) en directorio de forma atómica, con
+    un nombre formado por el prefijo, su hash SHA-256 y la extensión. Si ya existe un archivo
+    con ese nombre no se vuelve a escribir: solo se actualiza su fecha de
+    modificación. Con comprimir=True guarda además junto a él sus versiones
+    comprimidas (ver COMPRESIONES) para servirlas sin comprimir en cada petición.
+    Devuelve la ruta del archivo.
+    """
+    datos = contenido if isinstance(contenido, bytes) else contenido.encode('utf-8')
+    ruta = os.path.join(directorio, prefijo + hashlib.sha256(datos).hexdigest()[:LONGITUD_HASH] + extension)
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        # Las versiones comprimidas se escriben antes: si el archivo existe, ellas también
+        if comprimir and len(datos) >= TAMANO_MINIMO_COMPRESION:
+            for sufijo, (_, compresor) in COMPRESIONES.items():
+                escribir_atomico(ruta + sufijo, compresor(datos))
+        escribir_atomico(ruta, datos)
+    return ruta
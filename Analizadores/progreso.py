@@ -0,0 +1,102 @@
+"""
+Salida de progreso y registro (logging) del compilador FlashML
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+FORMATO_REGISTRO = '%(asctime)s - %(levelname)s - %(message)s'
+
+class Progreso:
+    """
+    Recibe los eventos de una compilación (inicio, fases, resultados, errores).
+    Cada evento tiene un tipo y datos con nombre; esta clase base los descarta,
+    así que también sirve como salida silenciosa.
+    """
+
+    def evento(self, tipo, **datos):
+        pass
+
+class ProgresoSilencioso(Progreso):
+    """No muestra nada: para el servidor web, los lotes y el uso como biblioteca"""
+
+class ProgresoHumano(Progreso):
+    """Muestra los mensajes de progreso del compilador en la terminal"""
+
+    MENSAJES = {
+        'inicio': "Compilando {archivo}...",
+        'fase': "{numero}. {nombre}...",
+        'tokens_en_tabla': "   Los tokens se analizarán junto con la construcción de la tabla de nodos.",
+        'tokens_en_flujo': "   Los tokens se producirán en flujo durante el análisis sintáctico.",
+        'tokens': "   Se encontraron {cantidad} tokens.",
+        'ast': "   Árbol de sintaxis abstracta (AST) construido correctamente.",
+        'ast_parcial': "   Se construyó un AST parcial; el análisis continúa para informar de todos los errores.",
+        'semantico_correcto': "   No se encontraron errores semánticos.",
+        'intermedio_guardado': "   Código intermedio guardado en {ruta}",
+        'completado': "Compilación completada. Resultado guardado en {ruta}",
+        'cache': "Compilando {archivo}... resultado recuperado de la caché.",
+        'error': "{mensaje}",
+    }
+    LISTAS_ERRORES = {
+        'errores_sintacticos': "   Se encontraron errores léxicos o sintácticos:",
+        'errores_semanticos': "   Se encontraron errores semánticos:",
+    }
+    
+    def __init__(self, flujo=None):
+        # Sin flujo se escribe en el sys.stdout del momento, que puede haberse redirigido
+        self.flujo = flujo
+    
+    def evento(self, tipo, **datos):
+        flujo = self.flujo or sys.stdout
+        if tipo in self.LISTAS_ERRORES:
+            print(self.LISTAS_ERRORES[tipo], file=flujo)
+            for error in datos['errores']:
+                print(f"   - {error}", file=flujo)
+        elif tipo in self.MENSAJES:
+            print(self.MENSAJES[tipo].format(**datos), file=flujo)
+
+class ProgresoJSON(Progreso):
+    """Escribe cada evento como una línea JSON: {"evento": tipo, ...datos}"""
+
+    def __init__(self, flujo=None):
+        self.flujo = flujo
+    
+    def evento(self, tipo, **datos):
+        print(json.dumps(dict(datos, evento=tipo), ensure_ascii=False), file=self.flujo or sys.stdout, flush=True)
+
+MODOS_PROGRESO = {
+    'silencioso': ProgresoSilencioso,
+    'humano': ProgresoHumano,
+    'json': ProgresoJSON,
+}
+
+# Instancia compartida para las compilaciones que no muestran progreso
+SILENCIOSO = ProgresoSilencioso()
+
+def configurar_registro(archivo='compilador_flashml.log', nivel=logging.INFO, en_cola=False):
+    """
+    Configura el registro del proceso en un archivo. Lo llaman los programas
+    (main.py, app.py), nunca los módulos al importarse.
+    
+    Con en_cola=True los mensajes se dejan en una cola y un hilo aparte los
+    escribe en el archivo, de modo que quien registra no espera a la escritura
+    (para el servidor web). Devuelve el QueueListener en ese caso, o None.
+    """
+    manejador = logging.FileHandler(archivo, encoding='utf-8')
+    manejador.setFormatter(logging.Formatter(FORMATO_REGISTRO))
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    if not en_cola:
+        raiz.addHandler(manejador)
+        return None
+    
+    cola = queue.SimpleQueue()
+    raiz.addHandler(logging.handlers.QueueHandler(cola))
+    oyente = logging.handlers.QueueListener(cola, manejador, respect_handler_level=True)
+    oyente.start()
+    # Al salir se escriben los mensajes que queden en la cola
+    atexit.register(oyente.stop)
+    return oyente
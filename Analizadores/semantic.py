@@ -2,88 +2,165 @@
 Analizador semántico para FlashML
 """
 from Analizadores.parser import Elemento, NodoTexto, NodoComentario, Documento
+from Analizadores.tabla import NODO_ELEMENTO
+
+# Dónde se permite cada etiqueta ('permitido_en', None = en cualquier lugar) y qué atributos admite
+ETIQUETAS_PERMITIDAS = {
+    'velocista': {'permitido_en': None, 'requerido': [], 'opcional': ['titulo', 'episodio', 'escena', 'personaje', 'poder', 'imagen', 'villanos', 'lugar', 'equipo']},
+    'titulo': {'permitido_en': ['velocista', 'episodio'], 'requerido': [], 'opcional': []},
+    'episodio': {'permitido_en': ['velocista', 'temporada'], 'requerido': [], 'opcional': ['titulo', 'escena', 'personaje', 'poder', 'imagen', 'villanos', 'lugar', 'equipo']},
+    'temporada': {'permitido_en': ['velocista'], 'requerido': ['numero'], 'opcional': ['episodio', 'titulo']},
+    'escena': {'permitido_en': ['velocista', 'episodio'], 'requerido': [], 'opcional': ['personaje', 'dialogo', 'accion', 'poder', 'superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']},
+    'personaje': {'permitido_en': ['velocista', 'episodio', 'escena', 'lugar', 'equipo'], 'requerido': ['nombre'], 'opcional': ['actor', 'poder']},  # Added lugar, equipo
+    'poder': {'permitido_en': ['velocista', 'episodio', 'escena', 'personaje'], 'requerido': [], 'opcional': []},
+    'dialogo': {'permitido_en': ['escena', 'personaje'], 'requerido': [], 'opcional': ['rapido', 'superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']},
+    'rapido': {'permitido_en': ['dialogo'], 'requerido': [], 'opcional': []},
+    'accion': {'permitido_en': ['escena', 'personaje'], 'requerido': [], 'opcional': ['velocidad', 'superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']},  # Added power tags
+    'imagen': {'permitido_en': ['velocista', 'episodio', 'personaje'], 'requerido': ['src'], 'opcional': ['alt']},
+    'villanos': {'permitido_en': ['velocista', 'episodio'], 'requerido': [], 'opcional': ['villano']},
+    'villano': {'permitido_en': ['villanos'], 'requerido': ['nombre'], 'opcional': ['poder']},
+    'superspeed': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []}, 
+    'phasing': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},     
+    'cryokinesis': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []}, 
+    'vibration': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},   
+    'timetravel': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},  
+    'speedforce': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},  
+    'metahuman': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},   
+    'lugar': {'permitido_en': ['velocista', 'episodio', 'escena'], 'requerido': ['nombre'], 'opcional': ['personaje']},  
+    'equipo': {'permitido_en': ['velocista', 'episodio', 'escena'], 'requerido': ['nombre'], 'opcional': ['personaje']}   
+}
+
+class EsquemaEtiqueta:
+    """
+    Reglas de una etiqueta compiladas para validarla con pocas operaciones: bit
+    identifica a la etiqueta, padres es la máscara de bits de las etiquetas dentro
+    de las que se permite, requeridos conserva el orden de la tabla para los
+    mensajes y validos es el conjunto de atributos admitidos.
+    """
+    __slots__ = ('nombre', 'bit', 'padres', 'requeridos', 'validos')
+    
+    def __init__(self, nombre, bit, padres, requeridos, validos):
+        self.nombre = nombre
+        self.bit = bit
+        self.padres = padres
+        self.requeridos = requeridos
+        self.validos = validos
+
+def compilar_esquema(etiquetas_permitidas):
+    """Convierte una tabla como ETIQUETAS_PERMITIDAS en un diccionario nombre -> EsquemaEtiqueta"""
+    bits = {nombre: 1 << posicion for posicion, nombre in enumerate(etiquetas_permitidas)}
+    todas = (1 << len(bits)) - 1
+    esquema = {}
+    for nombre, info in etiquetas_permitidas.items():
+        if info['permitido_en']:
+            padres = 0
+            for padre in info['permitido_en']:
+                padres |= bits.get(padre, 0)
+        else:
+            padres = todas
+        esquema[nombre] = EsquemaEtiqueta(nombre, bits[nombre], padres, tuple(info['requerido']),
+                                          frozenset(info['requerido'] + info['opcional']))
+    return esquema
+
+# Se compila una sola vez, al importar el módulo
+ESQUEMA = compilar_esquema(ETIQUETAS_PERMITIDAS)
 
 class AnalizadorSemantico:
     """
-    Realiza el análisis semántico del AST para encontrar errores y validar la estructura
+    Realiza el análisis semántico del AST para encontrar errores y validar la estructura.
+    Cada análisis guarda su estado en variables locales, así que una misma instancia
+    se puede reutilizar y compartir entre hilos.
     """
     
     def __init__(self):
-        self.etiquetas_permitidas = {
-            'velocista': {'permitido_en': None, 'requerido': [], 'opcional': ['titulo', 'episodio', 'escena', 'personaje', 'poder', 'imagen', 'villanos', 'lugar', 'equipo']},
-            'titulo': {'permitido_en': ['velocista', 'episodio'], 'requerido': [], 'opcional': []},
-            'episodio': {'permitido_en': ['velocista', 'temporada'], 'requerido': [], 'opcional': ['titulo', 'escena', 'personaje', 'poder', 'imagen', 'villanos', 'lugar', 'equipo']},
-            'temporada': {'permitido_en': ['velocista'], 'requerido': ['numero'], 'opcional': ['episodio', 'titulo']},
-            'escena': {'permitido_en': ['velocista', 'episodio'], 'requerido': [], 'opcional': ['personaje', 'dialogo', 'accion', 'poder', 'superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']},
-            'personaje': {'permitido_en': ['velocista', 'episodio', 'escena', 'lugar', 'equipo'], 'requerido': ['nombre'], 'opcional': ['actor', 'poder']},  # Added lugar, equipo
-            'poder': {'permitido_en': ['velocista', 'episodio', 'escena', 'personaje'], 'requerido': [], 'opcional': []},
-            'dialogo': {'permitido_en': ['escena', 'personaje'], 'requerido': [], 'opcional': ['rapido', 'superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']},
-            'rapido': {'permitido_en': ['dialogo'], 'requerido': [], 'opcional': []},
-            'accion': {'permitido_en': ['escena', 'personaje'], 'requerido': [], 'opcional': ['velocidad', 'superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']},  # Added power tags
-            'imagen': {'permitido_en': ['velocista', 'episodio', 'personaje'], 'requerido': ['src'], 'opcional': ['alt']},
-            'villanos': {'permitido_en': ['velocista', 'episodio'], 'requerido': [], 'opcional': ['villano']},
-            'villano': {'permitido_en': ['villanos'], 'requerido': ['nombre'], 'opcional': ['poder']},
-            'superspeed': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []}, 
-            'phasing': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},     
-            'cryokinesis': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []}, 
-            'vibration': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},   
-            'timetravel': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},  
-            'speedforce': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},  
-            'metahuman': {'permitido_en': ['dialogo', 'escena', 'personaje', 'accion'], 'requerido': [], 'opcional': []},   
-            'lugar': {'permitido_en': ['velocista', 'episodio', 'escena'], 'requerido': ['nombre'], 'opcional': ['personaje']},  
-            'equipo': {'permitido_en': ['velocista', 'episodio', 'escena'], 'requerido': ['nombre'], 'opcional': ['personaje']}   
-        }
-        
+        self.etiquetas_permitidas = ETIQUETAS_PERMITIDAS
+        self.esquema = ESQUEMA
         self.errores = []
     
     def analizar(self, ast):
         
-        self.errores = []
-        self._analizar_nodo(ast, None)
-        return self.errores
+        errores = []
+        self._analizar_nodo(ast, None, errores)
+        self.errores = errores
+        return errores
     
-    def _analizar_nodo(self, nodo, etiqueta_padre):
-        """Analiza un nodo y sus hijos recursivamente"""
-        if isinstance(nodo, Documento):
-            
-            tiene_velocista = False
-            for hijo in nodo.hijos:
-                if isinstance(hijo, Elemento) and hijo.nombre_etiqueta == 'velocista':
-                    tiene_velocista = True
-                    break
-            
-            if not tiene_velocista:
-                self.errores.append("Error semántico: se requiere un elemento raíz 'velocista'")
-            
-            
-            for hijo in nodo.hijos:
-                self._analizar_nodo(hijo, None)
+    def analizar_tabla(self, tabla):
+        """Realiza el mismo análisis que analizar() directamente sobre una TablaNodos"""
+        errores = []
         
-        elif isinstance(nodo, Elemento):
-            # Verificar que la etiqueta sea válida
-            if nodo.nombre_etiqueta not in self.etiquetas_permitidas:
-                self.errores.append(f"Error semántico: etiqueta desconocida '{nodo.nombre_etiqueta}'")
-                return
-            
-            # Verificar que la etiqueta sea permitida en el contexto actual
-            info_etiqueta = self.etiquetas_permitidas[nodo.nombre_etiqueta]
-            if etiqueta_padre and info_etiqueta['permitido_en'] and etiqueta_padre not in info_etiqueta['permitido_en']:
-                self.errores.append(f"Error semántico: '{nodo.nombre_etiqueta}' no está permitido dentro de '{etiqueta_padre}'")
-            
-            # Verificar atributos requeridos
-            for atributo_requerido in info_etiqueta['requerido']:
-                if atributo_requerido not in nodo.atributos:
-                    self.errores.append(f"Error semántico: el atributo '{atributo_requerido}' es requerido en '{nodo.nombre_etiqueta}'")
+        hijos_raiz = list(tabla.hijos(0))
+        if not any(tabla.tipo[hijo] == NODO_ELEMENTO and tabla.nombre_etiqueta(hijo) == 'velocista' for hijo in hijos_raiz):
+            errores.append("Error semántico: se requiere un elemento raíz 'velocista'")
+        
+        pila = [(hijo, None) for hijo in reversed(hijos_raiz)]
+        while pila:
+            indice, padre = pila.pop()
+            if tabla.tipo[indice] != NODO_ELEMENTO:
+                continue
+            esquema = self._validar_elemento(tabla.nombre_etiqueta(indice), tabla.nombres_atributos(indice), padre, errores)
+            if esquema is not None:
+                pila.extend((hijo, esquema) for hijo in reversed(list(tabla.hijos(indice))))
+        
+        self.errores = errores
+        return errores
+    
+    def _validar_elemento(self, nombre_etiqueta, atributos, padre, errores):
+        """
+        Valida un elemento dado su nombre, los nombres de sus atributos y el EsquemaEtiqueta de
+        su padre (None en el nivel superior), agregando los errores a la lista errores.
+        Devuelve el esquema del elemento, o None si la etiqueta es desconocida y sus hijos
+        no deben analizarse.
+        """
+        # Verificar que la etiqueta sea válida
+        esquema = self.esquema.get(nombre_etiqueta)
+        if esquema is None:
+            errores.append(f"Error semántico: etiqueta desconocida '{nombre_etiqueta}'")
+            return None
+        
+        # Verificar que la etiqueta sea permitida en el contexto actual
+        if padre is not None and not esquema.padres & padre.bit:
+            errores.append(f"Error semántico: '{nombre_etiqueta}' no está permitido dentro de '{padre.nombre}'")
+        
+        # Verificar atributos requeridos
+        for atributo_requerido in esquema.requeridos:
+            if atributo_requerido not in atributos:
+                errores.append(f"Error semántico: el atributo '{atributo_requerido}' es requerido en '{nombre_etiqueta}'")
+        
+        # Verificar atributos no permitidos
+        validos = esquema.validos
+        for atributo in atributos:
+            if atributo not in validos:
+                errores.append(f"Error semántico: el atributo '{atributo}' no está permitido en '{nombre_etiqueta}'")
+        
+        return esquema
+    
+    def _analizar_nodo(self, nodo, padre, errores):
+        """
+        Analiza un nodo y sus descendientes en preorden, con una pila explícita en lugar de recursión.
+        padre es el EsquemaEtiqueta del elemento que lo contiene, o None.
+        """
+        pila = [(nodo, padre)]
+        
+        while pila:
+            nodo, padre = pila.pop()
             
-            # Verificar atributos no permitidos
-            atributos_validos = info_etiqueta['requerido'] + info_etiqueta['opcional']
-            for atributo in nodo.atributos:
-                if atributo not in atributos_validos:
-                    self.errores.append(f"Error semántico: el atributo '{atributo}' no está permitido en '{nodo.nombre_etiqueta}'")
+            if isinstance(nodo, Elemento):
+                esquema = self._validar_elemento(nodo.nombre_etiqueta, nodo.atributos, padre, errores)
+                if esquema is not None:
+                    pila.extend((hijo, esquema) for hijo in reversed(nodo.hijos))
             
+            elif isinstance(nodo, Documento):
+                
+                tiene_velocista = False
+                for hijo in nodo.hijos:
+                    if isinstance(hijo, Elemento) and hijo.nombre_etiqueta == 'velocista':
+                        tiene_velocista = True
+                        break
+                
+                if not tiene_velocista:
+                    errores.append("Error semántico: se requiere un elemento raíz 'velocista'")
+                
+                pila.extend((hijo, None) for hijo in reversed(nodo.hijos))
             
-            for hijo in nodo.hijos:
-                self._analizar_nodo(hijo, nodo.nombre_etiqueta)
-        
-        elif isinstance(nodo, NodoTexto) or isinstance(nodo, NodoComentario):
-            pass
\ No newline at end of file
+            elif isinstance(nodo, NodoTexto) or isinstance(nodo, NodoComentario):
+                pass
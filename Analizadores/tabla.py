@@ -0,0 +1,180 @@
+"""
+Representación plana del AST de FlashML ("tabla de nodos")
+
+Los nodos se guardan en arreglos paralelos de enteros en lugar de objetos:
+tipo, etiqueta, primer hijo, siguiente hermano y un par (inicio, longitud).
+Los textos, comentarios y valores de atributos no se copian: son cortes del
+código fuente original que se extraen solo cuando se necesitan.
+"""
+from array import array
+
+from Analizadores.lexer import AnalizadorLexicoRapido, TipoToken, Token
+
+NODO_DOCUMENTO = 0
+NODO_ELEMENTO = 1
+NODO_TEXTO = 2
+NODO_COMENTARIO = 3
+
+SIN_NODO = -1
+
+class TablaNodos:
+    """
+    AST almacenado en arreglos paralelos indexados por número de nodo.
+
+    El nodo 0 es siempre el documento. Para textos y comentarios, inicio y
+    longitud delimitan su contenido en el código fuente; para elementos
+    delimitan su rango en los arreglos de atributos. Los nombres de etiquetas
+    y de atributos se guardan una sola vez en la tabla de nombres.
+    """
+
+    def __init__(self, fuente):
+        self.fuente = fuente
+        self.tipo = array('b')
+        self.etiqueta = array('i')
+        self.primer_hijo = array('i')
+        self.siguiente_hermano = array('i')
+        self.inicio = array('i')
+        self.longitud = array('i')
+
+        self.atributo_nombre = array('i')
+        self.atributo_inicio = array('i')
+        self.atributo_longitud = array('i')
+
+        self.nombres = []
+        self._ids_nombres = {}
+
+    def __len__(self):
+        return len(self.tipo)
+
+    def id_nombre(self, nombre):
+        """Devuelve el identificador de un nombre en la tabla de nombres, añadiéndolo si no existe"""
+        identificador = self._ids_nombres.get(nombre)
+        if identificador is None:
+            identificador = len(self.nombres)
+            self.nombres.append(nombre)
+            self._ids_nombres[nombre] = identificador
+        return identificador
+
+    def agregar_nodo(self, tipo, etiqueta=SIN_NODO, inicio=0, longitud=0):
+        indice = len(self.tipo)
+        self.tipo.append(tipo)
+        self.etiqueta.append(etiqueta)
+        self.primer_hijo.append(SIN_NODO)
+        self.siguiente_hermano.append(SIN_NODO)
+        self.inicio.append(inicio)
+        self.longitud.append(longitud)
+        return indice
+
+    def hijos(self, indice):
+        """Itera los índices de los hijos de un nodo en orden"""
+        hijo = self.primer_hijo[indice]
+        while hijo != SIN_NODO:
+            yield hijo
+            hijo = self.siguiente_hermano[hijo]
+
+    def nombre_etiqueta(self, indice):
+        return self.nombres[self.etiqueta[indice]]
+
+    def texto(self, indice):
+        """Contenido de un nodo de texto o comentario, cortado del código fuente"""
+        inicio = self.inicio[indice]
+        return self.fuente[inicio:inicio + self.longitud[indice]]
+
+    def nombres_atributos(self, indice):
+        """Nombres de los atributos de un elemento, en orden de aparición"""
+        primero = self.inicio[indice]
+        return [self.nombres[self.atributo_nombre[k]] for k in range(primero, primero + self.longitud[indice])]
+
+    def atributos(self, indice):
+        """Atributos de un elemento como diccionario nombre -> valor"""
+        primero = self.inicio[indice]
+        atributos = {}
+        for k in range(primero, primero + self.longitud[indice]):
+            inicio = self.atributo_inicio[k]
+            atributos[self.nombres[self.atributo_nombre[k]]] = self.fuente[inicio:inicio + self.atributo_longitud[k]]
+        return atributos
+
+    def tiene_solo_texto(self, indice):
+        """Indica si el nodo tiene exactamente un hijo y ese hijo es un texto"""
+        hijo = self.primer_hijo[indice]
+        return hijo != SIN_NODO and self.siguiente_hermano[hijo] == SIN_NODO and self.tipo[hijo] == NODO_TEXTO
+
+
+def construir_tabla(codigo_fuente):
+    """
+    Analiza el código fuente y construye directamente su TablaNodos.
+
+    Acepta el mismo lenguaje y produce los mismos mensajes de error que
+    AnalizadorLexicoRapido seguido de AnalizadorSintactico en modo flujo:
+    los errores léxicos se lanzan como SyntaxError del analizador léxico y
+    los sintácticos como SyntaxError.
+    """
+    tabla = TablaNodos(codigo_fuente)
+    lexico = AnalizadorLexicoRapido(codigo_fuente)
+    escanear = lexico.escanear
+
+    def token_actual():
+        return Token(tipo_token, codigo_fuente[inicio:fin], lexico.coordenadas(inicio_posicion))
+
+    tabla.agregar_nodo(NODO_DOCUMENTO)
+    # Cada nivel de la pila guarda [nodo, último hijo agregado, nombre de la etiqueta]
+    pila = [[0, SIN_NODO, None]]
+    tipo_token, inicio, fin, inicio_posicion = escanear()
+
+    while True:
+        nivel = pila[-1]
+
+        if tipo_token == TipoToken.FIN_ARCHIVO:
+            if len(pila) > 1:
+                raise SyntaxError(f"Etiqueta de cierre faltante para {nivel[2]}")
+            return tabla
+
+        if (tipo_token == TipoToken.ETIQUETA_CIERRE and len(pila) > 1
+                and codigo_fuente[inicio:fin] == nivel[2]):
+            pila.pop()
+            tipo_token, inicio, fin, inicio_posicion = escanear()
+            continue
+
+        if tipo_token == TipoToken.ETIQUETA_APERTURA:
+            nombre_etiqueta = codigo_fuente[inicio:fin]
+            nodo = tabla.agregar_nodo(NODO_ELEMENTO, tabla.id_nombre(nombre_etiqueta), len(tabla.atributo_nombre))
+            tipo_token, inicio, fin, inicio_posicion = escanear()
+
+            while tipo_token == TipoToken.NOMBRE_ATRIBUTO:
+                id_atributo = tabla.id_nombre(codigo_fuente[inicio:fin])
+                tipo_token, inicio, fin, inicio_posicion = escanear()
+                if tipo_token != TipoToken.VALOR_ATRIBUTO:
+                    raise SyntaxError(f"Error de sintaxis: se esperaba {TipoToken.VALOR_ATRIBUTO.name}, se encontró {tipo_token.name} en la posición {lexico.coordenadas(inicio_posicion)}")
+                _agregar_atributo(tabla, nodo, id_atributo, inicio, fin - inicio)
+                tipo_token, inicio, fin, inicio_posicion = escanear()
+        elif tipo_token == TipoToken.TEXTO:
+            nodo = tabla.agregar_nodo(NODO_TEXTO, SIN_NODO, inicio, fin - inicio)
+            tipo_token, inicio, fin, inicio_posicion = escanear()
+        elif tipo_token == TipoToken.COMENTARIO:
+            nodo = tabla.agregar_nodo(NODO_COMENTARIO, SIN_NODO, inicio, fin - inicio)
+            tipo_token, inicio, fin, inicio_posicion = escanear()
+        else:
+            raise SyntaxError(f"Token inesperado: {token_actual()}")
+
+        if nivel[1] == SIN_NODO:
+            tabla.primer_hijo[nivel[0]] = nodo
+        else:
+            tabla.siguiente_hermano[nivel[1]] = nodo
+        nivel[1] = nodo
+
+        if tabla.tipo[nodo] == NODO_ELEMENTO:
+            pila.append([nodo, SIN_NODO, nombre_etiqueta])
+
+
+def _agregar_atributo(tabla, elemento, id_atributo, inicio, longitud):
+    """Agrega un atributo al elemento; un nombre repetido conserva su posición y toma el último valor"""
+    primero = tabla.inicio[elemento]
+    for k in range(primero, primero + tabla.longitud[elemento]):
+        if tabla.atributo_nombre[k] == id_atributo:
+            tabla.atributo_inicio[k] = inicio
+            tabla.atributo_longitud[k] = longitud
+            return
+    tabla.atributo_nombre.append(id_atributo)
+    tabla.atributo_inicio.append(inicio)
+    tabla.atributo_longitud.append(longitud)
+    tabla.longitud[elemento] += 1
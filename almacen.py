@@ -0,0 +1,140 @@
+"""
+Índice de los archivos generados por el servidor web
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from Analizadores.persistencia import SUFIJOS_COMPRIMIDOS
+
+# Columnas por las que se puede ordenar el listado
+ORDENES = {
+    'fecha': 'creado',
+    'tamano': 'tamano',
+    'nombre': 'nombre',
+}
+
+# Archivos del directorio que se incorporan al reconstruir el índice
+EXTENSIONES = ('.html', '.json')
+
+class AlmacenArtefactos:
+    """
+    Registra en una base SQLite los archivos generados en un directorio, para
+    listarlos por páginas sin recorrer el directorio en cada petición.
+    
+    Al registrar un archivo se aplica la retención: se borran (del índice y del
+    disco) los archivos con más de edad_maxima segundos y, si el tamaño total
+    supera tamano_maximo bytes, los más antiguos hasta quedar por debajo.
+    Ambos límites son opcionales. El tamaño de cada archivo incluye el de sus
+    versiones precomprimidas, que se borran con él.
+    """
+
+    def __init__(self, directorio, ruta_indice, edad_maxima=None, tamano_maximo=None):
+        self.directorio = directorio
+        self.edad_maxima = edad_maxima
+        self.tamano_maximo = tamano_maximo
+        self.eliminados = 0
+        self._bloqueo = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_indice, check_same_thread=False)
+        # WAL permite leer el índice desde otros procesos del servidor mientras se escribe
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        with self._conexion:
+            nueva = self._conexion.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'artefactos'").fetchone()[0] == 0
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS artefactos (nombre TEXT PRIMARY KEY, tamano INTEGER NOT NULL, creado REAL NOT NULL)")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS artefactos_creado ON artefactos (creado)")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS artefactos_tamano ON artefactos (tamano)")
+        if nueva:
+            # Primera ejecución con índice: se incorporan los archivos que ya existían
+            self.reconstruir()
+    
+    def registrar(self, ruta):
+        """Añade al índice un archivo recién escrito en el directorio y aplica la retención"""
+        estado = os.stat(ruta)
+        with self._bloqueo, self._conexion:
+            self._conexion.execute("INSERT OR REPLACE INTO artefactos VALUES (?, ?, ?)",
+                                   (os.path.basename(ruta), estado.st_size + _tamano_comprimidos(ruta), estado.st_mtime))
+        self.aplicar_retencion()
+    
+    def listar(self, pagina=1, por_pagina=50, orden='fecha', descendente=True):
+        """
+        Devuelve (archivos, total): una página del listado, como diccionarios con
+        'nombre', 'tamano' (bytes) y 'creado' (marca de tiempo), y el número total
+        de archivos. orden es una de las claves de ORDENES.
+        """
+        columna = ORDENES[orden]
+        direccion = 'DESC' if descendente else 'ASC'
+        with self._bloqueo:
+            total = self._conexion.execute("SELECT count(*) FROM artefactos").fetchone()[0]
+            filas = self._conexion.execute(
+                f"SELECT nombre, tamano, creado FROM artefactos ORDER BY {columna} {direccion}, nombre {direccion} "
+                "LIMIT ? OFFSET ?", (por_pagina, (pagina - 1) * por_pagina)).fetchall()
+        return [{'nombre': nombre, 'tamano': tamano, 'creado': creado} for nombre, tamano, creado in filas], total
+    
+    def aplicar_retencion(self):
+        """Borra los archivos que exceden los límites de edad y tamaño; devuelve cuántos se borraron"""
+        vencidos = []
+        with self._bloqueo:
+            if self.edad_maxima is not None:
+                vencidos += self._conexion.execute("SELECT nombre FROM artefactos WHERE creado < ?",
+                                                   (time.time() - self.edad_maxima,)).fetchall()
+            if self.tamano_maximo is not None:
+                exceso = (self._conexion.execute("SELECT coalesce(sum(tamano), 0) FROM artefactos").fetchone()[0]
+                          - self.tamano_maximo)
+                if exceso > 0:
+                    for nombre, tamano in self._conexion.execute(
+                            "SELECT nombre, tamano FROM artefactos ORDER BY creado, nombre"):
+                        if exceso <= 0:
+                            break
+                        vencidos.append((nombre,))
+                        exceso -= tamano
+            if not vencidos:
+                return 0
+            with self._conexion:
+                self._conexion.executemany("DELETE FROM artefactos WHERE nombre = ?", vencidos)
+            self.eliminados += len(vencidos)
+        
+        for (nombre,) in vencidos:
+            for sufijo in ('',) + SUFIJOS_COMPRIMIDOS:
+                try:
+                    os.remove(os.path.join(self.directorio, nombre + sufijo))
+                except FileNotFoundError:
+                    pass
+        return len(vencidos)
+    
+    def reconstruir(self):
+        """Vuelve a crear el índice a partir de los archivos del directorio"""
+        filas = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name.endswith(EXTENSIONES):
+                    estado = entrada.stat()
+                    filas.append((entrada.name, estado.st_size + _tamano_comprimidos(entrada.path), estado.st_mtime))
+        with self._bloqueo, self._conexion:
+            self._conexion.execute("DELETE FROM artefactos")
+            self._conexion.executemany("INSERT INTO artefactos VALUES (?, ?, ?)", filas)
+        self.aplicar_retencion()
+    
+    def estadisticas(self):
+        with self._bloqueo:
+            archivos, tamano = self._conexion.execute(
+                "SELECT count(*), coalesce(sum(tamano), 0) FROM artefactos").fetchone()
+        return {
+            'archivos': archivos,
+            'tamano': tamano,
+            'edad_maxima': self.edad_maxima,
+            'tamano_maximo': self.tamano_maximo,
+            'eliminados': self.eliminados,
+        }
+
+def _tamano_comprimidos(ruta):
+    """Bytes que ocupan las versiones precomprimidas de un archivo (ver guardar_por_contenido)"""
+    tamano = 0
+    for sufijo in SUFIJOS_COMPRIMIDOS:
+        try:
+            tamano += os.stat(ruta + sufijo).st_size
+        except FileNotFoundError:
+            pass
+    return tamano
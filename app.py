@@ -1,23 +1,95 @@
 from flask import Flask, request, jsonify, send_from_directory # type: ignore
+import gzip
 import logging
+import mimetypes
 import os
+import re
 import time
-from main import compilar_codigo
+from main import compilar_en_memoria
+from Analizadores.cache import CacheCompilacion
+from Analizadores.generator import publicar_recursos
+from Analizadores.progreso import configurar_registro
+from Analizadores.persistencia import COMPRESIONES, LONGITUD_HASH, TAMANO_MINIMO_COMPRESION, guardar_por_contenido
+from trabajos import GestorTrabajos, ColaLlena
+from almacen import AlmacenArtefactos, ORDENES
+from metricas import RegistroMetricas, LIMITES_BYTES, TIPO_CONTENIDO
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
-
-logging.basicConfig(
-    filename='compilador_flashml.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
+# El registro se configura al ejecutar el servidor (ver el final del archivo), no al importarlo.
+# FLASHML_REGISTRO indica el archivo; vacío, no se configura (lo hace quien aloja la aplicación)
+ARCHIVO_REGISTRO = os.environ.get('FLASHML_REGISTRO', 'compilador_flashml.log')
+registro = logging.getLogger('flashml.web')
 
 GENERADOS_DIR = os.path.join(app.static_folder, 'generados')
 if not os.path.exists(GENERADOS_DIR):
     os.makedirs(GENERADOS_DIR)
 
+# Índice de los archivos generados; se borran los de más de FLASHML_EDAD_MAXIMA segundos (7 días)
+# y los más antiguos cuando ocupan más de FLASHML_TAMANO_MAXIMO bytes (256 MB). 0 desactiva el límite
+os.makedirs(app.instance_path, exist_ok=True)
+ALMACEN = AlmacenArtefactos(
+    GENERADOS_DIR,
+    os.path.join(app.instance_path, 'artefactos.sqlite3'),
+    edad_maxima=int(os.environ.get('FLASHML_EDAD_MAXIMA', 7 * 24 * 3600)) or None,
+    tamano_maximo=int(os.environ.get('FLASHML_TAMANO_MAXIMO', 256 * 1024 * 1024)) or None
+)
+POR_PAGINA_MAXIMO = 500
+
+# Archivos guardados por contenido (ver guardar_por_contenido): se cachean en el navegador durante un año
+NOMBRE_POR_CONTENIDO = re.compile(rf'(flashml-)?[0-9a-f]{{{LONGITUD_HASH}}}\.(html|json|css|js)')
+CACHE_INMUTABLE = 365 * 24 * 3600
+
+# Respuestas generadas en memoria que se comprimen con gzip si el cliente lo acepta
+TIPOS_COMPRIMIBLES = {'application/json', 'text/html', 'text/plain'}
+
+# Por defecto cada página incluye su hoja de estilos y su script, así que sigue funcionando al descargarla
+# y abrirla sin el servidor. Con FLASHML_RECURSOS_EXTERNOS=1 se publican una vez y cada página los enlaza,
+# de modo que el navegador los cachea entre documentos. FLASHML_MINIFICAR=1 genera las páginas (y los recursos) minificados
+MINIFICAR = os.environ.get('FLASHML_MINIFICAR', '0') == '1'
+RECURSOS = None
+if os.environ.get('FLASHML_RECURSOS_EXTERNOS', '0') == '1':
+    RECURSOS = publicar_recursos(GENERADOS_DIR, '/output', comprimir=True, minificar=MINIFICAR)
+
+# Caché compartida por todas las peticiones; FLASHML_CACHE_DIR la conserva también en disco
+CACHE_COMPILACION = CacheCompilacion(capacidad=256, directorio=os.environ.get('FLASHML_CACHE_DIR'))
+
+# Las compilaciones se ejecutan en un grupo acotado de hilos; con la cola llena se responde 429
+TRABAJOS = GestorTrabajos(
+    trabajadores=int(os.environ.get('FLASHML_TRABAJADORES', 2)),
+    capacidad_cola=int(os.environ.get('FLASHML_CAPACIDAD_COLA', 16))
+)
+
+# Los códigos más cortos (en caracteres) se responden en la misma petición; los demás crean un trabajo
+LIMITE_SINCRONO = int(os.environ.get('FLASHML_LIMITE_SINCRONO', 64 * 1024))
+ESPERA_MAXIMA_SINCRONA = 30
+
+# Métricas de la ruta /metrics (formato de texto de Prometheus). Las de la caché, los archivos
+# generados y los trabajos se leen de sus estadísticas en cada consulta
+METRICAS = RegistroMetricas()
+COMPILACIONES = METRICAS.contador('compilaciones_total', "Compilaciones atendidas, por resultado y tipo del primer error",
+                                  ('resultado', 'tipo_error'))
+ERRORES = METRICAS.contador('errores_total', "Errores de compilación, por tipo", ('tipo',))
+DURACION_COMPILACION = METRICAS.histograma('compilacion_segundos', "Duración de cada compilación")
+DURACION_FASES = METRICAS.histograma('fase_segundos', "Duración de cada fase de la compilación", ('fase',))
+BYTES_ENTRADA = METRICAS.histograma('entrada_bytes', "Tamaño en bytes del código recibido", limites=LIMITES_BYTES)
+METRICAS.calculada('cache_consultas_total', "Consultas a la caché de compilaciones, por resultado",
+                   lambda: {('acierto',): CACHE_COMPILACION.aciertos, ('fallo',): CACHE_COMPILACION.fallos},
+                   tipo='counter', etiquetas=('resultado',))
+METRICAS.calculada('cache_aciertos_disco_total', "Aciertos de la caché servidos desde el disco",
+                   lambda: CACHE_COMPILACION.aciertos_disco, tipo='counter')
+METRICAS.calculada('cache_tasa_aciertos', "Proporción de consultas a la caché que fueron aciertos",
+                   lambda: CACHE_COMPILACION.estadisticas()['tasa_aciertos'])
+METRICAS.calculada('cache_entradas', "Entradas en memoria de la caché", lambda: CACHE_COMPILACION.estadisticas()['entradas'])
+METRICAS.calculada('artefactos_bytes', "Bytes que ocupan los archivos generados (con sus versiones comprimidas)",
+                   lambda: ALMACEN.estadisticas()['tamano'])
+METRICAS.calculada('artefactos_archivos', "Archivos generados en el índice", lambda: ALMACEN.estadisticas()['archivos'])
+METRICAS.calculada('artefactos_eliminados_total', "Archivos generados eliminados por edad o tamaño",
+                   lambda: ALMACEN.eliminados, tipo='counter')
+METRICAS.calculada('trabajos_pendientes', "Compilaciones en cola o en ejecución", lambda: TRABAJOS.estadisticas()['pendientes'])
+METRICAS.calculada('trabajos_rechazados_total', "Compilaciones rechazadas con la cola llena (429)",
+                   lambda: TRABAJOS.rechazados, tipo='counter')
+
 @app.route('/')
 def index():
     return send_from_directory('templates', 'index.html')
@@ -26,65 +98,241 @@ def index():
 def documentation():
     return send_from_directory('templates','documentation.html')
 
-@app.route('/compilar', methods=['POST'])
-def compilar():
-    codigo = request.json.get('codigo')
-    if not codigo:
-        error_msg = "No se proporcionó código para compilar"
-        logging.error(error_msg)
-        return jsonify({'error': error_msg, 'errores': [{'tipo': 'general', 'mensaje': error_msg}]}), 400
-    
-    logging.info("Recibido código FlashML para compilar desde la interfaz web")
+def compilar_web(codigo, guardar=True, recuperar_errores=False):
+    """
+    Compila el código recibido desde la interfaz web y devuelve (respuesta, código HTTP).
+    Con recuperar_errores=True los errores de sintaxis no detienen la compilación y la
+    respuesta incluye todos los errores del documento; por defecto, solo el primero.
+    Los archivos se guardan con el hash de su contenido como nombre, así que los
+    envíos idénticos reutilizan los mismos archivos. Con guardar=False no se escribe
+    ningún archivo: la respuesta incluye el HTML y el JSON intermedio.
+    """
+    BYTES_ENTRADA.observar(len(codigo.encode('utf-8')))
     try:
+        resultado = compilar_en_memoria(codigo, cache=CACHE_COMPILACION, recursos=RECURSOS, minificar=MINIFICAR,
+                                        metricas=True, recuperar_errores=recuperar_errores)
+        _observar_duracion(resultado['metricas'])
+        if resultado['errores']:
+            error_msg = "Errores durante la compilación. Revisa el código."
+            registro.error("%s", error_msg)
+            _contar_compilacion(resultado['errores'])
+            return {'success': False, 'errores': resultado['errores']}, 400
         
-        timestamp = int(time.time())
-        archivo_salida = os.path.join(GENERADOS_DIR, f"output_{timestamp}.html")
-        resultado = compilar_codigo(codigo, archivo_entrada=f"web_input_{timestamp}.flashml", archivo_salida=archivo_salida)
+        if not guardar:
+            registro.info("Compilación en memoria exitosa desde la interfaz web")
+            _contar_compilacion([])
+            return {'success': True, 'html': resultado['html'], 'intermedio': resultado['intermedio']}, 200
         
-        if resultado['html']:
-            logging.info("Compilación exitosa desde la interfaz web")
-            return jsonify({
-                'success': True,
-                'html_path': os.path.relpath(archivo_salida, app.static_folder),
-                'intermedio_path': os.path.relpath(resultado['intermedio'], app.static_folder)
-            })
-        else:
-            error_msg = "Errores durante la compilación. Revisa el código."
-            logging.error(error_msg)
-            return jsonify({'success': False, 'errores': resultado['errores']}), 400
+        archivo_intermedio = guardar_por_contenido(GENERADOS_DIR, resultado['intermedio'], '.json', comprimir=True)
+        archivo_salida = guardar_por_contenido(GENERADOS_DIR, resultado['html'], '.html', comprimir=True)
+        ALMACEN.registrar(archivo_intermedio)
+        ALMACEN.registrar(archivo_salida)
+        registro.info("Compilación exitosa desde la interfaz web")
+        _contar_compilacion([])
+        return {
+            'success': True,
+            'html_path': os.path.relpath(archivo_salida, app.static_folder),
+            'intermedio_path': os.path.relpath(archivo_intermedio, app.static_folder)
+        }, 200
     except Exception as e:
         error_msg = f"Error al compilar desde la interfaz web: {str(e)}"
-        logging.error(error_msg)
-        return jsonify({'success': False, 'errores': [{'tipo': 'general', 'mensaje': error_msg}]}), 400
+        registro.error("%s", error_msg)
+        errores = [{'tipo': 'general', 'mensaje': error_msg}]
+        _contar_compilacion(errores)
+        return {'success': False, 'errores': errores}, 400
+
+def _observar_duracion(metricas):
+    DURACION_COMPILACION.observar(metricas['segundos'])
+    for fase, medida in metricas['fases'].items():
+        DURACION_FASES.observar(medida['segundos'], fase=fase)
+
+def _contar_compilacion(errores):
+    """Cuenta una compilación terminada: con éxito si no hay errores, o por el tipo de su primer error"""
+    if not errores:
+        COMPILACIONES.incrementar(resultado='exito', tipo_error='ninguno')
+        return
+    COMPILACIONES.incrementar(resultado='error', tipo_error=errores[0]['tipo'])
+    for error in errores:
+        ERRORES.incrementar(tipo=error['tipo'])
+
+def _validar_codigo(codigo):
+    """Respuesta 400 si la petición no trae el código como texto (antes de contarlo en las métricas), o None"""
+    if not codigo:
+        error_msg = "No se proporcionó código para compilar"
+    elif not isinstance(codigo, str):
+        error_msg = "El código debe ser una cadena de texto"
+    else:
+        return None
+    registro.error("%s", error_msg)
+    return jsonify({'error': error_msg, 'errores': [{'tipo': 'general', 'mensaje': error_msg}]}), 400
+
+def _cola_llena():
+    error_msg = "El servidor está ocupado compilando otros documentos. Inténtalo de nuevo en unos segundos."
+    registro.warning("%s", error_msg)
+    respuesta = jsonify({'success': False, 'errores': [{'tipo': 'general', 'mensaje': error_msg}]})
+    return respuesta, 429, {'Retry-After': '5'}
+
+def _respuesta_trabajo(identificador, trabajo):
+    """Estado de un trabajo; si ya terminó incluye la respuesta de la compilación"""
+    datos = {'trabajo': identificador, 'estado': trabajo['estado'], 'url': f"/trabajos/{identificador}"}
+    if trabajo['estado'] == 'terminado':
+        datos['resultado'] = trabajo['resultado'][0]
+    elif trabajo['estado'] == 'fallido':
+        datos['resultado'] = {'success': False, 'errores': [{'tipo': 'general', 'mensaje': trabajo['error']}]}
+    return datos
+
+@app.route('/compilar', methods=['POST'])
+def compilar():
+    codigo = request.json.get('codigo')
+    error = _validar_codigo(codigo)
+    if error:
+        return error
+    
+    registro.info("Recibido código FlashML para compilar desde la interfaz web")
+    try:
+        identificador = TRABAJOS.enviar(compilar_web, codigo, guardar=request.json.get('guardar', True),
+                                        recuperar_errores=bool(request.json.get('recuperar_errores', False)))
+    except ColaLlena:
+        return _cola_llena()
+    
+    # Los códigos cortos conservan la respuesta síncrona; los largos devuelven el trabajo para consultarlo
+    if len(codigo) <= LIMITE_SINCRONO:
+        trabajo = TRABAJOS.consultar(identificador, esperar=ESPERA_MAXIMA_SINCRONA)
+        if trabajo['estado'] == 'terminado':
+            respuesta, estado = trabajo['resultado']
+            return jsonify(respuesta), estado
+        if trabajo['estado'] == 'fallido':
+            return jsonify(_respuesta_trabajo(identificador, trabajo)['resultado']), 400
+    return jsonify(_respuesta_trabajo(identificador, TRABAJOS.consultar(identificador))), 202
+
+@app.route('/trabajos', methods=['POST'])
+def crear_trabajo():
+    """Envía una compilación en segundo plano sin esperar a que termine"""
+    codigo = request.json.get('codigo')
+    error = _validar_codigo(codigo)
+    if error:
+        return error
+    try:
+        identificador = TRABAJOS.enviar(compilar_web, codigo, guardar=request.json.get('guardar', True),
+                                        recuperar_errores=bool(request.json.get('recuperar_errores', False)))
+    except ColaLlena:
+        return _cola_llena()
+    return jsonify(_respuesta_trabajo(identificador, TRABAJOS.consultar(identificador))), 202
+
+@app.route('/trabajos/<identificador>', methods=['GET'])
+def consultar_trabajo(identificador):
+    """Estado de un trabajo; ?esperar=N espera hasta N segundos (máximo 30) a que termine"""
+    esperar = min(request.args.get('esperar', 0, type=float), ESPERA_MAXIMA_SINCRONA)
+    trabajo = TRABAJOS.consultar(identificador, esperar=esperar)
+    if trabajo is None:
+        return jsonify({'error': "Trabajo no encontrado"}), 404
+    return jsonify(_respuesta_trabajo(identificador, trabajo))
+
+@app.route('/estadisticas/trabajos', methods=['GET'])
+def estadisticas_trabajos():
+    return jsonify(TRABAJOS.estadisticas())
+
+def _servir_por_contenido(filename):
+    """
+    Sirve un archivo guardado por contenido. El nombre es el hash del contenido y
+    el archivo nunca cambia, así que el hash sirve de ETag (con la codificación
+    como sufijo en las versiones comprimidas) y se puede cachear indefinidamente.
+    Si el cliente acepta br o gzip se envía la versión precomprimida.
+    """
+    if not os.path.isfile(os.path.join(GENERADOS_DIR, filename)):
+        # Antes de las cabeceras condicionales: 'If-None-Match: *' o la copia del cliente de un
+        # archivo ya eliminado (por edad o tamaño) no deben recibir un 304
+        raise FileNotFoundError(f"No existe {filename}")
+    etiqueta = filename.split('.')[0]
+    variantes = [etiqueta] + [f"{etiqueta}-{codificacion}" for codificacion, _ in COMPRESIONES.values()]
+    coincidencia = next((variante for variante in variantes if variante in request.if_none_match), None)
+    if coincidencia:
+        # La copia del cliente sigue siendo válida: no hace falta leer el archivo
+        respuesta = app.response_class(status=304)
+        respuesta.set_etag(coincidencia)
+    else:
+        respuesta = None
+        for sufijo, (codificacion, _) in COMPRESIONES.items():
+            if request.accept_encodings.quality(codificacion) > 0 and os.path.isfile(os.path.join(GENERADOS_DIR, filename + sufijo)):
+                # download_name conserva el nombre original (.html) en Content-Disposition, no el del .gz/.br
+                respuesta = send_from_directory(GENERADOS_DIR, filename + sufijo, mimetype=mimetypes.guess_type(filename)[0],
+                                                download_name=filename, etag=f"{etiqueta}-{codificacion}",
+                                                max_age=CACHE_INMUTABLE)
+                respuesta.content_encoding = codificacion
+                break
+        if respuesta is None:
+            respuesta = send_from_directory(GENERADOS_DIR, filename, etag=etiqueta, max_age=CACHE_INMUTABLE)
+    respuesta.vary.add('Accept-Encoding')
+    respuesta.cache_control.public = True
+    respuesta.cache_control.max_age = CACHE_INMUTABLE
+    respuesta.cache_control.immutable = True
+    return respuesta
 
 @app.route('/output/<filename>')
 def serve_output(filename):
     
     try:
+        if NOMBRE_POR_CONTENIDO.fullmatch(filename):
+            return _servir_por_contenido(filename)
         return send_from_directory(GENERADOS_DIR, filename)
     except Exception as e:
-        logging.error(f"Error al servir el archivo HTML: {str(e)}")
+        registro.error("Error al servir el archivo HTML: %s", e)
         return "Archivo HTML no encontrado", 404
 
+@app.route('/estadisticas/cache', methods=['GET'])
+def estadisticas_cache():
+    return jsonify(CACHE_COMPILACION.estadisticas())
+
 @app.route('/archivos', methods=['GET'])
 def listar_archivos():
+    """
+    Archivos generados, por páginas: ?pagina=1&por_pagina=50&orden=fecha|tamano|nombre&direccion=desc|asc
+    """
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    por_pagina = min(max(request.args.get('por_pagina', 50, type=int), 1), POR_PAGINA_MAXIMO)
+    orden = request.args.get('orden', 'fecha')
+    if orden not in ORDENES:
+        return jsonify({'error': f"Orden desconocido: {orden}"}), 400
     
     try:
-        archivos = []
-        for filename in os.listdir(GENERADOS_DIR):
-            if filename.endswith(('.html', '.json')):
-                filepath = os.path.join(GENERADOS_DIR, filename)
-                stat = os.stat(filepath)
-                archivos.append({
-                    'nombre': filename,
-                    'tamano': f"{stat.st_size / 1024:.1f} KB",
-                    'fecha': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stat.st_mtime)),
-                    'path': os.path.relpath(filepath, app.static_folder)
-                })
-        return jsonify({'archivos': sorted(archivos, key=lambda x: x['fecha'], reverse=True)})
+        filas, total = ALMACEN.listar(pagina, por_pagina, orden, request.args.get('direccion', 'desc') != 'asc')
+        archivos = [{
+            'nombre': fila['nombre'],
+            'tamano': f"{fila['tamano'] / 1024:.1f} KB",
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fila['creado'])),
+            'path': os.path.relpath(os.path.join(GENERADOS_DIR, fila['nombre']), app.static_folder)
+        } for fila in filas]
+        return jsonify({'archivos': archivos, 'pagina': pagina, 'por_pagina': por_pagina, 'total': total})
     except Exception as e:
-        logging.error(f"Error al listar archivos: {str(e)}")
+        registro.error("Error al listar archivos: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/estadisticas/archivos', methods=['GET'])
+def estadisticas_archivos():
+    return jsonify(ALMACEN.estadisticas())
+
+@app.route('/metrics', methods=['GET'])
+def exponer_metricas():
+    """Métricas del servicio en el formato de texto de Prometheus"""
+    return METRICAS.exponer(), 200, {'Content-Type': TIPO_CONTENIDO}
+
+@app.after_request
+def comprimir_respuesta(respuesta):
+    """Comprime con gzip las respuestas generadas en memoria (por ejemplo, el JSON de la API)"""
+    if (respuesta.direct_passthrough or respuesta.is_streamed or respuesta.status_code != 200
+            or 'Content-Encoding' in respuesta.headers or respuesta.mimetype not in TIPOS_COMPRIMIBLES
+            or request.accept_encodings.quality('gzip') <= 0):
+        return respuesta
+    datos = respuesta.get_data()
+    if len(datos) < TAMANO_MINIMO_COMPRESION:
+        return respuesta
+    respuesta.set_data(gzip.compress(datos, compresslevel=6))
+    respuesta.content_encoding = 'gzip'
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
 if __name__ == '__main__':
+    # Los mensajes pasan por una cola y un hilo los escribe en el archivo: las peticiones no esperan al disco
+    if ARCHIVO_REGISTRO:
+        configurar_registro(ARCHIVO_REGISTRO, en_cola=True)
     app.run(debug=True)
\ No newline at end of file
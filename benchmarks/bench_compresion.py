@@ -0,0 +1,75 @@
+"""
+Mide cuánto se ahorra al enviar comprimidos los archivos generados por el
+servidor (ver guardar_por_contenido y /output/<archivo> en app.py).
+
+Para documentos de distintos tamaños compara el HTML sin comprimir con sus
+versiones precomprimidas (gzip -9 y, si el paquete brotli está instalado,
+brotli -11) y con gzip -6 aplicado en cada petición. La latencia estimada
+de una respuesta es el tiempo de comprimir en el servidor (cero si ya está
+precomprimido), más el de transferir los bytes con el ancho de banda
+indicado, más el de descomprimir en el cliente.
+
+Uso: python -m benchmarks.bench_compresion [--tamanos 1 10 100 1000] [--mbps 10 100]
+"""
+import argparse
+import gzip
+import time
+
+from main import compilar_en_memoria
+from Analizadores.persistencia import COMPRESIONES
+from benchmarks.corpus import generar_documento
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _medir(funcion, datos, repeticiones=5):
+    """Mejor tiempo de funcion(datos) y su resultado"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(datos)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor, resultado
+
+
+def variantes(datos):
+    """(nombre, bytes enviados, segundos de compresión por petición, segundos de descompresión)"""
+    filas = [('sin comprimir', len(datos), 0.0, 0.0)]
+    for sufijo, (codificacion, compresor) in COMPRESIONES.items():
+        _, comprimido = _medir(compresor, datos, 1)
+        descompresor = brotli.decompress if codificacion == 'br' else gzip.decompress
+        descompresion, original = _medir(descompresor, comprimido)
+        if original != datos:
+            raise AssertionError(f"{codificacion} no recupera el contenido original")
+        filas.append((f"{codificacion} precomprimido", len(comprimido), 0.0, descompresion))
+    compresion, comprimido = _medir(lambda datos: gzip.compress(datos, compresslevel=6), datos)
+    descompresion, _ = _medir(gzip.decompress, comprimido)
+    filas.append(('gzip -6 por petición', len(comprimido), compresion, descompresion))
+    return filas
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Benchmark de la compresión de los archivos generados')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1, 10, 100, 1000], help='Episodios de cada documento')
+    parser.add_argument('--mbps', type=float, nargs='+', default=[10, 100], help='Anchos de banda en Mbit/s')
+    argumentos = parser.parse_args()
+
+    if brotli is None:
+        print("brotli no está instalado: solo se mide gzip")
+    for episodios in argumentos.tamanos:
+        resultado = compilar_en_memoria(generar_documento(episodios))
+        datos = resultado['html'].encode('utf-8')
+        print(f"\n{episodios} episodios: HTML de {len(datos) / 1024:.1f} KB")
+        print(f"{'variante':>22} {'bytes':>10} {'ahorro':>7} " + " ".join(f"{f'{mbps:g} Mbit/s':>12}" for mbps in argumentos.mbps))
+        for nombre, enviados, compresion, descompresion in variantes(datos):
+            latencias = " ".join(f"{(compresion + enviados * 8 / (mbps * 1e6) + descompresion) * 1000:10.2f}ms"
+                                 for mbps in argumentos.mbps)
+            print(f"{nombre:>22} {enviados:10d} {1 - enviados / len(datos):6.1%} {latencias}")
+
+
+if __name__ == "__main__":
+    principal()
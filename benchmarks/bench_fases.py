@@ -0,0 +1,183 @@
+"""
+Suite reproducible de benchmarks por fase del compilador.
+
+Genera documentos deterministas con generar_documento_variado variando un eje
+cada vez respecto de un escenario base (tamaño, profundidad, densidad de
+atributos, proporción de texto y de comentarios, mezcla de etiquetas de
+poderes) y mide por separado cada fase (léxico, sintáctico, semántico,
+intermedio, html) y la compilación completa con compilar_en_memoria.
+Antes de medir comprueba que cada documento compila sin errores.
+
+Los resultados se pueden guardar en JSON y comparar con los de otra ejecución
+para detectar regresiones: con --comparar, el programa termina con código 1 si
+alguna fase es más lenta que en la base por encima del umbral.
+
+Uso: python -m benchmarks.bench_fases [--salida actual.json] [--comparar base.json] [--umbral 0.1]
+                                      [--escala 1.0] [--repeticiones 5] [--motor-lexico clasico]
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from main import compilar_en_memoria
+from Analizadores.lexer import MOTORES_LEXICOS
+from Analizadores.parser import AnalizadorSintactico
+from Analizadores.semantic import AnalizadorSemantico
+from Analizadores.intermedio import GeneradorIntermedio
+from Analizadores.generator import GeneradorHTML
+from benchmarks.corpus import generar_documento_variado
+
+# Cambiarla indica que los resultados dejan de ser comparables con los anteriores
+VERSION_RESULTADOS = 1
+
+BASE = {
+    'elementos': 2000,
+    'profundidad': 5,
+    'densidad_atributos': 0.5,
+    'proporcion_texto': 0.6,
+    'proporcion_comentarios': 0.1,
+    'mezcla_poderes': 0.3,
+}
+
+# Valores de cada eje que se prueban, uno cada vez, sobre el escenario base
+EJES = {
+    'elementos': [500, 8000],
+    'profundidad': [2, 7],
+    'densidad_atributos': [0.0, 1.0],
+    'proporcion_texto': [0.1, 1.0],
+    'proporcion_comentarios': [0.0, 0.5],
+    'mezcla_poderes': [0.0, 0.9],
+}
+
+FASES = ['léxico', 'sintáctico', 'semántico', 'intermedio', 'html', 'total']
+
+
+def escenarios(escala=1.0, ejes=None):
+    """Lista de (nombre, parámetros): el escenario base y una variación por cada valor de cada eje"""
+    lista = [('base', dict(BASE))]
+    for eje, valores in EJES.items():
+        if ejes and eje not in ejes:
+            continue
+        for valor in valores:
+            lista.append((f"{eje}={valor}", dict(BASE, **{eje: valor})))
+    for _, parametros in lista:
+        parametros['elementos'] = max(1, round(parametros['elementos'] * escala))
+    return lista
+
+
+def medir(funcion, repeticiones):
+    """Mínimo y mediana (en segundos) de repeticiones llamadas, y el último resultado"""
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {'minimo': min(tiempos), 'mediana': statistics.median(tiempos)}, resultado
+
+
+def medir_escenario(codigo, motor_lexico, repeticiones):
+    """Tiempos de cada fase por separado y de la compilación completa"""
+    resultado = compilar_en_memoria(codigo, motor_lexico=motor_lexico)
+    if resultado['errores']:
+        raise AssertionError(f"El documento generado no compila: {resultado['errores'][0]['mensaje']}")
+
+    fases = {}
+    fases['léxico'], tokens = medir(lambda: MOTORES_LEXICOS[motor_lexico](codigo).tokenizar(), repeticiones)
+    fases['sintáctico'], ast = medir(lambda: AnalizadorSintactico(tokens).analizar(), repeticiones)
+    fases['semántico'], _ = medir(lambda: AnalizadorSemantico().analizar(ast), repeticiones)
+    fases['intermedio'], _ = medir(lambda: ''.join(GeneradorIntermedio().iter_json(ast)), repeticiones)
+    fases['html'], _ = medir(lambda: GeneradorHTML().generar(ast), repeticiones)
+    fases['total'], _ = medir(lambda: compilar_en_memoria(codigo, motor_lexico=motor_lexico), repeticiones)
+    return {'bytes': len(codigo.encode('utf-8')), 'tokens': len(tokens), 'fases': fases}
+
+
+def ejecutar(argumentos):
+    resultados = {
+        'version': VERSION_RESULTADOS,
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'implementacion': platform.python_implementation(),
+            'plataforma': platform.platform(),
+            'procesadores': os.cpu_count(),
+        },
+        'opciones': {'motor_lexico': argumentos.motor_lexico, 'repeticiones': argumentos.repeticiones,
+                     'escala': argumentos.escala, 'semilla': argumentos.semilla},
+        'escenarios': {},
+    }
+    print(f"{'escenario':>28} {'KB':>7} " + " ".join(f"{fase:>10}" for fase in FASES))
+    for nombre, parametros in escenarios(argumentos.escala, argumentos.ejes):
+        codigo = generar_documento_variado(semilla=argumentos.semilla, **parametros)
+        medida = medir_escenario(codigo, argumentos.motor_lexico, argumentos.repeticiones)
+        medida['parametros'] = parametros
+        resultados['escenarios'][nombre] = medida
+        print(f"{nombre:>28} {medida['bytes'] / 1024:7.1f} "
+              + " ".join(f"{medida['fases'][fase]['minimo'] * 1000:8.2f}ms" for fase in FASES))
+    return resultados
+
+
+def comparar(base, actual, umbral):
+    """Muestra la variación del tiempo mínimo de cada fase respecto de la base; devuelve las regresiones"""
+    if base.get('version') != actual.get('version'):
+        print(f"Aviso: versiones de resultados distintas ({base.get('version')} y {actual.get('version')})")
+    if base.get('opciones') != actual.get('opciones'):
+        print(f"Aviso: opciones distintas: {base.get('opciones')} frente a {actual.get('opciones')}")
+
+    regresiones = []
+    print(f"\n{'escenario':>28} " + " ".join(f"{fase:>10}" for fase in FASES))
+    for nombre, medida in actual['escenarios'].items():
+        anterior = base['escenarios'].get(nombre)
+        if anterior is None:
+            continue
+        if anterior['bytes'] != medida['bytes']:
+            print(f"{nombre:>28} el documento generado cambió ({anterior['bytes']} y {medida['bytes']} bytes)")
+            continue
+        celdas = []
+        for fase in FASES:
+            variacion = medida['fases'][fase]['minimo'] / anterior['fases'][fase]['minimo'] - 1
+            if variacion > umbral:
+                regresiones.append((nombre, fase, variacion))
+            celdas.append(f"{variacion:+9.1%}{'!' if variacion > umbral else ' '}")
+        print(f"{nombre:>28} " + " ".join(celdas))
+
+    if regresiones:
+        print(f"\n{len(regresiones)} fases más lentas que la base en más de un {umbral:.0%} (marcadas con !)")
+    else:
+        print(f"\nNinguna fase es más lenta que la base en más de un {umbral:.0%}")
+    return regresiones
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Suite de benchmarks por fase del compilador')
+    parser.add_argument('--salida', help='Guarda los resultados en este archivo JSON')
+    parser.add_argument('--comparar', metavar='BASE.json', help='Compara con los resultados de otra ejecución')
+    parser.add_argument('--umbral', type=float, default=0.10,
+                        help='Variación del tiempo mínimo a partir de la cual una fase cuenta como regresión')
+    parser.add_argument('--escala', type=float, default=1.0, help='Multiplica el número de elementos de cada escenario')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--motor-lexico', choices=sorted(MOTORES_LEXICOS), default='clasico')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--ejes', nargs='+', choices=list(EJES), help='Ejes que se varían (por defecto, todos)')
+    argumentos = parser.parse_args()
+
+    resultados = ejecutar(argumentos)
+    if argumentos.salida:
+        with open(argumentos.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {argumentos.salida}")
+    if argumentos.comparar:
+        with open(argumentos.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        if comparar(base, resultados, argumentos.umbral):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    principal()
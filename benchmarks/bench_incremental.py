@@ -0,0 +1,106 @@
+"""
+Compara la latencia de una edición pequeña (una pulsación de tecla) con
+CompilacionIncremental frente a una compilación completa, para documentos
+de distintos tamaños.
+
+Antes de medir comprueba, con ediciones aleatorias (incluidas las que
+rompen o reparan etiquetas, comillas y comentarios), que el resultado
+incremental coincide con el de una compilación completa.
+
+La columna '+ HTML' incluye producir la vista previa con iter_html().
+
+Uso: python -m benchmarks.bench_incremental [--tamanos 100 1000 4000] [--ediciones N]
+"""
+import argparse
+import random
+import time
+
+from Analizadores.lexer import SyntaxError as LexerSyntaxError
+from Analizadores.tabla import construir_tabla
+from Analizadores.semantic import AnalizadorSemantico
+from Analizadores.generator import GeneradorHTML
+from Analizadores.incremental import CompilacionIncremental
+from benchmarks.corpus import generar_documento
+
+FRAGMENTOS_EDICION = ['a', ' ', '\n', 'Flash', '@', '@/', '@/escena', '##', '"', "'", '=', 'nombre=',
+                      ' @poder Velocidad @/poder ', ' @dialogo Corre, Barry @/dialogo ', ' @desconocida @/desconocida ']
+
+
+def compilar_completo(codigo):
+    """Compilación completa equivalente a compilar_codigo(..., tabla_nodos=True)"""
+    try:
+        tabla = construir_tabla(codigo)
+    except LexerSyntaxError as e:
+        return {'html': None, 'errores': [{'tipo': 'léxico', 'mensaje': f"Error léxico: {str(e)}"}]}
+    except SyntaxError as e:
+        return {'html': None, 'errores': [{'tipo': 'sintáctico', 'mensaje': f"Error sintáctico: {str(e)}"}]}
+    errores = AnalizadorSemantico().analizar_tabla(tabla)
+    if errores:
+        return {'html': None, 'errores': [{'tipo': 'semántico', 'mensaje': error} for error in errores]}
+    return {'html': GeneradorHTML().generar(tabla), 'errores': []}
+
+
+def verificar(ediciones, semilla=0):
+    aleatorio = random.Random(semilla)
+    compilacion = CompilacionIncremental(generar_documento(12, semilla=semilla))
+    incrementales = 0
+    for _ in range(ediciones):
+        fuente = compilacion.fuente
+        desplazamiento = aleatorio.randrange(len(fuente) + 1)
+        borrado = min(aleatorio.choice([0, 0, 0, 1, 2, 5]), len(fuente) - desplazamiento)
+        insertado = aleatorio.choice(FRAGMENTOS_EDICION) if aleatorio.random() < 0.8 else ''
+        # Cada edición se deshace después; la mitad se conserva para que el documento evolucione
+        deshacer = (desplazamiento, len(insertado), fuente[desplazamiento:desplazamiento + borrado])
+        for edicion in [(desplazamiento, borrado, insertado), deshacer]:
+            compilacion.editar(*edicion)
+            if compilacion.ultimo_reanalisis < len(compilacion.fuente):
+                incrementales += 1
+            if compilacion.resultado() != compilar_completo(compilacion.fuente):
+                raise AssertionError(f"Resultado distinto tras editar{edicion}")
+            if aleatorio.random() < 0.5 and not compilacion.errores:
+                break
+    print(f"Verificación: {ediciones} ediciones aleatorias idénticas a la compilación completa "
+          f"({incrementales} resueltas sin reanalizar todo el documento)")
+
+
+def medir(episodios, repeticiones=50):
+    codigo = generar_documento(episodios)
+    inicio = time.perf_counter()
+    compilar_completo(codigo)
+    completa = time.perf_counter() - inicio
+    
+    compilacion = CompilacionIncremental(codigo)
+    compilacion.generar_html()
+    # Escribe y borra una letra dentro de un diálogo situado a mitad del documento
+    posicion = codigo.index('@dialogo', len(codigo) // 2) + len('@dialogo Nadie')
+    edicion = vista_previa = 0.0
+    for _ in range(repeticiones):
+        for argumentos in [(posicion, 0, 'x'), (posicion, 1, '')]:
+            inicio = time.perf_counter()
+            compilacion.editar(*argumentos)
+            medio = time.perf_counter()
+            # Equivale a enviar la vista previa por fragmentos, sin unir el documento en memoria
+            for _ in compilacion.iter_html():
+                pass
+            edicion += medio - inicio
+            vista_previa += time.perf_counter() - inicio
+    assert compilacion.resultado() == compilar_completo(codigo)
+    return len(codigo), completa, edicion / (2 * repeticiones), vista_previa / (2 * repeticiones), compilacion.ultimo_reanalisis
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Benchmark de la compilación incremental')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[100, 1000, 4000], help='Episodios de cada documento')
+    parser.add_argument('--ediciones', type=int, default=2000)
+    argumentos = parser.parse_args()
+    
+    verificar(argumentos.ediciones)
+    print(f"{'tamaño':>10} {'completa':>10} {'edición':>10} {'+ HTML':>10} {'reanalizado':>12}")
+    for episodios in argumentos.tamanos:
+        tamano, completa, edicion, vista_previa, reanalizado = medir(episodios)
+        print(f"{tamano / 1024:8.0f}KB {completa * 1000:8.1f}ms {edicion * 1000:8.2f}ms "
+              f"{vista_previa * 1000:8.2f}ms {reanalizado:10d} B")
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,77 @@
+"""
+Compara la escritura del código intermedio JSON:
+
+- diccionarios: GeneradorIntermedio.generar_json() seguido de json.dump(indent=2),
+  el camino usado anteriormente por compilar_codigo
+- flujo indentado / flujo compacto: GeneradorIntermedio.escribir_json()
+
+Cada variante se ejecuta en un proceso nuevo para que el pico de RSS
+(memoria residente máxima) sea comparable entre variantes.
+
+Uso: python -m benchmarks.bench_intermedio [--episodios N]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from Analizadores.lexer import AnalizadorLexicoRapido
+from Analizadores.parser import AnalizadorSintactico
+from Analizadores.intermedio import GeneradorIntermedio
+from benchmarks.corpus import generar_documento
+
+VARIANTES = ['diccionarios', 'flujo indentado', 'flujo compacto']
+
+
+def _pico_rss_mb():
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def ejecutar_variante(variante, episodios):
+    """Se ejecuta dentro del proceso hijo: construye el AST y escribe el intermedio"""
+    ast = AnalizadorSintactico(AnalizadorLexicoRapido(generar_documento(episodios)).iter_tokens()).analizar()
+    rss_previo = _pico_rss_mb()
+    generador = GeneradorIntermedio()
+    
+    with tempfile.TemporaryFile('w', encoding='utf-8') as destino:
+        inicio = time.perf_counter()
+        if variante == 'diccionarios':
+            json.dump(generador.generar_json(ast), destino, ensure_ascii=False, indent=2)
+        else:
+            generador.escribir_json(ast, destino, indentar=2 if variante == 'flujo indentado' else None)
+        segundos = time.perf_counter() - inicio
+        tamano = destino.tell()
+    
+    print(json.dumps({'segundos': segundos, 'rss_previo': rss_previo, 'rss_pico': _pico_rss_mb(), 'tamano': tamano}))
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Benchmark de escritura del código intermedio')
+    parser.add_argument('--episodios', type=int, default=3000)
+    parser.add_argument('--variante', choices=VARIANTES, help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+    
+    if argumentos.variante:
+        ejecutar_variante(argumentos.variante, argumentos.episodios)
+        return
+    
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'variante':>16} {'tiempo':>10} {'pico RSS':>10} {'RSS extra':>10} {'tamaño':>10}")
+    for variante in VARIANTES:
+        salida = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_intermedio', '--episodios', str(argumentos.episodios), '--variante', variante],
+            cwd=raiz, capture_output=True, text=True, check=True
+        ).stdout
+        datos = json.loads(salida)
+        print(f"{variante:>16} {datos['segundos'] * 1000:8.1f}ms {datos['rss_pico']:8.1f}MB "
+              f"{datos['rss_pico'] - datos['rss_previo']:8.1f}MB {datos['tamano'] / (1024 * 1024):8.2f}MB")
+
+
+if __name__ == "__main__":
+    principal()
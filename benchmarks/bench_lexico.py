@@ -0,0 +1,85 @@
+"""
+Compara los motores léxicos de FlashML.
+
+Primero verifica que ambos producen la misma secuencia de tokens (tipo, valor
+y posición) sobre un corpus sintético y casos límite; después mide el
+rendimiento de cada motor en MB/s.
+
+Uso: python -m benchmarks.bench_lexico [--episodios N] [--repeticiones N]
+"""
+import argparse
+import time
+
+from Analizadores.lexer import MOTORES_LEXICOS, SyntaxError as LexerSyntaxError
+from benchmarks.corpus import generar_documento
+
+CASOS_LIMITE = [
+    '',
+    '   \n\t ',
+    '@velocista @/velocista',
+    '@titulo Central City @/titulo',
+    '@personaje nombre="Barry" actor=\'Grant\' @/personaje',
+    'palabra@titulo',
+    'x ## comentario ## y',
+    'nombre = "sin atributo"',
+    '@ @/ @/_a1 ²texto é="v"',
+    '"comilla sin cerrar',
+    '## comentario sin cerrar',
+    'linea1\nlinea2\r\n\x0b@titulo\xa0x@/titulo',
+]
+
+
+def _tokens(motor, codigo):
+    try:
+        return [(t.tipo, t.valor, t.posicion) for t in MOTORES_LEXICOS[motor](codigo).tokenizar()]
+    except LexerSyntaxError as e:
+        return ('error', str(e))
+
+
+def verificar(documento):
+    """Comprueba que todos los motores coinciden con el motor clásico"""
+    for codigo in CASOS_LIMITE + [documento]:
+        esperado = _tokens('clasico', codigo)
+        for motor in MOTORES_LEXICOS:
+            if _tokens(motor, codigo) != esperado:
+                raise AssertionError(f"El motor '{motor}' difiere del clásico para: {codigo[:60]!r}")
+
+
+def documento_con_texto_largo(lineas):
+    """Documento con una única ejecución de texto muy larga, el peor caso del motor clásico"""
+    linea = 'Texto largo de episodio con muchas palabras. ' * 20
+    return '@velocista @dialogo\n' + (linea + '\n') * lineas + '@/dialogo @/velocista\n'
+
+
+def medir(motor, documento, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        MOTORES_LEXICOS[motor](documento).tokenizar()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Benchmark de los motores léxicos de FlashML')
+    parser.add_argument('--episodios', type=int, default=500)
+    parser.add_argument('--lineas-texto', type=int, default=100)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    argumentos = parser.parse_args()
+    
+    documentos = {
+        'corpus': generar_documento(argumentos.episodios),
+        'texto largo': documento_con_texto_largo(argumentos.lineas_texto),
+    }
+    
+    for nombre, documento in documentos.items():
+        verificar(documento)
+        megabytes = len(documento.encode('utf-8')) / (1024 * 1024)
+        print(f"{nombre}: {megabytes:.2f} MB, tokens idénticos en todos los motores")
+        for motor in MOTORES_LEXICOS:
+            segundos = medir(motor, documento, argumentos.repeticiones)
+            print(f"  {motor:>8}: {segundos * 1000:9.1f} ms  {megabytes / segundos:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,99 @@
+"""
+Mide con tracemalloc la memoria por nodo del AST y por token.
+
+Compara la representación actual (__slots__, nombres de etiqueta internados,
+atributos e hijos compartidos mientras están vacíos) con la representación
+anterior, basada en clases con __dict__ y un diccionario y una lista nuevos
+por cada elemento, que se reproduce aquí solo como referencia.
+
+Uso: python -m benchmarks.bench_memoria [--elementos N]
+"""
+import argparse
+import tracemalloc
+
+from Analizadores.lexer import AnalizadorLexicoRapido, TipoToken, Token
+from Analizadores.parser import AnalizadorSintactico, Documento, Elemento
+from benchmarks.corpus import generar_documento
+
+ELEMENTOS_POR_EPISODIO = 17
+
+
+class _TokenAnterior:
+    def __init__(self, tipo_token, valor, posicion):
+        self.tipo = tipo_token
+        self.valor = valor
+        self.posicion = posicion
+
+
+class _DocumentoAnterior:
+    def __init__(self):
+        self.hijos = []
+
+
+class _ElementoAnterior:
+    def __init__(self, nombre_etiqueta):
+        self.nombre_etiqueta = nombre_etiqueta
+        self.atributos = {}
+        self.hijos = []
+
+
+class _TextoAnterior:
+    def __init__(self, texto):
+        self.texto = texto
+
+
+def _a_representacion_anterior(nodo):
+    """Reconstruye el árbol con las clases anteriores, reutilizando las mismas cadenas"""
+    if isinstance(nodo, Documento):
+        copia = _DocumentoAnterior()
+    elif isinstance(nodo, Elemento):
+        copia = _ElementoAnterior(nodo.nombre_etiqueta)
+        for nombre, valor in nodo.atributos.items():
+            copia.atributos[nombre] = valor
+    else:
+        return _TextoAnterior(nodo.texto)
+    for hijo in nodo.hijos:
+        copia.hijos.append(_a_representacion_anterior(hijo))
+    return copia
+
+
+def _contar_nodos(nodo):
+    return 1 + sum(_contar_nodos(hijo) for hijo in getattr(nodo, 'hijos', ()))
+
+
+def _memoria(funcion, *argumentos):
+    """Devuelve el resultado de la función y los bytes que siguen reservados al terminar"""
+    tracemalloc.start()
+    resultado = funcion(*argumentos)
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, actual
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Memoria por nodo del AST de FlashML')
+    parser.add_argument('--elementos', type=int, default=100_000)
+    argumentos = parser.parse_args()
+    
+    documento = generar_documento(argumentos.elementos // ELEMENTOS_POR_EPISODIO + 1)
+    tokens = AnalizadorLexicoRapido(documento).tokenizar()
+    
+    ast, bytes_actual = _memoria(AnalizadorSintactico(tokens).analizar)
+    _, bytes_anterior = _memoria(_a_representacion_anterior, ast)
+    nodos = _contar_nodos(ast)
+    elementos = sum(1 for token in tokens if token.tipo == TipoToken.ETIQUETA_APERTURA)
+    
+    print(f"AST: {nodos} nodos ({elementos} elementos)")
+    print(f"  anterior: {bytes_anterior / nodos:7.1f} bytes/nodo")
+    print(f"  actual:   {bytes_actual / nodos:7.1f} bytes/nodo")
+    
+    muestras = [(token.tipo, token.valor, token.posicion) for token in tokens]
+    _, bytes_tokens_anterior = _memoria(lambda: [_TokenAnterior(*m) for m in muestras])
+    _, bytes_tokens_actual = _memoria(lambda: [Token(*m) for m in muestras])
+    print(f"Tokens: {len(muestras)}")
+    print(f"  anterior: {bytes_tokens_anterior / len(muestras):7.1f} bytes/token")
+    print(f"  actual:   {bytes_tokens_actual / len(muestras):7.1f} bytes/token")
+
+
+if __name__ == "__main__":
+    principal()
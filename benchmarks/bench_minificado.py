@@ -0,0 +1,71 @@
+"""
+Compara el HTML con formato (indentado) con el HTML minificado
+(GeneradorHTML(minificar=True)): tamaño sin comprimir y con gzip, y tiempo
+de generación, para documentos de distintos tamaños. Las páginas incluyen
+el CSS y el script; con --recursos-externos se enlazan.
+
+Antes de medir comprueba que el texto de cada nodo aparece intacto y en
+orden en la salida minificada.
+
+Uso: python -m benchmarks.bench_minificado [--tamanos 1 10 100 1000] [--recursos-externos]
+"""
+import argparse
+import gzip
+import time
+
+from Analizadores.lexer import AnalizadorLexicoRapido
+from Analizadores.parser import AnalizadorSintactico, NodoTexto
+from Analizadores.generator import GeneradorHTML
+from benchmarks.corpus import generar_documento
+
+RECURSOS = {'css': '/output/flashml.css', 'js': '/output/flashml.js'}
+
+
+def verificar(ast, html):
+    """Cada texto del documento aparece exactamente y en orden en el HTML"""
+    posicion = 0
+    pila = [ast]
+    while pila:
+        nodo = pila.pop()
+        if isinstance(nodo, NodoTexto):
+            posicion = html.index(nodo.texto, posicion) + len(nodo.texto)
+        pila.extend(reversed(getattr(nodo, 'hijos', None) or []))
+
+
+def medir(generador, ast, repeticiones=5):
+    """Mejor tiempo de generación y el HTML generado"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        html = generador.generar(ast)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor, html
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Benchmark del HTML minificado')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1, 10, 100, 1000], help='Episodios de cada documento')
+    parser.add_argument('--recursos-externos', action='store_true', help='Enlaza el CSS y el script en lugar de incluirlos')
+    argumentos = parser.parse_args()
+    recursos = RECURSOS if argumentos.recursos_externos else None
+
+    print(f"{'tamaño':>10} {'modo':>11} {'bytes':>10} {'gzip':>9} {'generación':>11}")
+    for episodios in argumentos.tamanos:
+        ast = AnalizadorSintactico(AnalizadorLexicoRapido(generar_documento(episodios)).iter_tokens()).analizar()
+        filas = []
+        for modo, minificar in [('formato', False), ('minificado', True)]:
+            segundos, html = medir(GeneradorHTML(recursos, minificar), ast)
+            if minificar:
+                verificar(ast, html)
+            datos = html.encode('utf-8')
+            filas.append((modo, len(datos), len(gzip.compress(datos, compresslevel=6)), segundos))
+        for modo, bytes_html, bytes_gzip, segundos in filas:
+            print(f"{episodios:>7} ep {modo:>11} {bytes_html:10d} {bytes_gzip:9d} {segundos * 1000:9.2f}ms")
+        (_, base, base_gzip, base_tiempo), (_, minimo, minimo_gzip, minimo_tiempo) = filas
+        print(f"{'':>10} {'diferencia':>11} {minimo / base - 1:+10.1%} {minimo_gzip / base_gzip - 1:+9.1%} "
+              f"{minimo_tiempo / base_tiempo - 1:+10.1%}")
+
+
+if __name__ == "__main__":
+    principal()
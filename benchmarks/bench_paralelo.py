@@ -0,0 +1,62 @@
+"""
+Mide la generación de HTML y JSON intermedio de un documento grande con
+1 a N procesos (Analizadores/paralelo.py) y comprueba que la salida es
+idéntica byte a byte a la generación secuencial.
+
+El tiempo de cada variante incluye crear los procesos, devolver los
+fragmentos y unirlos; la aceleración está limitada por los núcleos
+disponibles y por la parte secuencial (la unión y la serialización de los
+fragmentos entre procesos).
+
+Uso: python -m benchmarks.bench_paralelo [--episodios N] [--procesos 1 2 4 8]
+"""
+import argparse
+import os
+import time
+
+from Analizadores.lexer import AnalizadorLexicoRapido
+from Analizadores.parser import AnalizadorSintactico
+from Analizadores.generator import GeneradorHTML
+from Analizadores.intermedio import GeneradorIntermedio
+from Analizadores.paralelo import generar_fragmentos
+from benchmarks.corpus import generar_documento
+
+
+def generar(ast, procesos):
+    """HTML y JSON compacto del documento; con procesos=None, de forma secuencial"""
+    fragmentos_html = fragmentos_json = None
+    if procesos:
+        fragmentos_html, fragmentos_json = generar_fragmentos(ast, procesos)
+    html = GeneradorHTML().generar(ast, fragmentos_html)
+    json = ''.join(GeneradorIntermedio().iter_json(ast, fragmentos=fragmentos_json))
+    return html, json
+
+
+def principal():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Benchmark de la generación en paralelo')
+    parser.add_argument('--episodios', type=int, default=5000)
+    parser.add_argument('--procesos', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cpus} | ({8} if cpus >= 8 else set())))
+    argumentos = parser.parse_args()
+    
+    ast = AnalizadorSintactico(AnalizadorLexicoRapido(generar_documento(argumentos.episodios)).iter_tokens()).analizar()
+    
+    inicio = time.perf_counter()
+    referencia = generar(ast, None)
+    secuencial = time.perf_counter() - inicio
+    print(f"{argumentos.episodios} episodios, {cpus} CPU disponibles")
+    print(f"{'procesos':>10} {'tiempo':>10} {'aceleración':>12}")
+    print(f"{'secuencial':>10} {secuencial * 1000:8.1f}ms {1.0:11.2f}x")
+    
+    for procesos in argumentos.procesos:
+        inicio = time.perf_counter()
+        salida = generar(ast, procesos)
+        segundos = time.perf_counter() - inicio
+        if salida != referencia:
+            raise AssertionError(f"La salida con {procesos} procesos difiere de la secuencial")
+        print(f"{procesos:>10} {segundos * 1000:8.1f}ms {secuencial / segundos:11.2f}x")
+
+
+if __name__ == "__main__":
+    principal()
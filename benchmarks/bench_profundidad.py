@@ -0,0 +1,67 @@
+"""
+Mide el analizador sintáctico y los recorridos del AST sobre documentos
+extremos: un anidamiento muy profundo y un elemento con muchísimos hijos.
+
+Con las implementaciones recursivas el documento profundo superaba el
+límite de recursión de Python; ahora todas las fases usan pilas explícitas.
+
+Uso: python -m benchmarks.bench_profundidad [--profundidad N] [--ancho N]
+"""
+import argparse
+import sys
+import time
+
+from Analizadores.lexer import AnalizadorLexicoRapido
+from Analizadores.parser import AnalizadorSintactico
+from Analizadores.semantic import AnalizadorSemantico
+from Analizadores.intermedio import GeneradorIntermedio
+from Analizadores.generator import GeneradorHTML
+
+
+def documento_profundo(profundidad):
+    return '@velocista\n' + '@escena ' * profundidad + 'centro' + ' @/escena' * profundidad + '\n@/velocista\n'
+
+
+def documento_ancho(ancho):
+    return '@velocista\n' + '  @poder Supervelocidad @/poder\n' * ancho + '@/velocista\n'
+
+
+def medir_fases(codigo):
+    tiempos = {}
+    
+    inicio = time.perf_counter()
+    ast = AnalizadorSintactico(AnalizadorLexicoRapido(codigo).iter_tokens()).analizar()
+    tiempos['léxico+sintáctico'] = time.perf_counter() - inicio
+    
+    fases = [
+        ('semántico', AnalizadorSemantico().analizar),
+        ('intermedio', GeneradorIntermedio().generar_json),
+        ('html', GeneradorHTML().generar),
+    ]
+    for nombre, fase in fases:
+        inicio = time.perf_counter()
+        fase(ast)
+        tiempos[nombre] = time.perf_counter() - inicio
+    
+    return tiempos
+
+
+def principal():
+    parser = argparse.ArgumentParser(description='Benchmark de anidamiento profundo y documentos anchos')
+    parser.add_argument('--profundidad', type=int, default=10_000)
+    parser.add_argument('--ancho', type=int, default=1_000_000)
+    argumentos = parser.parse_args()
+    
+    print(f"Límite de recursión de Python: {sys.getrecursionlimit()}")
+    documentos = [
+        (f"profundidad {argumentos.profundidad}", documento_profundo(argumentos.profundidad)),
+        (f"ancho {argumentos.ancho}", documento_ancho(argumentos.ancho)),
+    ]
+    for nombre, codigo in documentos:
+        print(f"{nombre} ({len(codigo) / (1024 * 1024):.1f} MB):")
+        for fase, segundos in medir_fases(codigo).items():
+            print(f"  {fase:>18}: {segundos * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    principal()
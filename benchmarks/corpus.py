@@ -0,0 +1,127 @@
+"""
+Generador determinista de documentos FlashML sintéticos para los benchmarks
+"""
+import random
+from collections import deque
+
+from Analizadores.semantic import ETIQUETAS_PERMITIDAS
+
+PODERES = ['superspeed', 'phasing', 'cryokinesis', 'vibration', 'timetravel', 'speedforce', 'metahuman']
+
+PERSONAJES = [('Barry Allen', 'Grant Gustin'), ('Iris West', 'Candice Patton'),
+              ('Cisco Ramon', 'Carlos Valdes'), ('Caitlin Snow', 'Danielle Panabaker')]
+
+
+def generar_documento(episodios=100, escenas=3, semilla=0):
+    """Genera un documento válido con el número de episodios y escenas por episodio indicados"""
+    aleatorio = random.Random(semilla)
+    partes = ['@velocista\n  @titulo Archivo de Central City @/titulo\n']
+    for numero_episodio in range(episodios):
+        if numero_episodio % 10 == 0:
+            if numero_episodio:
+                partes.append('  @/temporada\n')
+            partes.append(f'  @temporada numero="{numero_episodio // 10 + 1}"\n')
+        partes.append(f'    @episodio\n      @titulo Episodio {numero_episodio + 1} @/titulo\n')
+        for _ in range(escenas):
+            nombre, actor = aleatorio.choice(PERSONAJES)
+            poder = aleatorio.choice(PODERES)
+            partes.append(
+                '      @escena\n'
+                f'        ## Escena generada {aleatorio.randrange(10 ** 6)} ##\n'
+                f'        @personaje nombre="{nombre}" actor="{actor}"\n'
+                f'          @dialogo Nadie es más rápido que yo, dijo {nombre}. @/dialogo\n'
+                '        @/personaje\n'
+                f'        @accion Corre por la ciudad con @{poder} energía pura @/{poder} @/accion\n'
+                '      @/escena\n'
+            )
+        partes.append('    @/episodio\n')
+    if episodios:
+        partes.append('  @/temporada\n')
+    partes.append('@/velocista\n')
+    return ''.join(partes)
+
+
+# Etiquetas de poderes de la tabla del analizador semántico (las que admite @accion)
+PODERES_TABLA = [etiqueta for etiqueta, info in ETIQUETAS_PERMITIDAS.items()
+                 if info['permitido_en'] and 'accion' in info['permitido_en']]
+
+# Hijos que admite cada etiqueta según la tabla, separados en poderes y resto
+_HIJOS = {
+    padre: ([hijo for hijo, info in ETIQUETAS_PERMITIDAS.items()
+             if info['permitido_en'] and padre in info['permitido_en'] and hijo not in PODERES_TABLA],
+            [hijo for hijo in PODERES_TABLA if padre in ETIQUETAS_PERMITIDAS[hijo]['permitido_en']])
+    for padre in ETIQUETAS_PERMITIDAS
+}
+
+# Atributos opcionales que el generador HTML conoce; el resto de 'opcional' son nombres de etiquetas
+_ATRIBUTOS_CONOCIDOS = {'actor', 'alt', 'velocidad'}
+
+PALABRAS = ['Barry', 'corre', 'Central', 'City', 'velocidad', 'tiempo', 'Flash', 'rayo',
+            'laboratorio', 'S.T.A.R.', 'Iris', 'Cisco', 'metahumano', 'fuerza', 'rápido']
+
+
+def generar_documento_variado(elementos=1000, profundidad=6, densidad_atributos=0.5, proporcion_texto=0.6,
+                              proporcion_comentarios=0.1, mezcla_poderes=0.3, semilla=0):
+    """
+    Genera un documento válido de unos elementos elementos variando cada eje por separado:
+    profundidad (niveles de anidamiento bajo @velocista; la tabla de etiquetas permite
+    como mucho 7), densidad_atributos (probabilidad de incluir cada atributo opcional),
+    proporcion_texto y proporcion_comentarios (probabilidad de que un elemento tenga
+    texto o un comentario) y mezcla_poderes (probabilidad de que un hijo sea una
+    etiqueta de poder cuando su padre las admite). Las etiquetas y sus relaciones
+    salen de ETIQUETAS_PERMITIDAS, así que el documento pasa el análisis semántico.
+    """
+    if profundidad < 1:
+        raise ValueError("profundidad debe ser al menos 1")
+    aleatorio = random.Random(semilla)
+    
+    def texto(minimo, maximo):
+        return ' '.join(aleatorio.choice(PALABRAS) for _ in range(aleatorio.randint(minimo, maximo)))
+    
+    def nuevo(etiqueta, nivel):
+        info = ETIQUETAS_PERMITIDAS[etiqueta]
+        atributos = [(nombre, texto(1, 2)) for nombre in info['requerido']]
+        atributos += [(nombre, texto(1, 3)) for nombre in info['opcional']
+                      if nombre in _ATRIBUTOS_CONOCIDOS and aleatorio.random() < densidad_atributos]
+        contenido = []
+        if aleatorio.random() < proporcion_comentarios:
+            contenido.append(f"## {texto(2, 6)} ##")
+        if aleatorio.random() < proporcion_texto or not _HIJOS[etiqueta][0] and not _HIJOS[etiqueta][1]:
+            contenido.append(texto(3, 12))
+        return {'etiqueta': etiqueta, 'atributos': atributos, 'contenido': contenido, 'hijos': [], 'nivel': nivel}
+    
+    raiz = nuevo('velocista', 0)
+    total = 1
+    abiertos = deque()
+    while total < elementos:
+        if not abiertos:
+            # Cuando se llega al límite de profundidad se siguen agregando ramas desde la raíz
+            abiertos.append(raiz)
+        padre = abiertos.popleft()
+        normales, poderes = _HIJOS[padre['etiqueta']]
+        if padre['nivel'] >= profundidad or not normales and not poderes:
+            continue
+        for _ in range(aleatorio.randint(1, 4)):
+            if poderes and (not normales or aleatorio.random() < mezcla_poderes):
+                etiqueta = aleatorio.choice(poderes)
+            else:
+                etiqueta = aleatorio.choice(normales)
+            hijo = nuevo(etiqueta, padre['nivel'] + 1)
+            padre['hijos'].append(hijo)
+            abiertos.append(hijo)
+            total += 1
+    
+    partes = []
+    pila = [(raiz, False)]
+    while pila:
+        nodo, cerrar = pila.pop()
+        sangria = '  ' * nodo['nivel']
+        if cerrar:
+            partes.append(f"{sangria}@/{nodo['etiqueta']}\n")
+            continue
+        atributos = ''.join(f' {nombre}="{valor}"' for nombre, valor in nodo['atributos'])
+        partes.append(f"{sangria}@{nodo['etiqueta']}{atributos}\n")
+        partes.extend(f"{sangria}  {linea}\n" for linea in nodo['contenido'])
+        pila.append((nodo, True))
+        pila.extend((hijo, False) for hijo in reversed(nodo['hijos']))
+    return ''.join(partes)
@@ -1,150 +1,684 @@
-
 import argparse
+import cProfile
+import glob
 import os
-import json
 import logging
-from Analizadores.lexer import AnalizadorLexico, SyntaxError as LexerSyntaxError
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from Analizadores.lexer import MOTORES_LEXICOS, SyntaxError as LexerSyntaxError, iter_tokens_recuperando
 from Analizadores.parser import AnalizadorSintactico
 from Analizadores.semantic import AnalizadorSemantico
-from Analizadores.generator import GeneradorHTML
+from Analizadores.generator import GeneradorHTML, publicar_recursos
 from Analizadores.intermedio import GeneradorIntermedio
+from Analizadores.tabla import construir_tabla
+from Analizadores.cache import CacheCompilacion
+from Analizadores.paralelo import generar_fragmentos
+from Analizadores.persistencia import archivo_atomico, escribir_atomico
+from Analizadores.progreso import MODOS_PROGRESO, SILENCIOSO, ProgresoHumano, configurar_registro
+from Analizadores.medicion import SIN_MEDICION, MedicionFases, ContadorTokens, contar_nodos, formatear_metricas
+
+# El registro se configura en principal() (ver configurar_registro); importar este módulo no crea archivos.
+# Sin configurar, los mensajes se descartan en lugar de escribirse en la salida de errores
+registro = logging.getLogger('flashml')
+registro.addHandler(logging.NullHandler())
+
+EXTENSIONES_INTERMEDIO = {
+    'json': '.json',
+    'binario': '.fmlb',
+}
+
+# Forma parte de la clave de la caché: cambiarla invalida los resultados guardados
+VERSION_COMPILADOR = "1.1.1"
+
+_huella_tablas = None
+
+# El esquema de etiquetas se compila al importar semantic.py; el analizador no guarda
+# estado entre análisis, así que se comparte entre compilaciones (y entre hilos)
+_analizador_semantico = AnalizadorSemantico()
+
+def huella_tablas():
+    """Tablas de etiquetas y atributos que determinan la salida, para la clave de la caché"""
+    global _huella_tablas
+    if _huella_tablas is None:
+        generador_html = GeneradorHTML()
+        _huella_tablas = {
+            'etiquetas_permitidas': _analizador_semantico.etiquetas_permitidas,
+            'mapeo_etiquetas': generador_html.mapeo_etiquetas,
+            'mapeo_atributos': generador_html.mapeo_atributos,
+        }
+    return _huella_tablas
+
+def _validar_opciones(motor_lexico, formato_intermedio, tabla_nodos, procesos_generacion, recuperar_errores=False):
+    if motor_lexico not in MOTORES_LEXICOS:
+        raise ValueError(f"Motor léxico desconocido: {motor_lexico}")
+    if formato_intermedio not in EXTENSIONES_INTERMEDIO:
+        raise ValueError(f"Formato intermedio desconocido: {formato_intermedio}")
+    if procesos_generacion and tabla_nodos:
+        raise ValueError("procesos_generacion no se puede combinar con tabla_nodos")
+    if recuperar_errores and tabla_nodos:
+        raise ValueError("recuperar_errores no se puede combinar con tabla_nodos")
+
+def _clave_cache(cache, codigo_fuente, formato_intermedio, json_indentado, recursos, minificar, en_flujo=False,
+                 recuperar_errores=False):
+    # El motor léxico y la representación del AST no cambian la salida, así que no forman parte de la clave.
+    # Los errores sí pueden cambiar: en flujo (flujo_tokens o tabla_nodos) el análisis se detiene en el primer
+    # error sintáctico sin leer el resto del código, mientras que con la lista de tokens se informa antes de
+    # un error léxico posterior; como la caché también guarda los errores, en_flujo forma parte de la clave
+    componentes = [VERSION_COMPILADOR, huella_tablas(), formato_intermedio, json_indentado and formato_intermedio == 'json']
+    if en_flujo:
+        componentes.append('flujo')
+    if recursos:
+        componentes.append(recursos)
+    if minificar:
+        componentes.append('minificado')
+    if recuperar_errores:
+        # La salida es la misma, pero los errores guardados pueden ser más
+        componentes.append('recuperacion')
+    return cache.calcular_clave(codigo_fuente, *componentes)
+
+def _analizar(codigo_fuente, motor_lexico, flujo_tokens, tabla_nodos, errores, progreso=SILENCIOSO, medicion=SIN_MEDICION,
+              recuperar_errores=False):
+    """
+    Fases 1 a 3 (análisis léxico, sintáctico y semántico). Devuelve el AST validado,
+    o None si hubo errores, que se agregan a la lista errores. Los eventos de
+    progreso se envían a progreso y los tiempos de cada fase se anotan en medicion.
+    
+    Con recuperar_errores, los errores léxicos y sintácticos no detienen el análisis:
+    se reúnen todos con su posición, el análisis semántico se ejecuta sobre el AST
+    parcial y se informa de todos los errores a la vez.
+    """
+    progreso.evento('fase', numero=1, nombre="Análisis léxico")
+    if medicion.activa:
+        medicion.contar('bytes_entrada', len(codigo_fuente.encode('utf-8')))
+    
+    # Fase 1: Análisis léxico (tokenización)
+    analizador_lexico = MOTORES_LEXICOS[motor_lexico](codigo_fuente)
+    errores_lexicos = []
+    if tabla_nodos:
+        # La tabla de nodos se construye en una sola pasada durante el análisis sintáctico
+        progreso.evento('tokens_en_tabla')
+    elif flujo_tokens:
+        # Los tokens se generan bajo demanda durante el análisis sintáctico (y su tiempo se mide en él)
+        if recuperar_errores:
+            tokens = iter_tokens_recuperando(analizador_lexico, errores_lexicos)
+        else:
+            tokens = analizador_lexico.iter_tokens()
+        if medicion.activa:
+            tokens = ContadorTokens(tokens)
+        progreso.evento('tokens_en_flujo')
+    else:
+        try:
+            with medicion.fase('léxico'):
+                if recuperar_errores:
+                    tokens = list(iter_tokens_recuperando(analizador_lexico, errores_lexicos))
+                else:
+                    tokens = analizador_lexico.tokenizar()
+        except LexerSyntaxError as e:
+            error_msg = f"Error léxico: {str(e)}"
+            errores.append({'tipo': 'léxico', 'mensaje': error_msg})
+            registro.error("%s", error_msg)
+            return None
+        
+        progreso.evento('tokens', cantidad=len(tokens))
+        medicion.contar('tokens', len(tokens))
+        registro.info("Análisis léxico completado. %d tokens encontrados.", len(tokens))
+    progreso.evento('fase', numero=2, nombre="Análisis sintáctico")
+    
+    # Fase 2: Análisis sintáctico (parsing)
+    try:
+        with medicion.fase('sintáctico'):
+            if tabla_nodos:
+                arbol_sintactico = construir_tabla(codigo_fuente)
+            else:
+                analizador_sintactico = AnalizadorSintactico(tokens, recuperar=recuperar_errores)
+                arbol_sintactico = analizador_sintactico.analizar()
+    except LexerSyntaxError as e:
+        # Solo en modo flujo o tabla: los errores léxicos aparecen al consumir los tokens
+        error_msg = f"Error léxico: {str(e)}"
+        errores.append({'tipo': 'léxico', 'mensaje': error_msg})
+        registro.error("%s", error_msg)
+        return None
+    except SyntaxError as e:
+        error_msg = f"Error sintáctico: {str(e)}"
+        errores.append({'tipo': 'sintáctico', 'mensaje': error_msg})
+        registro.error("%s", error_msg)
+        return None
+    
+    if flujo_tokens and not tabla_nodos and medicion.activa:
+        medicion.contar('tokens', tokens.cantidad)
+    
+    errores_recuperados = 0
+    if recuperar_errores:
+        errores_recuperados = _agregar_errores_recuperados(errores, errores_lexicos, analizador_sintactico.errores)
+    if errores_recuperados:
+        progreso.evento('errores_sintacticos', errores=[error['mensaje'] for error in errores[-errores_recuperados:]])
+        progreso.evento('ast_parcial')
+    else:
+        progreso.evento('ast')
+    progreso.evento('fase', numero=3, nombre="Análisis semántico")
+    registro.info("Análisis sintáctico completado. AST construido.")
+    
+    # Fase 3: Análisis semántico (validación)
+    with medicion.fase('semántico'):
+        if tabla_nodos:
+            errores_semanticos = _analizador_semantico.analizar_tabla(arbol_sintactico)
+        else:
+            errores_semanticos = _analizador_semantico.analizar(arbol_sintactico)
+    if medicion.activa:
+        medicion.contar('nodos', contar_nodos(arbol_sintactico))
+    
+    if errores_semanticos:
+        progreso.evento('errores_semanticos', errores=errores_semanticos)
+        for error in errores_semanticos:
+            errores.append({'tipo': 'semántico', 'mensaje': error})
+            registro.error("Error semántico: %s", error)
+        return None
+    if errores_recuperados:
+        return None
+    
+    progreso.evento('semantico_correcto')
+    registro.info("Análisis semántico completado sin errores.")
+    return arbol_sintactico
+
+def _agregar_errores_recuperados(errores, errores_lexicos, errores_sintacticos):
+    """
+    Agrega a errores los (mensaje, posición) reunidos en modo recuperación, en el orden
+    en que aparecen en el código y con la línea y la columna por separado, y devuelve
+    cuántos se agregaron
+    """
+    reunidos = [('léxico', "Error léxico", mensaje, posicion) for mensaje, posicion in errores_lexicos]
+    reunidos += [('sintáctico', "Error sintáctico", mensaje, posicion) for mensaje, posicion in errores_sintacticos]
+    reunidos.sort(key=lambda reunido: (reunido[3] is None, reunido[3] or (0, 0)))
+    for tipo, prefijo, mensaje, posicion in reunidos:
+        error = {'tipo': tipo, 'mensaje': f"{prefijo}: {mensaje}"}
+        if posicion is not None:
+            error['linea'], error['columna'] = posicion
+        errores.append(error)
+        registro.error("%s", error['mensaje'])
+    return len(reunidos)
+
+def _fragmentos_paralelos(arbol_sintactico, procesos_generacion, formato_intermedio, json_indentado, minificar,
+                          medicion=SIN_MEDICION):
+    """Fragmentos de HTML y JSON generados en paralelo, o (None, None) si la generación es secuencial"""
+    if procesos_generacion and procesos_generacion > 1:
+        # Los subárboles se generan en paralelo; las fases 4 y 5 solo unen los fragmentos.
+        # El HTML minificado no se divide en fragmentos (ver GeneradorHTML.iter_generar)
+        with medicion.fase('fragmentos'):
+            return generar_fragmentos(arbol_sintactico, procesos_generacion, html=not minificar,
+                                      json=formato_intermedio == 'json', indentar_json=2 if json_indentado else None)
+    return None, None
+
+def compilar_en_memoria(codigo_fuente, motor_lexico="clasico", flujo_tokens=False, tabla_nodos=False,
+                        json_indentado=False, formato_intermedio="json", cache=None, procesos_generacion=None,
+                        recursos=None, minificar=False, metricas=False, recuperar_errores=False):
+    """
+    Compila un código FlashML sin escribir ningún archivo ni mensajes de progreso
+    
+    Acepta las mismas opciones que compilar_codigo. Para guardar el resultado en
+    disco, ver guardar_resultado en Analizadores/persistencia.py.
+    
+    Returns:
+        dict: Resultado con 'html' (código HTML), 'intermedio' (código intermedio: str con
+            el JSON o bytes con el formato binario), 'errores' (lista de errores) y, si se
+            pidieron, 'metricas'
+    """
+    _validar_opciones(motor_lexico, formato_intermedio, tabla_nodos, procesos_generacion, recuperar_errores)
+    medicion = MedicionFases() if metricas else SIN_MEDICION
+    
+    if cache is not None:
+        with medicion.fase('caché'):
+            clave = _clave_cache(cache, codigo_fuente, formato_intermedio, json_indentado, recursos, minificar,
+                                 flujo_tokens or tabla_nodos, recuperar_errores)
+            entrada = cache.obtener(clave)
+        medicion.contar('cache', 'fallo' if entrada is None else 'acierto')
+        if entrada is not None:
+            resultado = {'html': entrada['html'], 'intermedio': entrada['intermedio'],
+                         'errores': [dict(error) for error in entrada['errores']]}
+            return _con_metricas(resultado, medicion)
+    
+    registro.info("Iniciando compilación en memoria")
+    resultado = {'html': None, 'intermedio': None, 'errores': []}
+    try:
+        arbol_sintactico = _analizar(codigo_fuente, motor_lexico, flujo_tokens, tabla_nodos, resultado['errores'],
+                                     medicion=medicion, recuperar_errores=recuperar_errores)
+        if arbol_sintactico is not None:
+            fragmentos_html, fragmentos_json = _fragmentos_paralelos(arbol_sintactico, procesos_generacion,
+                                                                     formato_intermedio, json_indentado, minificar,
+                                                                     medicion)
+            generador_intermedio = GeneradorIntermedio()
+            with medicion.fase('intermedio'):
+                if formato_intermedio == 'binario':
+                    resultado['intermedio'] = generador_intermedio.generar_binario(arbol_sintactico)
+                else:
+                    resultado['intermedio'] = ''.join(generador_intermedio.iter_json(
+                        arbol_sintactico, indentar=2 if json_indentado else None, fragmentos=fragmentos_json))
+            with medicion.fase('html'):
+                resultado['html'] = GeneradorHTML(recursos, minificar).generar(arbol_sintactico, fragmentos_html)
+            if medicion.activa:
+                medicion.contar('bytes_intermedio', len(resultado['intermedio']) if formato_intermedio == 'binario'
+                                else len(resultado['intermedio'].encode('utf-8')))
+                medicion.contar('bytes_html', len(resultado['html'].encode('utf-8')))
+            registro.info("Compilación en memoria completada")
+    except Exception as e:
+        error_msg = f"Error general durante la compilación: {str(e)}"
+        resultado['errores'].append({'tipo': 'general', 'mensaje': error_msg})
+        registro.error("%s", error_msg)
+        return _con_metricas(resultado, medicion)
+    
+    if cache is not None:
+        cache.guardar(clave, {'html': resultado['html'], 'intermedio': resultado['intermedio'],
+                              'errores': [dict(error) for error in resultado['errores']]})
+    return _con_metricas(resultado, medicion)
 
-# Configurar el logger
-logging.basicConfig(
-    filename='compilador_flashml.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
+def _con_metricas(resultado, medicion, archivo=None):
+    """Agrega al resultado las métricas de la compilación, si se midió, y las registra como una línea JSON"""
+    if medicion.activa:
+        resultado['metricas'] = medicion.como_dict()
+        medicion.registrar(archivo=archivo, errores=len(resultado['errores']))
+    return resultado
 
-def compilar_codigo(codigo_fuente, archivo_entrada="entrada.flashml", archivo_salida=None):
+def compilar_codigo(codigo_fuente, archivo_entrada="entrada.flashml", archivo_salida=None, motor_lexico="clasico",
+                    flujo_tokens=False, tabla_nodos=False, devolver_html=True, json_indentado=False,
+                    formato_intermedio="json", cache=None, procesos_generacion=None, recursos=None,
+                    minificar=False, metricas=False, progreso=None, recuperar_errores=False):
     """
     Compila un código FlashML a HTML, generando un código intermedio en JSON
     
+    Los archivos se escriben de forma atómica (ver Analizadores/persistencia.py);
+    para compilar sin escribir en disco, ver compilar_en_memoria.
+    
     Args:
         codigo_fuente: Código FlashML como string
         archivo_entrada: Nombre del archivo de entrada (para logs y nombres de salida)
         archivo_salida: Ruta al archivo HTML de salida (opcional)
+        motor_lexico: Analizador léxico a usar: 'clasico' o 'rapido' (ver MOTORES_LEXICOS)
+        flujo_tokens: Si es True, el analizador sintáctico consume los tokens a medida
+            que se producen en lugar de recibir la lista completa
+        tabla_nodos: Si es True, el AST se construye como TablaNodos (arreglos paralelos
+            que no copian el texto del código fuente) y todas las fases trabajan sobre ella
+        devolver_html: Si es False, el HTML se escribe en el archivo de salida por fragmentos
+            sin conservarlo en memoria y 'html' queda en None
+        json_indentado: Si es True, el código intermedio se escribe indentado para lectura;
+            por defecto se escribe en formato compacto
+        formato_intermedio: 'json' (archivo .json) o 'binario' (archivo .fmlb, ver
+            GeneradorIntermedio.generar_binario)
+        cache: CacheCompilacion opcional; si ya contiene el resultado para este código
+            y estas opciones, se devuelve sin recompilar
+        procesos_generacion: Si es mayor que 1, el HTML y el JSON intermedio de los subárboles
+            del documento se generan en ese número de procesos (ver Analizadores/paralelo.py);
+            la salida es idéntica a la secuencial
+        recursos: Si se indica (ver publicar_recursos), la página enlaza la hoja de estilos
+            y el script publicados en esas direcciones en lugar de incluirlos
+        minificar: Si es True, el HTML se genera sin indentación ni espacios que no se ven
+            en la página, con el CSS y el script minificados; el texto no cambia
+        metricas: Si es True, el resultado incluye 'metricas' (ver Analizadores/medicion.py):
+            tiempo real, tiempo de CPU y, con tracemalloc activo, pico de memoria de cada
+            fase, más los tokens, nodos y bytes de entrada y salida. También se escriben
+            como una línea JSON en el logger 'flashml.metricas'
+        progreso: Destino de los eventos de progreso (ver Analizadores/progreso.py); por
+            defecto se muestran en la terminal con ProgresoHumano. ProgresoSilencioso no muestra nada
+        recuperar_errores: Si es True, el análisis no se detiene en el primer error léxico o
+            sintáctico: los reúne todos (con 'linea' y 'columna'), cierra automáticamente los
+            elementos sin cerrar y ejecuta el análisis semántico sobre el AST parcial, de modo
+            que una sola compilación informa de todos los errores. No admite tabla_nodos
     
     Returns:
-        dict: Resultado con 'html' (código HTML), 'intermedio' (ruta JSON), 'errores' (lista de errores)
+        dict: Resultado con 'html' (código HTML), 'intermedio' (ruta JSON), 'salida' (ruta HTML),
+            'errores' (lista de errores) y, si se pidieron, 'metricas'
     """
+    _validar_opciones(motor_lexico, formato_intermedio, tabla_nodos, procesos_generacion, recuperar_errores)
+    
     if not archivo_salida:
         nombre_base = os.path.splitext(archivo_entrada)[0]
         archivo_salida = f"{nombre_base}.html"
-        archivo_intermedio = f"{nombre_base}.json"
     else:
         nombre_base = os.path.splitext(archivo_salida)[0]
-        archivo_intermedio = f"{nombre_base}.json"
+    archivo_intermedio = f"{nombre_base}{EXTENSIONES_INTERMEDIO[formato_intermedio]}"
     
-    logging.info(f"Iniciando compilación del archivo/código: {archivo_entrada}")
-    resultado = {'html': None, 'intermedio': None, 'errores': []}
+    opciones = {
+        'motor_lexico': motor_lexico,
+        'flujo_tokens': flujo_tokens,
+        'tabla_nodos': tabla_nodos,
+        'devolver_html': devolver_html,
+        'json_indentado': json_indentado,
+        'formato_intermedio': formato_intermedio,
+        'procesos_generacion': procesos_generacion,
+        'recursos': recursos,
+        'minificar': minificar,
+        'recuperar_errores': recuperar_errores,
+    }
+    medicion = MedicionFases() if metricas else SIN_MEDICION
+    progreso = progreso or ProgresoHumano()
+    if cache is not None:
+        resultado = _compilar_con_cache(cache, codigo_fuente, archivo_entrada, archivo_salida, archivo_intermedio,
+                                        opciones, medicion, progreso)
+    else:
+        resultado = _compilar_sin_cache(codigo_fuente, archivo_entrada, archivo_salida, archivo_intermedio, medicion,
+                                        progreso, **opciones)
+    return _con_metricas(resultado, medicion, archivo_entrada)
+
+def _compilar_sin_cache(codigo_fuente, archivo_entrada, archivo_salida, archivo_intermedio, medicion, progreso,
+                        motor_lexico, flujo_tokens, tabla_nodos, devolver_html, json_indentado, formato_intermedio,
+                        procesos_generacion, recursos, minificar, recuperar_errores):
+    """Fases 1 a 5 de compilar_codigo, midiendo cada una en medicion"""
+    registro.info("Iniciando compilación del archivo/código: %s", archivo_entrada)
+    resultado = {'html': None, 'intermedio': None, 'salida': None, 'errores': []}
     
     try:
-        print(f"Compilando {archivo_entrada}...")
-        print("1. Análisis léxico...")
-        
-        # Fase 1: Análisis léxico (tokenización)
-        analizador_lexico = AnalizadorLexico(codigo_fuente)
-        try:
-            tokens = analizador_lexico.tokenizar()
-        except LexerSyntaxError as e:
-            error_msg = f"Error léxico: {str(e)}"
-            resultado['errores'].append({'tipo': 'léxico', 'mensaje': error_msg})
-            logging.error(error_msg)
-            return resultado
-        
-        print(f"   Se encontraron {len(tokens)} tokens.")
-        print("2. Análisis sintáctico...")
-        logging.info(f"Análisis léxico completado. {len(tokens)} tokens encontrados.")
-        
-        # Fase 2: Análisis sintáctico (parsing)
-        analizador_sintactico = AnalizadorSintactico(tokens)
-        try:
-            arbol_sintactico = analizador_sintactico.analizar()
-        except SyntaxError as e:
-            error_msg = f"Error sintáctico: {str(e)}"
-            resultado['errores'].append({'tipo': 'sintáctico', 'mensaje': error_msg})
-            logging.error(error_msg)
+        progreso.evento('inicio', archivo=archivo_entrada)
+        arbol_sintactico = _analizar(codigo_fuente, motor_lexico, flujo_tokens, tabla_nodos, resultado['errores'],
+                                     progreso, medicion, recuperar_errores)
+        if arbol_sintactico is None:
             return resultado
         
-        print("   Árbol de sintaxis abstracta (AST) construido correctamente.")
-        print("3. Análisis semántico...")
-        logging.info("Análisis sintáctico completado. AST construido.")
+        progreso.evento('fase', numero=4, nombre="Generación de código intermedio")
+        fragmentos_html, fragmentos_json = _fragmentos_paralelos(arbol_sintactico, procesos_generacion,
+                                                                 formato_intermedio, json_indentado, minificar, medicion)
         
-        # Fase 3: Análisis semántico (validación)
-        analizador_semantico = AnalizadorSemantico()
-        errores_semanticos = analizador_semantico.analizar(arbol_sintactico)
-        
-        if errores_semanticos:
-            print("   Se encontraron errores semánticos:")
-            for error in errores_semanticos:
-                print(f"   - {error}")
-                resultado['errores'].append({'tipo': 'semántico', 'mensaje': error})
-                logging.error(f"Error semántico: {error}")
-            return resultado
-        
-        print("   No se encontraron errores semánticos.")
-        print("4. Generación de código intermedio...")
-        logging.info("Análisis semántico completado sin errores.")
-        
-        # Fase 4: Generación de código intermedio (JSON)
+        # Fase 4: Generación de código intermedio (JSON o binario)
         generador_intermedio = GeneradorIntermedio()
-        codigo_intermedio = generador_intermedio.generar_json(arbol_sintactico)
-        with open(archivo_intermedio, 'w', encoding='utf-8') as f:
-            json.dump(codigo_intermedio, f, ensure_ascii=False, indent=2)
+        with medicion.fase('intermedio'):
+            if formato_intermedio == 'binario':
+                with archivo_atomico(archivo_intermedio, 'wb') as f:
+                    generador_intermedio.escribir_binario(arbol_sintactico, f)
+            else:
+                with archivo_atomico(archivo_intermedio) as f:
+                    generador_intermedio.escribir_json(arbol_sintactico, f, indentar=2 if json_indentado else None,
+                                                       fragmentos=fragmentos_json)
+        if medicion.activa:
+            medicion.contar('bytes_intermedio', os.path.getsize(archivo_intermedio))
         
         resultado['intermedio'] = archivo_intermedio
-        print(f"   Código intermedio guardado en {archivo_intermedio}")
-        print("5. Generación de código HTML...")
-        logging.info(f"Código intermedio generado y guardado en {archivo_intermedio}")
+        progreso.evento('intermedio_guardado', ruta=archivo_intermedio)
+        progreso.evento('fase', numero=5, nombre="Generación de código HTML")
+        registro.info("Código intermedio generado y guardado en %s", archivo_intermedio)
         
         # Fase 5: Generación de código HTML
-        generador_html = GeneradorHTML()
-        codigo_html = generador_html.generar(arbol_sintactico)
-        
+        generador_html = GeneradorHTML(recursos, minificar)
+        with medicion.fase('html'), archivo_atomico(archivo_salida) as f:
+            if devolver_html:
+                resultado['html'] = generador_html.generar(arbol_sintactico, fragmentos_html)
+                f.write(resultado['html'])
+            else:
+                generador_html.generar_en(arbol_sintactico, f, fragmentos_html)
+        if medicion.activa:
+            medicion.contar('bytes_html', os.path.getsize(archivo_salida))
         
-        with open(archivo_salida, 'w', encoding='utf-8') as f:
-            f.write(codigo_html)
+        resultado['salida'] = archivo_salida
+        progreso.evento('completado', ruta=archivo_salida)
+        registro.info("Compilación completada. HTML guardado en %s", archivo_salida)
+        return resultado
+    
+    except Exception as e:
+        error_msg = f"Error general durante la compilación: {str(e)}"
+        resultado['errores'].append({'tipo': 'general', 'mensaje': error_msg})
+        progreso.evento('error', mensaje=error_msg)
+        registro.error("%s", error_msg)
+        return resultado
+
+def _compilar_con_cache(cache, codigo_fuente, archivo_entrada, archivo_salida, archivo_intermedio, opciones, medicion,
+                        progreso):
+    """Busca el resultado en la caché; si no está, compila y guarda el resultado"""
+    with medicion.fase('caché'):
+        clave = _clave_cache(cache, codigo_fuente, opciones['formato_intermedio'], opciones['json_indentado'],
+                             opciones['recursos'], opciones['minificar'],
+                             opciones['flujo_tokens'] or opciones['tabla_nodos'], opciones['recuperar_errores'])
+        entrada = cache.obtener(clave)
+    medicion.contar('cache', 'fallo' if entrada is None else 'acierto')
+    
+    if entrada is None:
+        resultado = _compilar_sin_cache(codigo_fuente, archivo_entrada, archivo_salida, archivo_intermedio, medicion,
+                                        progreso, **opciones)
+        if any(error['tipo'] == 'general' for error in resultado['errores']):
+            # Los errores de entrada/salida no dependen del código fuente: no se guardan
+            return resultado
         
-        resultado['html'] = codigo_html
-        print(f"Compilación completada. Resultado guardado en {archivo_salida}")
-        logging.info(f"Compilación completada. HTML guardado en {archivo_salida}")
+        entrada = {'html': None, 'intermedio': None, 'errores': resultado['errores']}
+        if not resultado['errores']:
+            entrada['html'] = resultado['html']
+            if entrada['html'] is None:
+                with open(archivo_salida, 'r', encoding='utf-8') as f:
+                    entrada['html'] = f.read()
+            if opciones['formato_intermedio'] == 'binario':
+                with open(archivo_intermedio, 'rb') as f:
+                    entrada['intermedio'] = f.read()
+            else:
+                with open(archivo_intermedio, 'r', encoding='utf-8') as f:
+                    entrada['intermedio'] = f.read()
+        cache.guardar(clave, entrada)
+        return resultado
+    
+    progreso.evento('cache', archivo=archivo_entrada)
+    registro.info("Resultado de %s recuperado de la caché (%s)", archivo_entrada, clave[:12])
+    resultado = {'html': None, 'intermedio': None, 'salida': None, 'errores': [dict(error) for error in entrada['errores']]}
+    if resultado['errores']:
+        for error in resultado['errores']:
+            registro.error("%s", error['mensaje'])
         return resultado
     
+    try:
+        with medicion.fase('escritura'):
+            _escribir_si_cambia(archivo_intermedio, entrada['intermedio'])
+            _escribir_si_cambia(archivo_salida, entrada['html'])
     except Exception as e:
         error_msg = f"Error general durante la compilación: {str(e)}"
         resultado['errores'].append({'tipo': 'general', 'mensaje': error_msg})
-        print(error_msg)
-        logging.error(error_msg)
+        progreso.evento('error', mensaje=error_msg)
+        registro.error("%s", error_msg)
         return resultado
+    
+    resultado['intermedio'] = archivo_intermedio
+    resultado['salida'] = archivo_salida
+    if opciones['devolver_html']:
+        resultado['html'] = entrada['html']
+    return resultado
 
-def compilar_archivo(archivo_entrada, archivo_salida=None):
+def _escribir_si_cambia(ruta, contenido):
+    """Escribe el contenido (str o bytes) en la ruta solo si el archivo no existe o es distinto"""
+    modo_lectura, codificacion = ('rb', None) if isinstance(contenido, bytes) else ('r', 'utf-8')
+    try:
+        with open(ruta, modo_lectura, encoding=codificacion) as f:
+            if f.read() == contenido:
+                return
+    except (OSError, ValueError):
+        pass
+    escribir_atomico(ruta, contenido)
+
+def compilar_archivo(archivo_entrada, archivo_salida=None, **opciones):
     """
     Compila un archivo FlashML a HTML
     
     Args:
         archivo_entrada: Ruta al archivo FlashML de entrada
         archivo_salida: Ruta al archivo HTML de salida (opcional)
+        **opciones: Opciones adicionales de compilar_codigo (devolver_html, json_indentado...)
     """
     try:
         with open(archivo_entrada, 'r', encoding='utf-8') as f:
             codigo_fuente = f.read()
-        return compilar_codigo(codigo_fuente, archivo_entrada, archivo_salida)
+        return compilar_codigo(codigo_fuente, archivo_entrada, archivo_salida, **opciones)
     except Exception as e:
         error_msg = f"Error al leer el archivo {archivo_entrada}: {str(e)}"
-        print(error_msg)
-        logging.error(error_msg)
-        return {'html': None, 'intermedio': None, 'errores': [{'tipo': 'general', 'mensaje': error_msg}]}
+        (opciones.get('progreso') or ProgresoHumano()).evento('error', mensaje=error_msg)
+        registro.error("%s", error_msg)
+        return {'html': None, 'intermedio': None, 'salida': None, 'errores': [{'tipo': 'general', 'mensaje': error_msg}]}
+
+def buscar_archivos(patron):
+    """Archivos .flashml de un directorio (recursivamente) o que coinciden con un patrón glob"""
+    if os.path.isdir(patron):
+        archivos = []
+        for directorio, _, nombres in os.walk(patron):
+            archivos.extend(os.path.join(directorio, nombre) for nombre in nombres if nombre.endswith('.flashml'))
+    else:
+        archivos = [ruta for ruta in glob.glob(patron, recursive=True) if os.path.isfile(ruta)]
+    return sorted(archivos)
+
+_cache_trabajador = None
+
+def _iniciar_trabajador(directorio_cache):
+    # Cada proceso tiene su propia caché en memoria; el directorio en disco se comparte
+    global _cache_trabajador
+    if directorio_cache:
+        _cache_trabajador = CacheCompilacion(directorio=directorio_cache)
+
+def _compilar_en_lote(archivo_entrada, opciones):
+    """Compila un archivo del lote sin escribir en la salida estándar y mide su duración"""
+    inicio = time.perf_counter()
+    resultado = compilar_archivo(archivo_entrada, cache=_cache_trabajador, progreso=SILENCIOSO, **opciones)
+    return {'archivo': archivo_entrada, 'segundos': time.perf_counter() - inicio, 'errores': resultado['errores']}
+
+def compilar_lote(archivos, trabajadores=None, tamano_bloque=None, directorio_cache=None, **opciones):
+    """
+    Compila varios archivos FlashML repartiéndolos entre procesos
+    
+    Args:
+        archivos: Rutas de los archivos FlashML de entrada
+        trabajadores: Número de procesos (por defecto, uno por CPU)
+        tamano_bloque: Archivos que se envían a cada proceso de una vez (por defecto,
+            unos cuatro bloques por proceso)
+        directorio_cache: Directorio de una caché en disco compartida por los procesos (opcional)
+        **opciones: Opciones adicionales de compilar_codigo (json_indentado, formato_intermedio...)
+    
+    Returns:
+        dict: Informe con 'archivos', 'segundos', 'archivos_por_segundo', 'errores_por_fase',
+            'fallidos' (resultados con errores) y 'resultados' (uno por archivo, en orden)
+    """
+    trabajadores = trabajadores or os.cpu_count() or 1
+    if not tamano_bloque:
+        tamano_bloque = max(1, len(archivos) // (trabajadores * 4))
+    opciones.setdefault('devolver_html', False)
+    compilar = partial(_compilar_en_lote, opciones=opciones)
+    
+    inicio = time.perf_counter()
+    if trabajadores == 1:
+        _iniciar_trabajador(directorio_cache)
+        resultados = [compilar(archivo) for archivo in archivos]
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores, initializer=_iniciar_trabajador,
+                                 initargs=(directorio_cache,)) as ejecutor:
+            resultados = list(ejecutor.map(compilar, archivos, chunksize=tamano_bloque))
+    segundos = time.perf_counter() - inicio
+    
+    errores_por_fase = {}
+    fallidos = []
+    for resultado in resultados:
+        if resultado['errores']:
+            fallidos.append(resultado)
+            for fase in {error['tipo'] for error in resultado['errores']}:
+                errores_por_fase[fase] = errores_por_fase.get(fase, 0) + 1
+    
+    registro.info("Lote de %d archivos compilado en %.2f s, %d con errores", len(archivos), segundos, len(fallidos))
+    return {
+        'archivos': len(archivos),
+        'segundos': segundos,
+        'archivos_por_segundo': len(archivos) / segundos if segundos else 0.0,
+        'trabajadores': trabajadores,
+        'errores_por_fase': errores_por_fase,
+        'fallidos': fallidos,
+        'resultados': resultados,
+    }
+
+def imprimir_informe(informe, mas_lentos=10):
+    """Muestra el resumen de compilar_lote"""
+    print(f"Compilados {informe['archivos']} archivos en {informe['segundos']:.2f} s "
+          f"({informe['archivos_por_segundo']:.1f} archivos/s, {informe['trabajadores']} procesos)")
+    
+    if informe['fallidos']:
+        fases = ", ".join(f"{fase}: {cantidad}" for fase, cantidad in sorted(informe['errores_por_fase'].items()))
+        print(f"Archivos con errores: {len(informe['fallidos'])} ({fases})")
+        for resultado in informe['fallidos']:
+            print(f"   - {resultado['archivo']}: {resultado['errores'][0]['mensaje']}")
+    else:
+        print("Todos los archivos se compilaron sin errores.")
+    
+    if informe['resultados']:
+        print("Archivos más lentos:")
+        for resultado in sorted(informe['resultados'], key=lambda r: r['segundos'], reverse=True)[:mas_lentos]:
+            print(f"   {resultado['segundos'] * 1000:8.1f} ms  {resultado['archivo']}")
 
 def principal():
     """Función principal del programa"""
     parser = argparse.ArgumentParser(description='Compilador FlashML a HTML')
-    parser.add_argument('entrada', help='Archivo FlashML de entrada')
+    parser.add_argument('entrada', nargs='?', help='Archivo FlashML de entrada')
     parser.add_argument('-s', '--salida', help='Archivo HTML de salida (opcional)')
+    parser.add_argument('--json-indentado', action='store_true', help='Escribe el código intermedio JSON indentado')
+    parser.add_argument('--formato-intermedio', choices=sorted(EXTENSIONES_INTERMEDIO), default='json',
+                        help='Formato del código intermedio: json o binario (.fmlb)')
+    parser.add_argument('--cache-dir', help='Directorio de la caché de compilaciones (se reutiliza entre ejecuciones)')
+    parser.add_argument('--batch', metavar='DIR|GLOB',
+                        help='Compila todos los .flashml de un directorio o los archivos que coinciden con un patrón glob')
+    parser.add_argument('--workers', type=int, help='Procesos para el modo --batch (por defecto, uno por CPU)')
+    parser.add_argument('--chunksize', type=int, help='Archivos enviados a cada proceso de una vez en el modo --batch')
+    parser.add_argument('--procesos-generacion', type=int,
+                        help='Genera el HTML y el JSON de los subárboles de un documento grande en N procesos')
+    parser.add_argument('--recursos-externos', metavar='DIR',
+                        help='Publica la hoja de estilos y el script en DIR y los enlaza en lugar de incluirlos en cada página')
+    parser.add_argument('--url-recursos', metavar='URL',
+                        help='Dirección desde la que las páginas cargan los recursos de --recursos-externos (por defecto, DIR)')
+    parser.add_argument('--minificar', action='store_true',
+                        help='Genera el HTML (y los recursos) sin indentación ni espacios innecesarios')
+    parser.add_argument('--recuperar-errores', action='store_true',
+                        help='Informa de todos los errores léxicos, sintácticos y semánticos en una sola compilación '
+                             'en lugar de detenerse en el primero')
+    parser.add_argument('--progreso', choices=sorted(MODOS_PROGRESO), default='humano',
+                        help='Cómo se muestra el progreso de la compilación: humano, json (un evento por línea) o silencioso')
+    parser.add_argument('--profile', nargs='?', const='', metavar='ARCHIVO.prof',
+                        help='Muestra el tiempo, la CPU y el pico de memoria (tracemalloc) de cada fase; con ARCHIVO '
+                             'guarda además un perfil de cProfile (ver python -m pstats). Las mediciones añaden sobrecarga')
     
     argumentos = parser.parse_args()
-    compilar_archivo(argumentos.entrada, argumentos.salida)
+    configurar_registro()
+    if bool(argumentos.entrada) == bool(argumentos.batch):
+        parser.error('indica un archivo de entrada o --batch, pero no ambos')
+    
+    recursos = None
+    if argumentos.recursos_externos:
+        os.makedirs(argumentos.recursos_externos, exist_ok=True)
+        recursos = publicar_recursos(argumentos.recursos_externos,
+                                     argumentos.url_recursos or argumentos.recursos_externos.replace(os.sep, '/'),
+                                     minificar=argumentos.minificar)
+    
+    if argumentos.batch:
+        if argumentos.salida or argumentos.procesos_generacion or argumentos.profile is not None:
+            parser.error('--salida, --procesos-generacion y --profile no se pueden usar con --batch')
+        archivos = buscar_archivos(argumentos.batch)
+        if not archivos:
+            parser.error(f'no se encontraron archivos FlashML en {argumentos.batch}')
+        informe = compilar_lote(archivos, argumentos.workers, argumentos.chunksize, argumentos.cache_dir,
+                                json_indentado=argumentos.json_indentado, formato_intermedio=argumentos.formato_intermedio,
+                                recursos=recursos, minificar=argumentos.minificar,
+                                recuperar_errores=argumentos.recuperar_errores)
+        imprimir_informe(informe)
+        sys.exit(1 if informe['fallidos'] else 0)
+    
+    cache = CacheCompilacion(directorio=argumentos.cache_dir) if argumentos.cache_dir else None
+    progreso = MODOS_PROGRESO[argumentos.progreso]()
+    perfil = None
+    if argumentos.profile is not None:
+        tracemalloc.start()
+        if argumentos.profile:
+            perfil = cProfile.Profile()
+            perfil.enable()
+    resultado = compilar_archivo(argumentos.entrada, argumentos.salida, devolver_html=False,
+                                 json_indentado=argumentos.json_indentado, formato_intermedio=argumentos.formato_intermedio,
+                                 cache=cache, procesos_generacion=argumentos.procesos_generacion, recursos=recursos,
+                                 minificar=argumentos.minificar, metricas=argumentos.profile is not None,
+                                 progreso=progreso, recuperar_errores=argumentos.recuperar_errores)
+    if perfil is not None:
+        perfil.disable()
+        perfil.dump_stats(argumentos.profile)
+        if argumentos.progreso == 'json':
+            progreso.evento('perfil', ruta=argumentos.profile)
+        else:
+            print(f"Perfil de cProfile guardado en {argumentos.profile}")
+    if 'metricas' in resultado:
+        if argumentos.progreso == 'json':
+            progreso.evento('metricas', **resultado['metricas'])
+        else:
+            print(formatear_metricas(resultado['metricas']))
 
 if __name__ == "__main__":
-    principal()
\ No newline at end of file
+    principal()
@@ -0,0 +1,165 @@
+"""
+Métricas del servidor web en el formato de texto de Prometheus, sin dependencias externas
+"""
+import abc
+import bisect
+import math
+import threading
+
+# Límites (en segundos) de los histogramas de latencia: de medio milisegundo a medio minuto
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Límites (en bytes) de los histogramas de tamaño: de 256 bytes a 16 MB, multiplicando por 4
+LIMITES_BYTES = tuple(256 * 4 ** exponente for exponente in range(9))
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escapar(valor, comillas=True):
+    texto = str(valor).replace('\\', '\\\\').replace('\n', '\\n')
+    # En el texto de ayuda (# HELP) las comillas no se escapan
+    return texto.replace('"', '\\"') if comillas else texto
+
+def _formatear_valor(valor):
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    if isinstance(valor, int):
+        return str(valor)
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    return repr(float(valor))
+
+def _formatear_muestra(nombre, etiquetas, valor):
+    if etiquetas:
+        texto = ','.join(f'{clave}="{_escapar(dato)}"' for clave, dato in etiquetas)
+        return f"{nombre}{{{texto}}} {_formatear_valor(valor)}"
+    return f"{nombre} {_formatear_valor(valor)}"
+
+class Metrica(abc.ABC):
+    """
+    Una familia de series con el mismo nombre. etiquetas son los nombres de las
+    etiquetas que distinguen las series; al actualizar una métrica se indican sus
+    valores como argumentos con nombre.
+    """
+    tipo = 'untyped'
+    
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        self._bloqueo = threading.Lock()
+    
+    def _clave(self, valores):
+        if set(valores) != set(self.etiquetas):
+            raise ValueError(f"La métrica {self.nombre} requiere las etiquetas {self.etiquetas}, no {tuple(valores)}")
+        return tuple(str(valores[etiqueta]) for etiqueta in self.etiquetas)
+    
+    @abc.abstractmethod
+    def muestras(self):
+        """Lista de (nombre, etiquetas como pares (clave, valor), valor) de todas las series"""
+    
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {_escapar(self.ayuda, comillas=False)}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(_formatear_muestra(*muestra) for muestra in self.muestras())
+        return lineas
+
+class Contador(Metrica):
+    """Valor que solo aumenta (por ejemplo, compilaciones atendidas)"""
+    tipo = 'counter'
+    
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._bloqueo:
+            self._series[clave] = self._series.get(clave, 0) + cantidad
+    
+    def muestras(self):
+        with self._bloqueo:
+            series = sorted(self._series.items())
+        return [(self.nombre, tuple(zip(self.etiquetas, clave)), valor) for clave, valor in series]
+
+class Histograma(Metrica):
+    """
+    Distribución de observaciones en intervalos acumulados (_bucket), con su
+    suma (_sum) y su número (_count), como los histogramas de Prometheus
+    """
+    tipo = 'histogram'
+    
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(sorted(limites))
+    
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        # Cada serie guarda [cuentas por intervalo (la última, por encima del mayor límite), suma]
+        posicion = bisect.bisect_left(self.limites, valor)
+        with self._bloqueo:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+    
+    def muestras(self):
+        with self._bloqueo:
+            series = sorted((clave, (list(cuentas), suma)) for clave, (cuentas, suma) in self._series.items())
+        muestras = []
+        for clave, (cuentas, suma) in series:
+            etiquetas = tuple(zip(self.etiquetas, clave))
+            acumulado = 0
+            for limite, cuenta in zip(self.limites + (math.inf,), cuentas):
+                acumulado += cuenta
+                muestras.append((f"{self.nombre}_bucket", etiquetas + (('le', _formatear_valor(float(limite))),), acumulado))
+            muestras.append((f"{self.nombre}_sum", etiquetas, suma))
+            muestras.append((f"{self.nombre}_count", etiquetas, acumulado))
+        return muestras
+
+class Calculada(Metrica):
+    """
+    Métrica cuyo valor se obtiene al exponerla llamando a funcion, para estados que ya
+    lleva otro objeto (la caché, el almacén de artefactos...). funcion devuelve un número
+    o, si la métrica tiene etiquetas, un diccionario {tupla de valores de etiquetas: número}.
+    """
+
+    def __init__(self, nombre, ayuda, funcion, tipo='gauge', etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.tipo = tipo
+        self.funcion = funcion
+    
+    def muestras(self):
+        valor = self.funcion()
+        if not self.etiquetas:
+            return [(self.nombre, (), valor)]
+        return [(self.nombre, tuple(zip(self.etiquetas, clave)), dato) for clave, dato in sorted(valor.items())]
+
+class RegistroMetricas:
+    """Conjunto de métricas que se exponen juntas (por ejemplo, en la ruta /metrics)"""
+
+    def __init__(self, prefijo='flashml_'):
+        self.prefijo = prefijo
+        self._metricas = {}
+        self._bloqueo = threading.Lock()
+    
+    def _agregar(self, metrica):
+        with self._bloqueo:
+            if metrica.nombre in self._metricas:
+                raise ValueError(f"Ya existe una métrica llamada {metrica.nombre}")
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+    
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._agregar(Contador(self.prefijo + nombre, ayuda, etiquetas))
+    
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        return self._agregar(Histograma(self.prefijo + nombre, ayuda, etiquetas, limites))
+    
+    def calculada(self, nombre, ayuda, funcion, tipo='gauge', etiquetas=()):
+        return self._agregar(Calculada(self.prefijo + nombre, ayuda, funcion, tipo, etiquetas))
+    
+    def exponer(self):
+        """Texto con todas las métricas en el formato de exposición de Prometheus (versión 0.0.4)"""
+        with self._bloqueo:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
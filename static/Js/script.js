@@ -99,7 +99,18 @@ document.addEventListener("DOMContentLoaded", function () {
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ codigo }),
       });
-      const data = await response.json();
+      let data = await response.json();
+
+      // Los documentos grandes se compilan en segundo plano: consultar el trabajo hasta que termine
+      if (response.status === 202) {
+        estado.innerHTML = "> Documento grande: compilación en segundo plano...";
+        while (!data.resultado) {
+          const consulta = await fetch(`${data.url}?esperar=10`);
+          if (!consulta.ok) throw new Error("el trabajo de compilación ya no existe");
+          data = await consulta.json();
+        }
+        data = data.resultado;
+      }
 
       if (data.success) {
         estado.innerHTML = `> <span class="text-green-400">Compilación exitosa.</span> El archivo HTML generado está disponible en el panel "Archivos Generados".`;
@@ -203,17 +214,17 @@ document.addEventListener("DOMContentLoaded", function () {
         // Actualizar contador de archivos
         document.getElementById(
           "contador-archivos"
-        ).textContent = `${data.archivos.length} archivos`;
+        ).textContent = `${data.total ?? data.archivos.length} archivos`;
       }
     } catch (e) {
       console.error("Error al actualizar archivos generados:", e);
     }
   }
 
-  // Función para descargar archivo
+  // Función para descargar archivo (por /output, que envía la versión comprimida si existe)
   function descargarArchivo(path) {
     const a = document.createElement("a");
-    a.href = `/static/${path}`;
+    a.href = `/output/${path.split("/").pop()}`;
     a.download = path.split("/").pop();
     a.click();
   }
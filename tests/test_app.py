@@ -0,0 +1,62 @@
+"""
+Pruebas del servidor web (app.py). Requieren Flask; sin él se omiten.
+
+Uso: python -m pytest tests
+"""
+import os
+
+import pytest
+
+pytest.importorskip('flask')
+
+import app as servidor
+from Analizadores.persistencia import COMPRESIONES, LONGITUD_HASH, guardar_por_contenido
+
+# Más largo que TAMANO_MINIMO_COMPRESION, para que se guarden las versiones comprimidas
+HTML = "<!DOCTYPE html><html><body>" + "<p>Central City</p>" * 200 + "</body></html>"
+
+
+@pytest.fixture
+def pagina():
+    ruta = guardar_por_contenido(servidor.GENERADOS_DIR, HTML, '.html', comprimir=True)
+    yield os.path.basename(ruta)
+    for sufijo in [''] + list(COMPRESIONES):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+
+
+@pytest.mark.parametrize('codificacion', ['gzip', 'br'])
+def test_precomprimido_conserva_el_nombre_original(pagina, codificacion):
+    if codificacion not in {codificacion for codificacion, _ in COMPRESIONES.values()}:
+        pytest.skip(f"sin soporte para {codificacion}")
+    respuesta = servidor.app.test_client().get(f'/output/{pagina}', headers={'Accept-Encoding': codificacion})
+
+    assert respuesta.status_code == 200
+    assert respuesta.content_encoding == codificacion
+    assert respuesta.mimetype == 'text/html'
+    assert respuesta.headers['Content-Disposition'] == f'inline; filename={pagina}'
+
+
+def test_copia_valida_responde_304(pagina):
+    etiqueta = pagina.split('.')[0]
+    respuesta = servidor.app.test_client().get(f'/output/{pagina}', headers={'If-None-Match': f'"{etiqueta}"'})
+
+    assert respuesta.status_code == 304
+
+
+@pytest.mark.parametrize('condicion', ['*', '"{etiqueta}"'])
+def test_archivo_inexistente_responde_404_aunque_sea_condicional(condicion):
+    etiqueta = '0' * LONGITUD_HASH
+    respuesta = servidor.app.test_client().get(f'/output/{etiqueta}.html',
+                                               headers={'If-None-Match': condicion.format(etiqueta=etiqueta)})
+
+    assert respuesta.status_code == 404
+
+
+@pytest.mark.parametrize('ruta', ['/compilar', '/trabajos'])
+@pytest.mark.parametrize('codigo', [None, '', 123, ['@velocista']])
+def test_codigo_no_valido_responde_400(ruta, codigo):
+    respuesta = servidor.app.test_client().post(ruta, json={'codigo': codigo})
+
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['errores'][0]['tipo'] == 'general'
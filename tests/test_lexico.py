@@ -0,0 +1,52 @@
+"""
+Equivalencia de los motores léxicos: cada motor de MOTORES_LEXICOS debe producir
+los mismos tokens (tipo, valor y posición) o el mismo error que el clásico.
+
+Uso: python -m pytest tests
+"""
+import random
+
+import pytest
+
+from Analizadores.lexer import MOTORES_LEXICOS, SyntaxError as LexerSyntaxError
+from benchmarks.bench_lexico import CASOS_LIMITE
+from benchmarks.corpus import generar_documento
+
+# Piezas con las que se forman los casos aleatorios: etiquetas, atributos, comillas,
+# comentarios, espacios y saltos de línea poco habituales y caracteres no ASCII
+PIEZAS = ['@velocista', '@/velocista', '@titulo', '@/titulo', '@', '@/', '@_a1', '@/x-y', 'nombre=', 'actor =',
+          '"Barry"', "'Iris'", '"', "'", '=', '##', '## nota ##', ' ', '  ', '\t', '\n', '\r\n', '\x0b', '\xa0',
+          'Central City', 'é', '²', 'x', '1', '-', '_', '.']
+
+CASOS_ALEATORIOS = 3000
+SEMILLA = 0
+
+
+def _tokens(motor, codigo):
+    analizador = MOTORES_LEXICOS[motor](codigo)
+    try:
+        return [(token.tipo, token.valor, token.posicion) for token in analizador.tokenizar()]
+    except LexerSyntaxError as e:
+        return ('error', str(e), e.posicion)
+
+
+def _casos():
+    aleatorio = random.Random(SEMILLA)
+    documento = generar_documento(20, semilla=SEMILLA)
+    casos = list(CASOS_LIMITE)
+    for _ in range(CASOS_ALEATORIOS):
+        if aleatorio.random() < 0.7:
+            casos.append(''.join(aleatorio.choice(PIEZAS) for _ in range(aleatorio.randrange(1, 25))))
+        else:
+            # Un trozo del corpus con una pieza insertada, para cubrir documentos casi válidos
+            inicio = aleatorio.randrange(len(documento))
+            trozo = documento[inicio:inicio + aleatorio.randrange(1, 400)]
+            posicion = aleatorio.randrange(len(trozo) + 1)
+            casos.append(trozo[:posicion] + aleatorio.choice(PIEZAS) + trozo[posicion:])
+    return casos
+
+
+@pytest.mark.parametrize('motor', sorted(set(MOTORES_LEXICOS) - {'clasico'}))
+def test_motores_coinciden_con_el_clasico(motor):
+    for codigo in _casos():
+        assert _tokens(motor, codigo) == _tokens('clasico', codigo), f"difieren para {codigo!r}"
@@ -0,0 +1,38 @@
+"""
+La generación en paralelo (Analizadores/paralelo.py) debe producir el mismo HTML
+y el mismo JSON intermedio que la secuencial. Se omite donde no hay fork.
+
+Uso: python -m pytest tests
+"""
+import multiprocessing
+
+import pytest
+
+from main import compilar_en_memoria
+from Analizadores.lexer import AnalizadorLexicoRapido
+from Analizadores.parser import AnalizadorSintactico
+from Analizadores.paralelo import generar_fragmentos
+from benchmarks.corpus import generar_documento
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                                reason="sin el método de inicio fork")
+
+CODIGO = generar_documento(60)
+
+
+def test_el_documento_se_divide_en_fragmentos():
+    ast = AnalizadorSintactico(AnalizadorLexicoRapido(CODIGO).iter_tokens()).analizar()
+    fragmentos_html, fragmentos_json = generar_fragmentos(ast, 2)
+
+    assert len(fragmentos_html) > 1
+    assert fragmentos_html.keys() == fragmentos_json.keys()
+
+
+@pytest.mark.parametrize('json_indentado', [False, True])
+def test_paralelo_coincide_con_secuencial(json_indentado):
+    secuencial = compilar_en_memoria(CODIGO, json_indentado=json_indentado)
+    paralelo = compilar_en_memoria(CODIGO, json_indentado=json_indentado, procesos_generacion=2)
+
+    assert not secuencial['errores']
+    assert paralelo['html'] == secuencial['html']
+    assert paralelo['intermedio'] == secuencial['intermedio']
@@ -0,0 +1,104 @@
+"""
+Ejecución de compilaciones en segundo plano para el servidor web
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+
+class ColaLlena(Exception):
+    """Se lanza al enviar un trabajo cuando ya hay demasiados pendientes"""
+    pass
+
+class GestorTrabajos:
+    """
+    Ejecuta trabajos en un grupo acotado de hilos. Como mucho admite
+    trabajadores + capacidad_cola trabajos pendientes a la vez; por encima
+    de ese límite enviar() lanza ColaLlena. Los trabajos terminados se
+    conservan retencion segundos para que el cliente pueda consultarlos.
+    """
+
+    def __init__(self, trabajadores=2, capacidad_cola=16, retencion=600):
+        self.trabajadores = trabajadores
+        self.capacidad_cola = capacidad_cola
+        self.retencion = retencion
+        self.rechazados = 0
+        self._ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='flashml')
+        self._trabajos = {}
+        self._pendientes = 0
+        self._bloqueo = threading.Lock()
+    
+    def enviar(self, funcion, *args, **kwargs):
+        """Encola funcion(*args, **kwargs) y devuelve el identificador del trabajo"""
+        with self._bloqueo:
+            self._purgar()
+            if self._pendientes >= self.trabajadores + self.capacidad_cola:
+                self.rechazados += 1
+                raise ColaLlena(f"Hay {self._pendientes} trabajos pendientes")
+            self._pendientes += 1
+            identificador = uuid.uuid4().hex
+            trabajo = {'estado': 'en_cola', 'creado': time.time(), 'terminado': None, 'resultado': None, 'error': None}
+            try:
+                trabajo['futuro'] = self._ejecutor.submit(self._ejecutar, trabajo, funcion, args, kwargs)
+            except BaseException:
+                # Con el ejecutor cerrado el trabajo no llega a existir ni a contar como pendiente
+                self._pendientes -= 1
+                raise
+            self._trabajos[identificador] = trabajo
+        return identificador
+    
+    def consultar(self, identificador, esperar=0):
+        """
+        Estado de un trabajo ('en_cola', 'ejecutando', 'terminado' o 'fallido') con su
+        resultado o error, o None si no existe. Con esperar > 0 espera hasta ese número
+        de segundos a que termine (consulta larga).
+        """
+        with self._bloqueo:
+            trabajo = self._trabajos.get(identificador)
+        if trabajo is None:
+            return None
+        if esperar > 0:
+            # La espera se hace sin el bloqueo, para no detener a los demás trabajos
+            try:
+                trabajo['futuro'].result(timeout=esperar)
+            except TiempoAgotado:
+                pass
+        with self._bloqueo:
+            return {clave: trabajo[clave] for clave in ('estado', 'creado', 'terminado', 'resultado', 'error')}
+    
+    def estadisticas(self):
+        with self._bloqueo:
+            return {
+                'trabajadores': self.trabajadores,
+                'capacidad_cola': self.capacidad_cola,
+                'pendientes': self._pendientes,
+                'trabajos': len(self._trabajos),
+                'rechazados': self.rechazados,
+            }
+    
+    def cerrar(self):
+        self._ejecutor.shutdown(wait=True)
+    
+    def _ejecutar(self, trabajo, funcion, args, kwargs):
+        with self._bloqueo:
+            trabajo['estado'] = 'ejecutando'
+        cambios = {'estado': 'fallido', 'resultado': None, 'error': None}
+        try:
+            cambios['resultado'] = funcion(*args, **kwargs)
+            cambios['estado'] = 'terminado'
+        except Exception as e:
+            cambios['error'] = str(e)
+        finally:
+            # Todos los campos cambian a la vez: consultar() nunca ve un trabajo a medio actualizar
+            with self._bloqueo:
+                trabajo.update(cambios, terminado=time.time())
+                self._pendientes -= 1
+        return cambios['resultado']
+    
+    def _purgar(self):
+        # Se llama con el bloqueo adquirido
+        limite = time.time() - self.retencion
+        vencidos = [identificador for identificador, trabajo in self._trabajos.items()
+                    if trabajo['terminado'] is not None and trabajo['terminado'] < limite]
+        for identificador in vencidos:
+            del self._trabajos[identificador]